@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cliente, TipoServico, Agendamento, StatusAgendamento
+from .models import Cliente, TipoServico, Agendamento, StatusAgendamento, EstatisticaDiaria
 
 
 @admin.register(Cliente)
@@ -99,3 +99,30 @@ class AgendamentoAdmin(admin.ModelAdmin):
             .get_queryset(request)
             .select_related("cliente", "servico", "criado_por")
         )
+
+
+@admin.register(EstatisticaDiaria)
+class EstatisticaDiariaAdmin(admin.ModelAdmin):
+    list_display = [
+        "usuario",
+        "data",
+        "total",
+        "agendados",
+        "confirmados",
+        "concluidos",
+        "cancelados",
+        "nao_compareceu",
+        "faturamento",
+    ]
+    list_filter = ["data"]
+    search_fields = ["usuario__username"]
+    ordering = ["-data"]
+    date_hierarchy = "data"
+    list_select_related = ["usuario"]
+
+    def has_add_permission(self, request):
+        # Consolidado mantido automaticamente - use rebuild_estatisticas_diarias
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
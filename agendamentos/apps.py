@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AgendamentosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'agendamentos'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        # Registra sinais (invalidação de cache de ocupação da agenda)
+        from . import signals  # noqa: F401
+        from .busca import garantir_indices_fts
+
+        # Índice FTS5 da busca no SQLite (ver agendamentos.busca)
+        post_migrate.connect(garantir_indices_fts, sender=self)
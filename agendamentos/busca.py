@@ -0,0 +1,196 @@
+"""
+Busca textual de clientes, serviços e agendamentos.
+
+Cliente e TipoServico mantêm uma coluna ``busca`` com o texto normalizado
+(minúsculo, sem acentos; telefone e CPF apenas com dígitos), recalculada no
+``save()``. A coluna é indexada conforme o banco (ver migração 0008):
+
+- PostgreSQL: índice GIN com ``gin_trgm_ops`` (pg_trgm), que atende
+  ``LIKE '%termo%'``;
+- SQLite: tabela virtual FTS5 com tokenizer trigram, mantida por triggers e
+  garantida a cada ``migrate`` (``garantir_indices_fts``, via post_migrate),
+  já que o SQLite recria a tabela em alterações de schema e perde os triggers.
+
+``buscar()`` é o ponto único usado pelas listagens: normaliza o termo da mesma
+forma e exige que todas as palavras apareçam no texto.
+"""
+
+import re
+import sqlite3
+import unicodedata
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Palavras com menos de 3 caracteres não geram trigramas
+TAMANHO_MINIMO_TRIGRAMA = 3
+MODELS_COM_BUSCA = ["Cliente", "TipoServico"]
+
+_APENAS_NUMERICO = re.compile(r"^[\d().\-/+]+$")
+_NAO_DIGITO = re.compile(r"\D")
+
+_tabelas_fts = {}
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples."""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acentos = "".join(
+        caractere for caractere in decomposto if not unicodedata.combining(caractere)
+    )
+    return " ".join(sem_acentos.lower().split())
+
+
+def somente_digitos(texto):
+    return _NAO_DIGITO.sub("", texto or "")
+
+
+def montar_texto_busca(*partes, digitos=()):
+    """Texto da coluna ``busca``: partes normalizadas + campos só com dígitos."""
+    valores = [normalizar(parte) for parte in partes]
+    valores += [somente_digitos(valor) for valor in digitos]
+    return " ".join(valor for valor in valores if valor)
+
+
+def palavras_do_termo(termo):
+    """
+    Normaliza o termo digitado e separa em palavras; trechos numéricos com
+    pontuação (telefone, CPF) são reduzidos aos dígitos.
+    """
+    palavras = []
+    for palavra in normalizar(termo).split():
+        if _APENAS_NUMERICO.match(palavra):
+            palavra = somente_digitos(palavra)
+        if palavra:
+            palavras.append(palavra)
+    return palavras
+
+
+def tabela_fts(model, using="default"):
+    """Nome da tabela FTS5 do model, se existir no banco (SQLite); senão None."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return None
+    chave = (using, model._meta.db_table)
+    if chave not in _tabelas_fts:
+        nome = f"{model._meta.db_table}_busca"
+        with connection.cursor() as cursor:
+            existentes = connection.introspection.table_names(cursor)
+        _tabelas_fts[chave] = nome if nome in existentes else None
+    return _tabelas_fts[chave]
+
+
+def limpar_cache_fts():
+    """Esquece quais tabelas FTS existem (usado após migrações e em testes)."""
+    _tabelas_fts.clear()
+
+
+def _criar_fts(cursor, tabela):
+    """Cria (se preciso) a tabela FTS5 e os triggers; reconstrói se faltava algo."""
+    fts = f"{tabela}_busca"
+    triggers = {
+        f"{fts}_ai": (
+            f"AFTER INSERT ON {tabela} BEGIN "
+            f"INSERT INTO {fts}(rowid, busca) VALUES (new.id, new.busca); END"
+        ),
+        f"{fts}_ad": (
+            f"AFTER DELETE ON {tabela} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, busca) "
+            f"VALUES ('delete', old.id, old.busca); END"
+        ),
+        f"{fts}_au": (
+            f"AFTER UPDATE OF busca ON {tabela} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, busca) "
+            f"VALUES ('delete', old.id, old.busca); "
+            f"INSERT INTO {fts}(rowid, busca) VALUES (new.id, new.busca); END"
+        ),
+    }
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name IN (%s)"
+        % ", ".join(["%s"] * (len(triggers) + 1)),
+        [fts, *triggers],
+    )
+    existentes = {linha[0] for linha in cursor.fetchall()}
+    if existentes == {fts, *triggers}:
+        return
+
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"busca, content='{tabela}', content_rowid='id', tokenize='trigram')"
+    )
+    for nome, definicao in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nome} {definicao}")
+    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def garantir_indices_fts(sender, using="default", **kwargs):
+    """
+    Handler de post_migrate: no SQLite (3.34+, tokenizer trigram) garante as
+    tabelas FTS5 de Cliente e TipoServico e seus triggers.
+    """
+    connection = connections[using]
+    limpar_cache_fts()
+    if connection.vendor != "sqlite" or sqlite3.sqlite_version_info < (3, 34, 0):
+        return
+
+    with connection.cursor() as cursor:
+        existentes = connection.introspection.table_names(cursor)
+        for nome_model in MODELS_COM_BUSCA:
+            tabela = sender.get_model(nome_model)._meta.db_table
+            if tabela not in existentes:
+                continue
+            colunas = {
+                coluna.name
+                for coluna in connection.introspection.get_table_description(
+                    cursor, tabela
+                )
+            }
+            if "busca" in colunas:
+                _criar_fts(cursor, tabela)
+    limpar_cache_fts()
+
+
+def _filtro_palavra(model, palavra, using, prefixo=""):
+    tabela = tabela_fts(model, using)
+    if tabela and len(palavra) >= TAMANHO_MINIMO_TRIGRAMA:
+        frase = '"' + palavra.replace('"', '""') + '"'
+        ids = RawSQL(f"SELECT rowid FROM {tabela} WHERE {tabela} MATCH %s", [frase])
+        return Q(**{f"{prefixo}pk__in": ids})
+    return Q(**{f"{prefixo}busca__contains": palavra})
+
+
+def filtro_busca(model, termo, prefixo="", using="default"):
+    """
+    Retorna o Q que seleciona as linhas de ``model`` cujo texto de busca
+    contém todas as palavras do termo. ``prefixo`` permite filtrar por
+    relacionamento (ex.: ``"cliente__"`` a partir de Agendamento).
+    """
+    filtro = Q()
+    for palavra in palavras_do_termo(termo):
+        filtro &= _filtro_palavra(model, palavra, using, prefixo)
+    return filtro
+
+
+def buscar(queryset, termo):
+    """
+    Filtra um queryset de Cliente, TipoServico ou Agendamento pelo termo.
+
+    Agendamentos são encontrados pelo cliente, pelo serviço ou por trecho das
+    observações.
+    """
+    if not palavras_do_termo(termo):
+        return queryset
+
+    model = queryset.model
+    if model._meta.model_name != "agendamento":
+        return queryset.filter(filtro_busca(model, termo, using=queryset.db))
+
+    campo = model._meta.get_field
+    return queryset.filter(
+        filtro_busca(campo("cliente").related_model, termo, "cliente__", queryset.db)
+        | filtro_busca(campo("servico").related_model, termo, "servico__", queryset.db)
+        | Q(observacoes__icontains=termo.strip())
+    )
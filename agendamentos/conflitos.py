@@ -0,0 +1,132 @@
+"""
+Motor de detecção de conflitos de horário entre agendamentos.
+
+Oferece duas formas de verificação:
+
+- ``buscar_conflitos``: uma única consulta indexada por intervalo
+  (``hora_inicio < novo_fim AND hora_fim > novo_inicio``), usada no caminho
+  de escrita do ``AgendamentoForm``.
+- ``AgendaDoDia`` / ``carregar_agendas``: estrutura em memória com intervalos
+  ordenados, para verificações em lote (várias checagens contra os mesmos dias
+  com apenas uma ida ao banco).
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from .models import Agendamento, StatusAgendamento
+
+# Status que ocupam a agenda (cancelados/concluídos liberam o horário)
+STATUS_QUE_OCUPAM = [
+    StatusAgendamento.AGENDADO,
+    StatusAgendamento.CONFIRMADO,
+    StatusAgendamento.EM_ANDAMENTO,
+]
+
+
+def calcular_hora_fim(data_agendamento, hora_inicio, duracao):
+    """Retorna o datetime de fim para um início + duração (pode virar o dia)."""
+    return datetime.combine(data_agendamento, hora_inicio) + duracao
+
+
+def buscar_conflitos(user, data_agendamento, hora_inicio, hora_fim, excluir_pk=None):
+    """
+    Retorna os agendamentos ativos do usuário que se sobrepõem ao intervalo.
+
+    Executa uma única consulta sobre o índice
+    (criado_por, data_agendamento, hora_inicio, hora_fim).
+    """
+    queryset = Agendamento.objects.filter(
+        criado_por=user,
+        data_agendamento=data_agendamento,
+        status__in=STATUS_QUE_OCUPAM,
+        hora_inicio__lt=hora_fim,
+        hora_fim__gt=hora_inicio,
+    )
+    if excluir_pk:
+        queryset = queryset.exclude(pk=excluir_pk)
+    return queryset.select_related("cliente").order_by("hora_inicio")
+
+
+class AgendaDoDia:
+    """
+    Intervalos ocupados de um dia, mantidos ordenados por hora de início.
+
+    Guarda também o maior fim acumulado até cada posição, o que permite
+    responder "existe sobreposição?" com uma busca binária mesmo quando há
+    intervalos sobrepostos já gravados.
+    """
+
+    def __init__(self, intervalos=()):
+        self._intervalos = sorted(intervalos, key=lambda item: (item[0], item[1]))
+        self._inicios = [item[0] for item in self._intervalos]
+        self._maior_fim = []
+        self._reconstruir_maior_fim(0)
+
+    def __len__(self):
+        return len(self._intervalos)
+
+    def __iter__(self):
+        return iter(self._intervalos)
+
+    def _reconstruir_maior_fim(self, posicao):
+        del self._maior_fim[posicao:]
+        maior = self._maior_fim[-1] if self._maior_fim else None
+        for inicio, fim, _ in self._intervalos[posicao:]:
+            if maior is None or fim > maior:
+                maior = fim
+            self._maior_fim.append(maior)
+
+    def adicionar(self, inicio, fim, referencia=None):
+        """Registra um intervalo ocupado [inicio, fim)."""
+        posicao = bisect_left(self._inicios, inicio)
+        self._inicios.insert(posicao, inicio)
+        self._intervalos.insert(posicao, (inicio, fim, referencia))
+        self._reconstruir_maior_fim(posicao)
+
+    def conflito(self, inicio, fim):
+        """
+        Retorna o primeiro intervalo (inicio, fim, referencia) que se sobrepõe
+        a [inicio, fim), ou None se o horário estiver livre.
+        """
+        limite = bisect_left(self._inicios, fim)
+        if limite == 0 or self._maior_fim[limite - 1] <= inicio:
+            return None
+
+        # _maior_fim é não-decrescente: o primeiro índice em que ele passa de
+        # ``inicio`` é exatamente o primeiro intervalo que termina depois dele.
+        indice = bisect_right(self._maior_fim, inicio, 0, limite)
+        return self._intervalos[indice]
+
+    def livre(self, inicio, fim):
+        """Indica se [inicio, fim) não conflita com nenhum intervalo."""
+        return self.conflito(inicio, fim) is None
+
+
+def carregar_agendas(user, datas, excluir_pks=None):
+    """
+    Carrega, em uma única consulta, a ocupação de vários dias.
+
+    Retorna um dicionário {data: AgendaDoDia}; dias sem agendamentos recebem
+    uma agenda vazia.
+    """
+    datas = set(datas)
+    if not datas:
+        return {}
+
+    queryset = Agendamento.objects.filter(
+        criado_por=user,
+        data_agendamento__in=datas,
+        status__in=STATUS_QUE_OCUPAM,
+    )
+    if excluir_pks:
+        queryset = queryset.exclude(pk__in=excluir_pks)
+
+    linhas = queryset.values_list("pk", "data_agendamento", "hora_inicio", "hora_fim")
+    intervalos_por_dia = {data: [] for data in datas}
+    for pk, data, inicio, fim in linhas:
+        intervalos_por_dia[data].append((inicio, fim, pk))
+
+    return {
+        data: AgendaDoDia(intervalos) for data, intervalos in intervalos_por_dia.items()
+    }
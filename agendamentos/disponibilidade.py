@@ -0,0 +1,166 @@
+"""
+Busca de horários livres na agenda do usuário.
+
+A ocupação de cada dia (intervalos ordenados dos agendamentos ativos) fica em
+cache por usuário/dia. Uma busca carrega do banco, em uma única consulta, apenas
+os dias que ainda não estão em cache; os sinais de ``Agendamento`` invalidam os
+dias alterados (ver agendamentos.signals). Sem cache compartilhado entre os
+workers a invalidação não chegaria aos demais processos, então a ocupação é
+sempre lida do banco (core.cache).
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.cache import cache_compartilhado
+
+from .conflitos import carregar_agendas
+
+CACHE_TIMEOUT_OCUPACAO = 60 * 10  # 10 minutos
+DIAS_POR_LOTE = 7
+MAX_DIAS_BUSCA = 90
+
+
+def _chave_ocupacao(user_id, data):
+    return f"agendamentos:ocupacao:{user_id}:{data.isoformat()}"
+
+
+def _parse_hora(valor):
+    if isinstance(valor, str):
+        return datetime.strptime(valor, "%H:%M").time()
+    return valor
+
+
+def expediente_padrao():
+    """Retorna (abertura, fechamento, dias_funcionamento) a partir do settings."""
+    abertura = _parse_hora(getattr(settings, "AGENDA_HORARIO_ABERTURA", "08:00"))
+    fechamento = _parse_hora(getattr(settings, "AGENDA_HORARIO_FECHAMENTO", "18:00"))
+    dias = getattr(settings, "AGENDA_DIAS_FUNCIONAMENTO", [0, 1, 2, 3, 4, 5])
+    return abertura, fechamento, set(dias)
+
+
+def obter_ocupacao(user, datas):
+    """
+    Retorna {data: [(inicio, fim), ...]} com os intervalos ocupados ordenados.
+
+    Dias presentes no cache não tocam o banco; os demais são carregados juntos.
+    """
+    if not cache_compartilhado():
+        agendas = carregar_agendas(user, datas)
+        return {data: [(inicio, fim) for inicio, fim, _ in agendas[data]] for data in datas}
+
+    chaves = {_chave_ocupacao(user.pk, data): data for data in datas}
+    em_cache = cache.get_many(list(chaves))
+    ocupacao = {chaves[chave]: intervalos for chave, intervalos in em_cache.items()}
+
+    faltantes = [data for data in chaves.values() if data not in ocupacao]
+    if faltantes:
+        agendas = carregar_agendas(user, faltantes)
+        novos = {
+            data: [(inicio, fim) for inicio, fim, _ in agendas[data]]
+            for data in faltantes
+        }
+        cache.set_many(
+            {_chave_ocupacao(user.pk, data): intervalos for data, intervalos in novos.items()},
+            CACHE_TIMEOUT_OCUPACAO,
+        )
+        ocupacao.update(novos)
+
+    return ocupacao
+
+
+def invalidar_ocupacao(user_id, *datas):
+    """Remove do cache a ocupação dos dias informados."""
+    chaves = [_chave_ocupacao(user_id, data) for data in datas if data]
+    if chaves:
+        cache.delete_many(chaves)
+
+
+def intervalos_livres(ocupados, abertura, fechamento):
+    """
+    Percorre uma única vez os intervalos ocupados (ordenados por início) e
+    gera as lacunas livres [inicio, fim) dentro do expediente.
+    """
+    cursor = abertura
+    for inicio, fim in ocupados:
+        if inicio >= fechamento:
+            break
+        if fim <= cursor:
+            continue
+        if inicio > cursor:
+            yield cursor, inicio
+        cursor = max(cursor, fim)
+    if cursor < fechamento:
+        yield cursor, fechamento
+
+
+def _arredondar_para_cima(momento, passo):
+    minutos = momento.hour * 60 + momento.minute + (1 if momento.second or momento.microsecond else 0)
+    resto = minutos % passo
+    if resto:
+        minutos += passo - resto
+    return momento.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=minutos)
+
+
+def buscar_horarios_livres(
+    user,
+    duracao,
+    data_inicio,
+    data_fim,
+    quantidade=10,
+    passo_minutos=None,
+    expediente=None,
+):
+    """
+    Retorna até ``quantidade`` horários livres (lista de datetimes de início)
+    para um serviço de ``duracao`` entre ``data_inicio`` e ``data_fim``.
+
+    Os dias são processados em lotes de DIAS_POR_LOTE, o que permite parar
+    assim que a quantidade pedida é atingida.
+    """
+    if duracao <= timedelta(0) or quantidade <= 0 or data_fim < data_inicio:
+        return []
+
+    passo = passo_minutos or getattr(settings, "AGENDA_INTERVALO_SLOTS_MINUTOS", 15)
+    abertura, fechamento, dias_funcionamento = expediente or expediente_padrao()
+    agora = timezone.localtime().replace(tzinfo=None)
+
+    # Primeiro descarta o passado, depois limita a janela a partir de hoje
+    data_inicio = max(data_inicio, agora.date())
+    data_fim = min(data_fim, data_inicio + timedelta(days=MAX_DIAS_BUSCA - 1))
+
+    horarios = []
+    lote_inicio = data_inicio
+    while lote_inicio <= data_fim and len(horarios) < quantidade:
+        lote_fim = min(lote_inicio + timedelta(days=DIAS_POR_LOTE - 1), data_fim)
+        datas = [
+            lote_inicio + timedelta(days=indice)
+            for indice in range((lote_fim - lote_inicio).days + 1)
+        ]
+        datas = [data for data in datas if data.weekday() in dias_funcionamento]
+        ocupacao = obter_ocupacao(user, datas)
+
+        for data in datas:
+            inicio_expediente = datetime.combine(data, abertura)
+            if data == agora.date():
+                inicio_expediente = max(inicio_expediente, _arredondar_para_cima(agora, passo))
+                if inicio_expediente.date() > data:
+                    continue
+
+            for inicio, fim in intervalos_livres(
+                ocupacao[data], inicio_expediente.time(), fechamento
+            ):
+                candidato = _arredondar_para_cima(datetime.combine(data, inicio), passo)
+                limite = datetime.combine(data, fim)
+                while candidato + duracao <= limite and candidato.date() == data:
+                    horarios.append(candidato)
+                    if len(horarios) >= quantidade:
+                        return horarios
+                    candidato += timedelta(minutes=passo)
+
+        lote_inicio = lote_fim + timedelta(days=1)
+
+    return horarios
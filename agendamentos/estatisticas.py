@@ -0,0 +1,154 @@
+"""
+Manutenção e leitura do consolidado diário (EstatisticaDiaria).
+
+Cada escrita em Agendamento recalcula apenas os dias tocados, com uma consulta
+agregada indexada e um upsert; o dashboard lê o consolidado em uma única
+consulta, independentemente do tamanho do histórico.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Agendamento, EstatisticaDiaria, StatusAgendamento
+from .relatorios import valor_efetivo
+
+CAMPOS_CONTAGEM = {
+    "agendados": StatusAgendamento.AGENDADO,
+    "confirmados": StatusAgendamento.CONFIRMADO,
+    "em_andamento": StatusAgendamento.EM_ANDAMENTO,
+    "concluidos": StatusAgendamento.CONCLUIDO,
+    "cancelados": StatusAgendamento.CANCELADO,
+    "nao_compareceu": StatusAgendamento.NAO_COMPARECEU,
+}
+CAMPOS_ATUALIZAVEIS = ["total", *CAMPOS_CONTAGEM, "faturamento", "atualizado_em"]
+DIAS_GRAFICO = 30
+
+
+def _agregados_por_dia(queryset):
+    """Agrupa um queryset de Agendamento por (usuário, dia) com contagens e faturamento."""
+    anotacoes = {
+        campo: Count("id", filter=Q(status=status))
+        for campo, status in CAMPOS_CONTAGEM.items()
+    }
+    return (
+        queryset.order_by()
+        .values("criado_por_id", "data_agendamento")
+        .annotate(
+            total=Count("id"),
+            faturamento=Coalesce(
+                Sum(valor_efetivo(), filter=Q(status=StatusAgendamento.CONCLUIDO)),
+                Value(Decimal("0")),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            **anotacoes,
+        )
+    )
+
+
+def _gravar(linhas):
+    """Upsert das linhas agregadas; retorna a quantidade gravada."""
+    registros = [
+        EstatisticaDiaria(
+            usuario_id=linha["criado_por_id"],
+            data=linha["data_agendamento"],
+            total=linha["total"],
+            faturamento=linha["faturamento"],
+            **{campo: linha[campo] for campo in CAMPOS_CONTAGEM},
+        )
+        for linha in linhas
+    ]
+    EstatisticaDiaria.objects.bulk_create(
+        registros,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["usuario", "data"],
+        update_fields=CAMPOS_ATUALIZAVEIS,
+    )
+    return len(registros)
+
+
+def recalcular_dias(user_id, datas):
+    """Recalcula o consolidado dos dias informados de um usuário."""
+    datas = {data for data in datas if data}
+    if not user_id or not datas:
+        return
+
+    linhas = list(
+        _agregados_por_dia(
+            Agendamento.objects.filter(criado_por_id=user_id, data_agendamento__in=datas)
+        )
+    )
+    with transaction.atomic():
+        _gravar(linhas)
+        dias_vazios = datas - {linha["data_agendamento"] for linha in linhas}
+        if dias_vazios:
+            EstatisticaDiaria.objects.filter(
+                usuario_id=user_id, data__in=dias_vazios
+            ).delete()
+
+
+def reconstruir(user_ids=None):
+    """
+    Reconstrói o consolidado do zero (todos os usuários ou apenas os informados).
+    Retorna a quantidade de dias gravados.
+    """
+    agendamentos = Agendamento.objects.all()
+    estatisticas = EstatisticaDiaria.objects.all()
+    if user_ids:
+        agendamentos = agendamentos.filter(criado_por_id__in=user_ids)
+        estatisticas = estatisticas.filter(usuario_id__in=user_ids)
+
+    with transaction.atomic():
+        estatisticas.delete()
+        return _gravar(_agregados_por_dia(agendamentos).iterator(chunk_size=2000))
+
+
+def resumo_dashboard(user, hoje):
+    """
+    Lê o consolidado em uma consulta e devolve os números do dashboard.
+
+    Traz os dias a partir do início da janela (mês, semana ou gráfico, o que
+    vier primeiro) e, de datas anteriores, apenas dias com agendamentos ainda
+    pendentes.
+    """
+    inicio_semana = hoje - timedelta(days=hoje.weekday())
+    fim_semana = inicio_semana + timedelta(days=6)
+    inicio_mes = hoje.replace(day=1)
+    inicio_grafico = hoje - timedelta(days=DIAS_GRAFICO - 1)
+    inicio_janela = min(inicio_semana, inicio_mes, inicio_grafico)
+
+    linhas = EstatisticaDiaria.objects.filter(usuario=user).filter(
+        Q(data__gte=inicio_janela) | Q(agendados__gt=0)
+    ).values_list("data", "total", "agendados", "concluidos", "cancelados", "nao_compareceu")
+
+    resumo = {
+        "agendamentos_hoje": 0,
+        "agendamentos_semana": 0,
+        "agendamentos_pendentes": 0,
+        "agendamentos_mes_realizados": 0,
+        "agendamentos_mes_cancelados": 0,
+        "total_mes": 0,
+    }
+    totais_por_dia = {}
+
+    for data, total, agendados, concluidos, cancelados, nao_compareceu in linhas:
+        resumo["agendamentos_pendentes"] += agendados
+        if data == hoje:
+            resumo["agendamentos_hoje"] = total
+        if inicio_semana <= data <= fim_semana:
+            resumo["agendamentos_semana"] += total
+        if data >= inicio_mes:
+            resumo["total_mes"] += total
+            resumo["agendamentos_mes_realizados"] += concluidos
+            resumo["agendamentos_mes_cancelados"] += cancelados + nao_compareceu
+        if inicio_grafico <= data <= hoje:
+            totais_por_dia[data] = total
+
+    dias = [inicio_grafico + timedelta(days=indice) for indice in range(DIAS_GRAFICO)]
+    resumo["grafico_categorias"] = [dia.strftime("%d/%m") for dia in dias]
+    resumo["grafico_valores"] = [totais_por_dia.get(dia, 0) for dia in dias]
+    return resumo
@@ -0,0 +1,112 @@
+"""
+Exportação em streaming (CSV ou JSONL) de agendamentos e clientes.
+
+As linhas são geradas sob demanda a partir de ``queryset.iterator()``, de modo
+que o consumo de memória não depende do tamanho do histórico e o cabeçalho é
+enviado antes de a consulta ser lida por completo.
+"""
+
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+TAMANHO_LOTE_EXPORTACAO = 2000
+
+FORMATOS_EXPORTACAO = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def _data(valor):
+    return valor.isoformat() if valor else ""
+
+
+def _hora(valor):
+    return valor.strftime("%H:%M") if valor else ""
+
+
+def _data_hora(valor):
+    return timezone.localtime(valor).isoformat() if valor else ""
+
+
+# (cabeçalho, função que extrai o valor do objeto)
+COLUNAS_AGENDAMENTO = [
+    ("id", lambda agendamento: agendamento.pk),
+    ("data", lambda agendamento: _data(agendamento.data_agendamento)),
+    ("hora_inicio", lambda agendamento: _hora(agendamento.hora_inicio)),
+    ("hora_fim", lambda agendamento: _hora(agendamento.hora_fim)),
+    ("cliente", lambda agendamento: agendamento.cliente.nome),
+    ("telefone", lambda agendamento: agendamento.cliente.telefone),
+    ("servico", lambda agendamento: agendamento.servico.nome),
+    ("status", lambda agendamento: agendamento.get_status_display()),
+    (
+        "valor",
+        lambda agendamento: str(
+            agendamento.valor_cobrado
+            if agendamento.valor_cobrado is not None
+            else agendamento.servico.preco
+        ),
+    ),
+    ("observacoes", lambda agendamento: agendamento.observacoes or ""),
+    ("criado_em", lambda agendamento: _data_hora(agendamento.criado_em)),
+]
+
+COLUNAS_CLIENTE = [
+    ("id", lambda cliente: cliente.pk),
+    ("nome", lambda cliente: cliente.nome),
+    ("email", lambda cliente: cliente.email or ""),
+    ("telefone", lambda cliente: cliente.telefone),
+    ("cpf", lambda cliente: cliente.cpf or ""),
+    ("data_nascimento", lambda cliente: _data(cliente.data_nascimento)),
+    ("endereco", lambda cliente: cliente.endereco or ""),
+    ("ativo", lambda cliente: cliente.ativo),
+    ("criado_em", lambda cliente: _data_hora(cliente.criado_em)),
+]
+
+
+# Células que o Excel/LibreOffice interpretariam como fórmula (CSV injection)
+INICIOS_DE_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _celula_csv(valor):
+    """Prefixa com ' os textos que seriam executados como fórmula."""
+    if isinstance(valor, str) and valor.startswith(INICIOS_DE_FORMULA):
+        return "'" + valor
+    return valor
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def linhas_csv(queryset, colunas):
+    """Gera o CSV linha a linha (cabeçalho primeiro, com BOM para o Excel)."""
+    writer = csv.writer(_Eco())
+    yield "\ufeff" + writer.writerow([cabecalho for cabecalho, _ in colunas])
+    for objeto in queryset.iterator(chunk_size=TAMANHO_LOTE_EXPORTACAO):
+        yield writer.writerow([_celula_csv(extrair(objeto)) for _, extrair in colunas])
+
+
+def linhas_jsonl(queryset, colunas):
+    """Gera um objeto JSON por linha."""
+    for objeto in queryset.iterator(chunk_size=TAMANHO_LOTE_EXPORTACAO):
+        registro = {cabecalho: extrair(objeto) for cabecalho, extrair in colunas}
+        yield json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+def resposta_exportacao(queryset, colunas, nome_base, formato):
+    """Monta a StreamingHttpResponse do arquivo exportado."""
+    geradores = {"csv": linhas_csv, "jsonl": linhas_jsonl}
+    response = StreamingHttpResponse(
+        geradores[formato](queryset, colunas),
+        content_type=FORMATOS_EXPORTACAO[formato],
+    )
+    nome_arquivo = f"{nome_base}_{timezone.localdate():%Y%m%d}.{formato}"
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
@@ -3,6 +3,9 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import datetime, time
 from .models import Cliente, TipoServico, Agendamento, StatusAgendamento
+from .conflitos import buscar_conflitos
+from .recorrencia import FREQUENCIA_CHOICES, MAX_OCORRENCIAS, criar_serie
+from .widgets import AutocompleteSelect
 import re
 
 
@@ -181,8 +184,12 @@ class AgendamentoForm(forms.ModelForm):
             "valor_cobrado",
         ]
         widgets = {
-            "cliente": forms.Select(attrs={"class": "form-select"}),
-            "servico": forms.Select(attrs={"class": "form-select"}),
+            "cliente": AutocompleteSelect(
+                "agendamentos:cliente_autocomplete", "Buscar cliente por nome, telefone ou CPF"
+            ),
+            "servico": AutocompleteSelect(
+                "agendamentos:servico_autocomplete", "Buscar serviço"
+            ),
             "data_agendamento": forms.DateInput(
                 attrs={"class": "form-control", "type": "date"}
             ),
@@ -254,44 +261,142 @@ class AgendamentoForm(forms.ModelForm):
                     }
                 )
 
-            # Verificar conflitos de horário
-            agendamentos_conflitantes = Agendamento.objects.filter(
-                criado_por=self.user,
-                data_agendamento=data_agendamento,
-                status__in=["agendado", "confirmado", "em_andamento"],
-            )
+            # Persistir hora_fim recalculada (inclusive ao trocar serviço/horário na edição)
+            self.instance.hora_fim = hora_fim
 
-            # Excluir o próprio agendamento se estiver editando
-            if self.instance and self.instance.pk:
-                agendamentos_conflitantes = agendamentos_conflitantes.exclude(
-                    pk=self.instance.pk
-                )
+            # Verificar conflitos de horário (consulta única por intervalo)
+            conflito = buscar_conflitos(
+                self.user,
+                data_agendamento,
+                hora_inicio,
+                hora_fim,
+                excluir_pk=self.instance.pk if self.instance else None,
+            ).first()
 
-            for agendamento in agendamentos_conflitantes:
-                # Calcular hora_fim do agendamento existente se não estiver definida
-                if agendamento.hora_fim:
-                    agend_fim = agendamento.hora_fim
-                else:
-                    agend_inicio_dt = datetime.combine(
-                        data_agendamento, agendamento.hora_inicio
-                    )
-                    agend_fim_dt = agend_inicio_dt + agendamento.servico.duracao
-                    agend_fim = agend_fim_dt.time()
-
-                agend_inicio = agendamento.hora_inicio
-
-                # Verificar sobreposição
-                if hora_inicio < agend_fim and hora_fim > agend_inicio:
-                    raise ValidationError(
-                        {
-                            "hora_inicio": f"Conflito de horário com agendamento existente: "
-                            f"{agendamento.cliente.nome} das {agend_inicio} às {agend_fim}"
-                        }
-                    )
+            if conflito:
+                raise ValidationError(
+                    {
+                        "hora_inicio": f"Conflito de horário com agendamento existente: "
+                        f"{conflito.cliente.nome} das {conflito.hora_inicio} às {conflito.hora_fim}"
+                    }
+                )
 
         return cleaned_data
 
 
+class AgendamentoSerieForm(forms.Form):
+    """Form para criar uma série recorrente de agendamentos"""
+
+    cliente = forms.ModelChoiceField(
+        queryset=Cliente.objects.none(),
+        empty_label="Selecione um cliente",
+        widget=AutocompleteSelect(
+            "agendamentos:cliente_autocomplete", "Buscar cliente por nome, telefone ou CPF"
+        ),
+        label="Cliente",
+    )
+    servico = forms.ModelChoiceField(
+        queryset=TipoServico.objects.none(),
+        empty_label="Selecione um serviço",
+        widget=AutocompleteSelect("agendamentos:servico_autocomplete", "Buscar serviço"),
+        label="Serviço",
+    )
+    data_agendamento = forms.DateField(
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+        label="Data da primeira sessão",
+    )
+    hora_inicio = forms.TimeField(
+        widget=forms.TimeInput(attrs={"class": "form-control", "type": "time"}),
+        label="Hora de Início",
+    )
+    frequencia = forms.ChoiceField(
+        choices=FREQUENCIA_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Frequência",
+    )
+    quantidade = forms.IntegerField(
+        min_value=1,
+        max_value=MAX_OCORRENCIAS,
+        initial=4,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+        label="Número de sessões",
+    )
+    valor_cobrado = forms.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+        widget=forms.NumberInput(
+            attrs={
+                "class": "form-control",
+                "step": "0.01",
+                "min": "0",
+                "placeholder": "Valor a ser cobrado",
+            }
+        ),
+        label="Valor a Cobrar",
+    )
+    observacoes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(
+            attrs={
+                "class": "form-control",
+                "rows": 3,
+                "placeholder": "Observações sobre os agendamentos (opcional)",
+            }
+        ),
+        label="Observações",
+    )
+    pular_conflitos = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+        label="Pular datas com conflito",
+        help_text="Cria as demais sessões mesmo que algumas datas estejam ocupadas",
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop("user", None)
+        super().__init__(*args, **kwargs)
+
+        if self.user:
+            self.fields["cliente"].queryset = Cliente.objects.filter(
+                criado_por=self.user, ativo=True
+            ).order_by("nome")
+            self.fields["servico"].queryset = TipoServico.objects.filter(
+                criado_por=self.user, ativo=True
+            ).order_by("nome")
+
+    def clean_data_agendamento(self):
+        data = self.cleaned_data.get("data_agendamento")
+        if data and data < timezone.now().date():
+            raise ValidationError("Não é possível agendar para datas passadas.")
+        return data
+
+    def save(self):
+        """
+        Cria a série e retorna (criados, datas_ignoradas).
+
+        Conflitos são convertidos em erros do formulário (ValidationError).
+        """
+        dados = self.cleaned_data
+        try:
+            return criar_serie(
+                self.user,
+                dados["cliente"],
+                dados["servico"],
+                dados["data_agendamento"],
+                dados["hora_inicio"],
+                dados["frequencia"],
+                dados["quantidade"],
+                observacoes=dados.get("observacoes") or None,
+                valor_cobrado=dados.get("valor_cobrado"),
+                pular_conflitos=dados.get("pular_conflitos", False),
+            )
+        except ValidationError as error:
+            self.add_error(None, error)
+            raise
+
+
 class AgendamentoStatusForm(forms.Form):
     """Form para alterar status do agendamento"""
 
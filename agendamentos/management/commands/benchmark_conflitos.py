@@ -0,0 +1,182 @@
+"""
+Benchmark da verificação de conflitos de horário.
+
+Compara a varredura antiga do AgendamentoForm.clean (carrega todos os
+agendamentos do dia e percorre em Python) com a consulta por intervalo e com a
+agenda em memória de ``agendamentos.conflitos``.
+
+A migração 0005 preencheu ``hora_fim`` em todas as linhas, então a varredura
+antiga é medida de duas formas: "legado" com ``hora_fim`` preenchido e
+"legado s/fim" como era antes do preenchimento, quando cada linha calculava o
+fim a partir de ``servico.duracao`` (uma consulta de serviço por linha).
+
+Uso:
+    python manage.py benchmark_conflitos
+    python manage.py benchmark_conflitos --tamanhos 10 100 1000 --repeticoes 200
+
+Os dados são criados dentro de uma transação que é desfeita ao final.
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from agendamentos.conflitos import AgendaDoDia, buscar_conflitos, carregar_agendas
+from agendamentos.models import Agendamento, Cliente, TipoServico
+
+User = get_user_model()
+
+
+def verificar_legado(user, data_agendamento, hora_inicio, hora_fim, sem_hora_fim=False):
+    """
+    Reprodução fiel da verificação antiga do AgendamentoForm.clean.
+    Com ``sem_hora_fim``, trata as linhas como anteriores à migração 0005.
+    """
+    agendamentos_conflitantes = Agendamento.objects.filter(
+        criado_por=user,
+        data_agendamento=data_agendamento,
+        status__in=["agendado", "confirmado", "em_andamento"],
+    )
+    for agendamento in agendamentos_conflitantes:
+        if agendamento.hora_fim and not sem_hora_fim:
+            agend_fim = agendamento.hora_fim
+        else:
+            agend_inicio_dt = datetime.combine(data_agendamento, agendamento.hora_inicio)
+            agend_fim = (agend_inicio_dt + agendamento.servico.duracao).time()
+
+        if hora_inicio < agend_fim and hora_fim > agendamento.hora_inicio:
+            return agendamento
+    return None
+
+
+class _ContadorConsultas:
+    """execute_wrapper que só conta as consultas (sem o cursor de debug)."""
+
+    def __init__(self):
+        self.consultas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Compara a verificação de conflitos antiga com o motor por intervalo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanhos",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000],
+            help="Quantidade de agendamentos por dia a testar (padrão: 10 100 1000)",
+        )
+        parser.add_argument(
+            "--repeticoes",
+            type=int,
+            default=100,
+            help="Número de verificações medidas por cenário (padrão: 100)",
+        )
+
+    def handle(self, *args, **options):
+        tamanhos = options["tamanhos"]
+        repeticoes = options["repeticoes"]
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"Benchmark de conflitos ({repeticoes} verificações por cenário)"
+            )
+        )
+        self.stdout.write(
+            f"{'agend./dia':>10} | {'método':<12} | {'ms/verif.':>10} | {'queries/verif.':>14}"
+        )
+        self.stdout.write("-" * 56)
+
+        for tamanho in tamanhos:
+            with transaction.atomic():
+                user, data_agendamento = self._popular(tamanho)
+                for linha in self._medir(user, data_agendamento, tamanho, repeticoes):
+                    self.stdout.write(linha)
+                transaction.set_rollback(True)
+
+    def _popular(self, tamanho):
+        """Cria um dia com ``tamanho`` agendamentos de 1 minuto, em sequência."""
+        user = User.objects.create_user(username=f"benchmark_conflitos_{tamanho}")
+        cliente = Cliente.objects.create(
+            nome="Cliente Benchmark", telefone="(11) 99999-9999", criado_por=user
+        )
+        servico = TipoServico.objects.create(
+            nome="Serviço Benchmark",
+            duracao=timedelta(minutes=1),
+            preco=10,
+            criado_por=user,
+        )
+
+        data_agendamento = date.today() + timedelta(days=1)
+        inicio_dia = datetime.combine(data_agendamento, datetime.min.time())
+        agendamentos = []
+        for indice in range(tamanho):
+            inicio = inicio_dia + timedelta(minutes=indice)
+            agendamentos.append(
+                Agendamento(
+                    cliente=cliente,
+                    servico=servico,
+                    data_agendamento=data_agendamento,
+                    hora_inicio=inicio.time(),
+                    hora_fim=(inicio + timedelta(minutes=1)).time(),
+                    valor_cobrado=servico.preco,
+                    criado_por=user,
+                )
+            )
+        Agendamento.objects.bulk_create(agendamentos, batch_size=500)
+        return user, data_agendamento
+
+    def _medir(self, user, data_agendamento, tamanho, repeticoes):
+        # Horário livre no fim do dia: pior caso para a varredura antiga
+        hora_inicio = datetime.strptime("23:50", "%H:%M").time()
+        hora_fim = datetime.strptime("23:55", "%H:%M").time()
+
+        def legado():
+            return verificar_legado(user, data_agendamento, hora_inicio, hora_fim)
+
+        def legado_sem_fim():
+            return verificar_legado(
+                user, data_agendamento, hora_inicio, hora_fim, sem_hora_fim=True
+            )
+
+        def consulta():
+            return buscar_conflitos(user, data_agendamento, hora_inicio, hora_fim).first()
+
+        agenda = {}
+
+        def memoria():
+            # Uma carga por lote; as verificações seguintes não tocam o banco
+            if not agenda:
+                agenda.update(carregar_agendas(user, [data_agendamento]))
+            return agenda.get(data_agendamento, AgendaDoDia()).conflito(
+                hora_inicio, hora_fim
+            )
+
+        cenarios = (
+            ("legado", legado),
+            ("legado s/fim", legado_sem_fim),
+            ("consulta", consulta),
+            ("memória", memoria),
+        )
+        for nome, funcao in cenarios:
+            # O queries_log do CaptureQueriesContext para em 9000 entradas e o
+            # cursor de debug pesa no tempo medido; aqui só se conta
+            contador = _ContadorConsultas()
+            with connection.execute_wrapper(contador):
+                inicio = time.perf_counter()
+                for _ in range(repeticoes):
+                    funcao()
+                decorrido = time.perf_counter() - inicio
+
+            yield (
+                f"{tamanho:>10} | {nome:<12} | {decorrido * 1000 / repeticoes:>10.3f} | "
+                f"{contador.consultas / repeticoes:>14.2f}"
+            )
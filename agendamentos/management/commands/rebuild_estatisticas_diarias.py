@@ -0,0 +1,48 @@
+"""
+Reconstrói o consolidado diário de agendamentos (EstatisticaDiaria).
+
+Uso:
+    python manage.py rebuild_estatisticas_diarias
+    python manage.py rebuild_estatisticas_diarias --user joao --user maria
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from agendamentos.estatisticas import reconstruir
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o consolidado diário de agendamentos usado pelo dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Reconstrói apenas o usuário informado (pode ser repetido)",
+        )
+
+    def handle(self, *args, **options):
+        usernames = options.get("usernames")
+        user_ids = None
+        if usernames:
+            user_ids = list(
+                User.objects.filter(username__in=usernames).values_list("id", flat=True)
+            )
+            if len(user_ids) != len(set(usernames)):
+                raise CommandError("Um ou mais usuários informados não existem.")
+
+        inicio = time.perf_counter()
+        total_dias = reconstruir(user_ids)
+        decorrido = time.perf_counter() - inicio
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Consolidado reconstruído: {total_dias} dia(s) gravados em {decorrido:.2f}s"
+            )
+        )
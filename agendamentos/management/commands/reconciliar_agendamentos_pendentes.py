@@ -0,0 +1,29 @@
+"""
+Corrige divergências do contador de agendamentos pendentes em cache.
+
+Uso (agendar periodicamente, por exemplo a cada hora):
+    python manage.py reconciliar_agendamentos_pendentes
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from agendamentos.pendentes import reconciliar_pendentes
+
+
+class Command(BaseCommand):
+    help = "Reconcilia o contador de agendamentos pendentes (badge da navbar) com o banco"
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        corrigidos = reconciliar_pendentes()
+        decorrido = time.perf_counter() - inicio
+
+        for user_id, (em_cache, real) in corrigidos.items():
+            self.stdout.write(f"Usuário {user_id}: {em_cache} -> {real}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(corrigidos)} contador(es) corrigido(s) em {decorrido:.2f}s"
+            )
+        )
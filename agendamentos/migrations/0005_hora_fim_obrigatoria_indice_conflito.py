@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_hora_fim(apps, schema_editor):
+    """Calcula hora_fim dos agendamentos antigos a partir da duração do serviço."""
+    Agendamento = apps.get_model("agendamentos", "Agendamento")
+
+    pendentes = Agendamento.objects.filter(hora_fim__isnull=True).select_related(
+        "servico"
+    )
+    for agendamento in pendentes.iterator():
+        fim = (
+            datetime.combine(agendamento.data_agendamento, agendamento.hora_inicio)
+            + agendamento.servico.duracao
+        )
+        Agendamento.objects.filter(pk=agendamento.pk).update(hora_fim=fim.time())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('agendamentos', '0004_alter_cliente_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_hora_fim, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='agendamento',
+            name='hora_fim',
+            field=models.TimeField(blank=True, verbose_name='Hora de Fim'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['criado_por', 'data_agendamento', 'hora_inicio', 'hora_fim'], name='agendamento_conflito_idx'),
+        ),
+    ]
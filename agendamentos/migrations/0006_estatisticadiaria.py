@@ -0,0 +1,91 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:34
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def popular_estatisticas(apps, schema_editor):
+    """Gera o consolidado inicial a partir dos agendamentos existentes."""
+    Agendamento = apps.get_model("agendamentos", "Agendamento")
+    EstatisticaDiaria = apps.get_model("agendamentos", "EstatisticaDiaria")
+
+    status_por_campo = {
+        "agendados": "agendado",
+        "confirmados": "confirmado",
+        "em_andamento": "em_andamento",
+        "concluidos": "concluido",
+        "cancelados": "cancelado",
+        "nao_compareceu": "nao_compareceu",
+    }
+    linhas = (
+        Agendamento.objects.order_by()
+        .values("criado_por_id", "data_agendamento")
+        .annotate(
+            total=Count("id"),
+            faturamento=Coalesce(
+                Sum(
+                    Coalesce("valor_cobrado", "servico__preco"),
+                    filter=Q(status="concluido"),
+                ),
+                Value(Decimal("0")),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            **{
+                campo: Count("id", filter=Q(status=status))
+                for campo, status in status_por_campo.items()
+            },
+        )
+    )
+    EstatisticaDiaria.objects.bulk_create(
+        (
+            EstatisticaDiaria(
+                usuario_id=linha["criado_por_id"],
+                data=linha["data_agendamento"],
+                total=linha["total"],
+                faturamento=linha["faturamento"],
+                **{campo: linha[campo] for campo in status_por_campo},
+            )
+            for linha in linhas.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0005_hora_fim_obrigatoria_indice_conflito'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('agendados', models.PositiveIntegerField(default=0, verbose_name='Agendados')),
+                ('confirmados', models.PositiveIntegerField(default=0, verbose_name='Confirmados')),
+                ('em_andamento', models.PositiveIntegerField(default=0, verbose_name='Em Andamento')),
+                ('concluidos', models.PositiveIntegerField(default=0, verbose_name='Concluídos')),
+                ('cancelados', models.PositiveIntegerField(default=0, verbose_name='Cancelados')),
+                ('nao_compareceu', models.PositiveIntegerField(default=0, verbose_name='Não Compareceu')),
+                ('faturamento', models.DecimalField(decimal_places=2, default=0, help_text='Soma dos valores dos agendamentos concluídos no dia', max_digits=12, verbose_name='Faturamento')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estatisticas_diarias', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária',
+                'verbose_name_plural': 'Estatísticas Diárias',
+                'ordering': ['usuario', 'data'],
+                'unique_together': {('usuario', 'data')},
+            },
+        ),
+        migrations.RunPython(popular_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0006_estatisticadiaria'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['criado_por', 'nome', 'id'], name='cliente_lista_idx'),
+        ),
+    ]
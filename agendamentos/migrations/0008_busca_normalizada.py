@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:44
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+TABELAS_BUSCA = ["agendamentos_cliente", "agendamentos_tiposervico"]
+
+
+def _normalizar(texto):
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.lower().split())
+
+
+def _texto_busca(*partes, digitos=()):
+    valores = [_normalizar(parte) for parte in partes]
+    valores += [re.sub(r"\D", "", valor or "") for valor in digitos]
+    return " ".join(valor for valor in valores if valor)
+
+
+def preencher_busca(apps, schema_editor):
+    """Calcula o texto de busca dos clientes e serviços existentes."""
+    Cliente = apps.get_model("agendamentos", "Cliente")
+    TipoServico = apps.get_model("agendamentos", "TipoServico")
+
+    clientes = []
+    for cliente in Cliente.objects.only("nome", "email", "telefone", "cpf").iterator():
+        cliente.busca = _texto_busca(
+            cliente.nome, cliente.email, digitos=(cliente.telefone, cliente.cpf)
+        )
+        clientes.append(cliente)
+    Cliente.objects.bulk_update(clientes, ["busca"], batch_size=500)
+
+    servicos = []
+    for servico in TipoServico.objects.only("nome", "descricao").iterator():
+        servico.busca = _texto_busca(servico.nome, servico.descricao)
+        servicos.append(servico)
+    TipoServico.objects.bulk_update(servicos, ["busca"], batch_size=500)
+
+
+def criar_indices_busca(apps, schema_editor):
+    """
+    PostgreSQL: índice trigram (GIN) na coluna busca. No SQLite a tabela FTS5
+    é criada no post_migrate (agendamentos.busca.garantir_indices_fts), pois
+    as alterações de tabela do SQLite recriam a tabela e descartam triggers.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for tabela in TABELAS_BUSCA:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {tabela}_busca_trgm "
+            f"ON {tabela} USING gin (busca gin_trgm_ops)"
+        )
+
+
+def remover_indices_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for tabela in TABELAS_BUSCA:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {tabela}_busca_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0007_indice_listagem_clientes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Texto de busca'),
+        ),
+        migrations.AddField(
+            model_name='tiposervico',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Texto de busca'),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indices_busca, remover_indices_busca),
+    ]
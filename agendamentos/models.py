@@ -5,6 +5,8 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from django.core.exceptions import ValidationError
 
+from .busca import montar_texto_busca
+
 
 class Cliente(models.Model):
     """Model para armazenar dados dos clientes"""
@@ -34,15 +36,31 @@ class Cliente(models.Model):
     criado_por = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name="Criado por"
     )
+    busca = models.TextField(
+        blank=True, default="", editable=False, verbose_name="Texto de busca"
+    )
 
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ["nome"]
+        indexes = [
+            # Paginação por keyset da listagem: (nome, id) por usuário
+            models.Index(fields=["criado_por", "nome", "id"], name="cliente_lista_idx"),
+        ]
 
     def __str__(self):
         return f"{self.nome} - {self.telefone}"
 
+    def save(self, *args, **kwargs):
+        """Mantém o texto normalizado usado pela busca"""
+        self.busca = montar_texto_busca(
+            self.nome, self.email, digitos=(self.telefone, self.cpf)
+        )
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "busca"}
+        super().save(*args, **kwargs)
+
     @property
     def idade(self):
         """Calcula a idade do cliente"""
@@ -74,6 +92,9 @@ class TipoServico(models.Model):
     criado_por = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name="Criado por"
     )
+    busca = models.TextField(
+        blank=True, default="", editable=False, verbose_name="Texto de busca"
+    )
 
     class Meta:
         verbose_name = "Tipo de Serviço"
@@ -83,6 +104,13 @@ class TipoServico(models.Model):
     def __str__(self):
         return f"{self.nome} - R$ {self.preco}"
 
+    def save(self, *args, **kwargs):
+        """Mantém o texto normalizado usado pela busca"""
+        self.busca = montar_texto_busca(self.nome, self.descricao)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "busca"}
+        super().save(*args, **kwargs)
+
     @property
     def duracao_formatada(self):
         """Retorna duração em formato legível"""
@@ -114,9 +142,9 @@ class Agendamento(models.Model):
     )
     data_agendamento = models.DateField(verbose_name="Data do Agendamento")
     hora_inicio = models.TimeField(verbose_name="Hora de Início")
-    hora_fim = models.TimeField(
-        verbose_name="Hora de Fim", blank=True, null=True
-    )  # Permitir null
+    # Sempre preenchida no save() a partir da duração do serviço; é a base da
+    # consulta de conflitos por intervalo (ver agendamentos.conflitos)
+    hora_fim = models.TimeField(verbose_name="Hora de Fim", blank=True)
     status = models.CharField(
         max_length=20,
         choices=StatusAgendamento.choices,
@@ -142,6 +170,12 @@ class Agendamento(models.Model):
         verbose_name_plural = "Agendamentos"
         ordering = ["data_agendamento", "hora_inicio"]
         unique_together = ["data_agendamento", "hora_inicio", "criado_por"]
+        indexes = [
+            models.Index(
+                fields=["criado_por", "data_agendamento", "hora_inicio", "hora_fim"],
+                name="agendamento_conflito_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.cliente.nome} - {self.data_agendamento} {self.hora_inicio}"
@@ -221,3 +255,45 @@ class Agendamento(models.Model):
     def pode_cancelar(self):
         """Verifica se o agendamento pode ser cancelado"""
         return self.status not in ["concluido", "cancelado"]
+
+
+class EstatisticaDiaria(models.Model):
+    """
+    Consolidado diário de agendamentos por usuário (contagens por status e
+    faturamento). Mantido pelos sinais de Agendamento e reconstruível com o
+    comando ``rebuild_estatisticas_diarias``.
+    """
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="estatisticas_diarias",
+        verbose_name="Usuário",
+    )
+    data = models.DateField(verbose_name="Data")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+    agendados = models.PositiveIntegerField(default=0, verbose_name="Agendados")
+    confirmados = models.PositiveIntegerField(default=0, verbose_name="Confirmados")
+    em_andamento = models.PositiveIntegerField(default=0, verbose_name="Em Andamento")
+    concluidos = models.PositiveIntegerField(default=0, verbose_name="Concluídos")
+    cancelados = models.PositiveIntegerField(default=0, verbose_name="Cancelados")
+    nao_compareceu = models.PositiveIntegerField(
+        default=0, verbose_name="Não Compareceu"
+    )
+    faturamento = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Faturamento",
+        help_text="Soma dos valores dos agendamentos concluídos no dia",
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Estatística Diária"
+        verbose_name_plural = "Estatísticas Diárias"
+        ordering = ["usuario", "data"]
+        unique_together = ["usuario", "data"]
+
+    def __str__(self):
+        return f"{self.usuario} - {self.data}: {self.total} agendamento(s)"
@@ -0,0 +1,206 @@
+"""
+Paginação por keyset (seek) para as listagens.
+
+Em vez de ``OFFSET``, cada página começa logo após (ou antes de) a última linha
+vista, identificada por um cursor com os valores das colunas de ordenação. O
+custo de uma página não cresce com a profundidade da navegação, desde que exista
+um índice cobrindo a ordenação. As colunas de ordenação devem ser não nulas e a
+última deve ser única (normalmente ``id``).
+
+O total de registros é contado com limite: até ``LIMITE_CONTAGEM`` o número é
+exato; acima disso a listagem mostra "mais de N".
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+LIMITE_CONTAGEM = 1000
+
+
+def codificar_cursor(valores):
+    """Serializa os valores das colunas de ordenação em um token para a URL."""
+    texto = json.dumps([str(valor) for valor in valores])
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(token, model, ordenacao):
+    """
+    Retorna os valores do cursor já convertidos pelos campos do ``model``
+    (``to_python``), ou None se o token for inválido, adulterado ou antigo.
+    """
+    if not token:
+        return None
+    try:
+        preenchimento = "=" * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + preenchimento))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(ordenacao):
+        return None
+
+    convertidos = []
+    for campo, valor in zip(ordenacao, valores):
+        try:
+            valor = model._meta.get_field(campo.lstrip("-")).to_python(valor)
+        except FieldDoesNotExist:
+            pass  # anotação: o valor segue como veio
+        except (ValidationError, ValueError, TypeError):
+            return None
+        if valor is None:
+            return None
+        convertidos.append(valor)
+    return convertidos
+
+
+def _filtro_apos(ordenacao, valores, inverter=False):
+    """
+    Monta o filtro "linhas depois do cursor" para uma ordenação composta:
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+    com ``lt`` nos campos descendentes (e tudo invertido se ``inverter``).
+    """
+    filtro = Q()
+    iguais = {}
+    for campo, valor in zip(ordenacao, valores):
+        descendente = campo.startswith("-")
+        nome = campo.lstrip("-")
+        operador = "lt" if descendente != inverter else "gt"
+        filtro |= Q(**iguais, **{f"{nome}__{operador}": valor})
+        iguais[nome] = valor
+    return filtro
+
+
+def _inverter_ordenacao(ordenacao):
+    return [campo[1:] if campo.startswith("-") else f"-{campo}" for campo in ordenacao]
+
+
+class PaginaKeyset:
+    """Página de resultados com cursores para a página anterior e a próxima."""
+
+    def __init__(self, object_list, ordenacao, has_previous, has_next):
+        self.object_list = object_list
+        self.ordenacao = ordenacao
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def _cursor(self, objeto):
+        return codificar_cursor(
+            getattr(objeto, campo.lstrip("-")) for campo in self.ordenacao
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self._cursor(self.object_list[0])
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self._cursor(self.object_list[-1])
+
+
+def paginar_keyset(queryset, ordenacao, cursor=None, direcao="proxima", tamanho=20):
+    """
+    Retorna a PaginaKeyset de ``tamanho`` itens após o cursor (``direcao`` =
+    "proxima") ou imediatamente antes dele ("anterior"). Sem cursor válido,
+    retorna a primeira página. Executa uma única consulta.
+    """
+    valores = decodificar_cursor(cursor, queryset.model, ordenacao)
+    anterior = valores is not None and direcao == "anterior"
+
+    if valores is None:
+        queryset = queryset.order_by(*ordenacao)
+    elif anterior:
+        queryset = queryset.filter(
+            _filtro_apos(ordenacao, valores, inverter=True)
+        ).order_by(*_inverter_ordenacao(ordenacao))
+    else:
+        queryset = queryset.filter(_filtro_apos(ordenacao, valores)).order_by(*ordenacao)
+
+    linhas = list(queryset[: tamanho + 1])
+    tem_mais = len(linhas) > tamanho
+    linhas = linhas[:tamanho]
+
+    if anterior:
+        linhas.reverse()
+        return PaginaKeyset(linhas, ordenacao, has_previous=tem_mais, has_next=True)
+    return PaginaKeyset(
+        linhas, ordenacao, has_previous=valores is not None, has_next=tem_mais
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    Substitui a paginação por OFFSET de uma ListView pela paginação por keyset.
+
+    Usa ``ordenacao_keyset`` e os parâmetros ``cursor``/``direcao`` da URL.
+    No contexto, ``page_obj`` é uma PaginaKeyset, ``url_pagina_anterior`` e
+    ``url_proxima_pagina`` preservam os filtros e ``get_total()`` devolve
+    (total, aproximado).
+    """
+
+    ordenacao_keyset = None
+    limite_contagem = LIMITE_CONTAGEM
+
+    def paginate_queryset(self, queryset, page_size):
+        pagina = paginar_keyset(
+            queryset,
+            self.ordenacao_keyset,
+            cursor=self.request.GET.get("cursor"),
+            direcao=self.request.GET.get("direcao", "proxima"),
+            tamanho=page_size,
+        )
+        return None, pagina, pagina.object_list, pagina.has_other_pages()
+
+    def _url_pagina(self, cursor, direcao):
+        if not cursor:
+            return None
+        parametros = self.request.GET.copy()
+        parametros.pop("page", None)
+        parametros["cursor"] = cursor
+        parametros["direcao"] = direcao
+        return f"?{parametros.urlencode()}"
+
+    def get_total(self):
+        """
+        Total de registros filtrados, contado com limite. Na primeira página
+        sem próxima, o tamanho da própria página já é o total (sem consulta).
+        """
+        pagina = self.pagina_keyset
+        if not pagina.has_other_pages():
+            return len(pagina), False
+        total = self.object_list.order_by()[: self.limite_contagem + 1].count()
+        if total > self.limite_contagem:
+            return self.limite_contagem, True
+        return total, False
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        self.pagina_keyset = context["page_obj"]
+        context["url_pagina_anterior"] = self._url_pagina(
+            self.pagina_keyset.previous_cursor, "anterior"
+        )
+        context["url_proxima_pagina"] = self._url_pagina(
+            self.pagina_keyset.next_cursor, "proxima"
+        )
+        return context
@@ -0,0 +1,123 @@
+"""
+Contador de agendamentos pendentes (status "agendado") por usuário.
+
+O badge da navbar aparece em todas as páginas; em vez de um COUNT(*) por
+renderização, o total fica em cache por usuário e é ajustado de forma
+incremental pelos sinais de Agendamento (criação, exclusão e mudança de
+status), após o commit. Escritas em lote (bulk_create/update) apenas
+descartam a entrada, que é recontada na próxima leitura.
+
+Sem cache compartilhado entre os workers (LocMemCache de produção) o ajuste
+chegaria só ao worker que gravou a linha; nesse caso o contador não usa cache
+e cada leitura faz o COUNT direto no banco.
+
+Ajustes perdidos (rollback, worker encerrado no meio) são corrigidos pelo
+comando ``reconciliar_agendamentos_pendentes``.
+"""
+
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core.cache import cache_compartilhado
+
+from .models import Agendamento
+
+STATUS_PENDENTE = "agendado"
+CACHE_TIMEOUT_PENDENTES = 60 * 60 * 24  # 1 dia
+LOTE_RECONCILIACAO = 500
+
+
+def chave_pendentes(user_id):
+    return f"agendamentos:pendentes:{user_id}"
+
+
+def contar_pendentes(user_id):
+    """Total de agendamentos pendentes do usuário (COUNT só em cache miss)."""
+    if not cache_compartilhado():
+        return _contar_no_banco(user_id)
+    chave = chave_pendentes(user_id)
+    total = cache.get(chave)
+    if total is None:
+        total = _contar_no_banco(user_id)
+        cache.set(chave, total, CACHE_TIMEOUT_PENDENTES)
+    return total
+
+
+def _contar_no_banco(user_id):
+    return Agendamento.objects.filter(
+        criado_por_id=user_id, status=STATUS_PENDENTE
+    ).count()
+
+
+def _aplicar_ajuste(user_id, delta):
+    chave = chave_pendentes(user_id)
+    try:
+        total = cache.incr(chave, delta)
+    except ValueError:
+        return  # sem entrada em cache: será contado na próxima leitura
+    if total < 0:
+        cache.delete(chave)
+
+
+def ajustar_pendentes(user_id, delta):
+    """Soma ``delta`` ao contador do usuário depois do commit."""
+    if user_id and delta and cache_compartilhado():
+        transaction.on_commit(lambda: _aplicar_ajuste(user_id, delta))
+
+
+def invalidar_pendentes(user_id):
+    """Descarta o contador do usuário (imediatamente e após o commit)."""
+    if not user_id:
+        return
+    chave = chave_pendentes(user_id)
+    cache.delete(chave)
+    transaction.on_commit(lambda: cache.delete(chave))
+
+
+def reconciliar_pendentes(user_ids=None):
+    """
+    Recalcula os contadores em cache com uma consulta agrupada e corrige os
+    que divergirem. Retorna {user_id: (valor_em_cache, valor_real)} corrigidos.
+
+    Sem ``user_ids``, agrupa todos os pendentes e percorre os usuários em lotes,
+    sem montar um ``IN`` com todas as chaves primárias.
+    """
+    if not cache_compartilhado():
+        return {}  # contador não fica em cache: nada a reconciliar
+
+    pendentes = Agendamento.objects.filter(status=STATUS_PENDENTE)
+    if user_ids is None:
+        user_ids = (
+            get_user_model()
+            .objects.order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=LOTE_RECONCILIACAO)
+        )
+    else:
+        user_ids = list(user_ids)
+        pendentes = pendentes.filter(criado_por_id__in=user_ids)
+    reais = dict(
+        pendentes.order_by().values_list("criado_por_id").annotate(total=Count("id"))
+    )
+
+    corrigidos = {}
+    user_ids = iter(user_ids)
+    while True:
+        lote = list(islice(user_ids, LOTE_RECONCILIACAO))
+        if not lote:
+            break
+        chaves = {chave_pendentes(user_id): user_id for user_id in lote}
+        ajustes = {}
+        for chave, valor in cache.get_many(list(chaves)).items():
+            user_id = chaves[chave]
+            real = reais.get(user_id, 0)
+            if valor != real:
+                corrigidos[user_id] = (valor, real)
+                ajustes[chave] = real
+        if ajustes:
+            cache.set_many(ajustes, CACHE_TIMEOUT_PENDENTES)
+    return corrigidos
@@ -0,0 +1,153 @@
+"""
+Criação de séries recorrentes de agendamentos (semanal, quinzenal ou mensal).
+
+A série inteira é validada com uma única consulta (conflitos de horário e a
+restrição unique_together de data/hora) e gravada com ``bulk_create``, sem
+passar pelo ``Agendamento.save()`` de cada ocorrência.
+"""
+
+import calendar
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .conflitos import STATUS_QUE_OCUPAM, AgendaDoDia, calcular_hora_fim
+from .models import Agendamento
+from .signals import agendamentos_alterados_em_lote
+
+FREQUENCIA_CHOICES = [
+    ("semanal", "Semanal"),
+    ("quinzenal", "Quinzenal"),
+    ("mensal", "Mensal"),
+]
+MAX_OCORRENCIAS = 104
+
+
+def _somar_meses(data, meses):
+    """Soma meses mantendo o dia (ou o último dia do mês, se não existir)."""
+    mes_indice = data.month - 1 + meses
+    ano = data.year + mes_indice // 12
+    mes = mes_indice % 12 + 1
+    dia = min(data.day, calendar.monthrange(ano, mes)[1])
+    return data.replace(year=ano, month=mes, day=dia)
+
+
+def gerar_datas_serie(data_inicial, frequencia, quantidade):
+    """Retorna as datas das ``quantidade`` ocorrências a partir de ``data_inicial``."""
+    if frequencia == "semanal":
+        return [data_inicial + timedelta(weeks=indice) for indice in range(quantidade)]
+    if frequencia == "quinzenal":
+        return [data_inicial + timedelta(weeks=2 * indice) for indice in range(quantidade)]
+    if frequencia == "mensal":
+        return [_somar_meses(data_inicial, indice) for indice in range(quantidade)]
+    raise ValueError(f"Frequência inválida: {frequencia}")
+
+
+def verificar_serie(user, datas, hora_inicio, hora_fim):
+    """
+    Retorna {data: motivo} das ocorrências que não podem ser criadas.
+
+    Uma única consulta traz todos os agendamentos do usuário nas datas da série:
+    os ativos alimentam uma AgendaDoDia por data (conflito de horário) e todos,
+    inclusive cancelados, contam para a unicidade de data/hora de início.
+    """
+    linhas = Agendamento.objects.filter(
+        criado_por=user, data_agendamento__in=datas
+    ).values_list("data_agendamento", "hora_inicio", "hora_fim", "status", "cliente__nome")
+
+    intervalos_por_dia = {}
+    horarios_ocupados = set()
+    for data, inicio, fim, status, cliente_nome in linhas:
+        horarios_ocupados.add((data, inicio))
+        if status in STATUS_QUE_OCUPAM:
+            intervalos_por_dia.setdefault(data, []).append((inicio, fim, cliente_nome))
+
+    problemas = {}
+    for data in datas:
+        if (data, hora_inicio) in horarios_ocupados:
+            problemas[data] = "Já existe um agendamento neste dia e horário."
+            continue
+        conflito = AgendaDoDia(intervalos_por_dia.get(data, ())).conflito(
+            hora_inicio, hora_fim
+        )
+        if conflito:
+            inicio, fim, cliente_nome = conflito
+            problemas[data] = (
+                f"Conflito de horário com {cliente_nome} das {inicio} às {fim}"
+            )
+    return problemas
+
+
+def _mensagens(problemas):
+    return [
+        f"{data.strftime('%d/%m/%Y')}: {motivo}" for data, motivo in sorted(problemas.items())
+    ]
+
+
+def criar_serie(
+    user,
+    cliente,
+    servico,
+    data_inicial,
+    hora_inicio,
+    frequencia,
+    quantidade,
+    observacoes=None,
+    valor_cobrado=None,
+    pular_conflitos=False,
+):
+    """
+    Cria a série de agendamentos e retorna (criados, datas_ignoradas).
+
+    Se houver conflitos e ``pular_conflitos`` for False, nada é gravado e um
+    ValidationError lista as datas problemáticas.
+    """
+    if not 1 <= quantidade <= MAX_OCORRENCIAS:
+        raise ValidationError(f"A série deve ter entre 1 e {MAX_OCORRENCIAS} ocorrências.")
+
+    fim = calcular_hora_fim(data_inicial, hora_inicio, servico.duracao)
+    if fim.date() > data_inicial:
+        raise ValidationError("O agendamento não pode passar da meia-noite.")
+    hora_fim = fim.time()
+
+    datas = gerar_datas_serie(data_inicial, frequencia, quantidade)
+    problemas = verificar_serie(user, datas, hora_inicio, hora_fim)
+
+    if problemas and not pular_conflitos:
+        raise ValidationError(_mensagens(problemas))
+
+    valor = valor_cobrado or servico.preco
+    novos = [
+        Agendamento(
+            cliente=cliente,
+            servico=servico,
+            data_agendamento=data,
+            hora_inicio=hora_inicio,
+            hora_fim=hora_fim,
+            observacoes=observacoes,
+            valor_cobrado=valor,
+            criado_por=user,
+        )
+        for data in datas
+        if data not in problemas
+    ]
+
+    try:
+        with transaction.atomic():
+            criados = Agendamento.objects.bulk_create(novos, batch_size=200)
+    except IntegrityError:
+        # Outro agendamento ocupou um dos horários entre a verificação e a
+        # gravação: nada foi gravado; informar os conflitos atuais
+        problemas = verificar_serie(user, datas, hora_inicio, hora_fim)
+        raise ValidationError(
+            _mensagens(problemas)
+            or ["Um dos horários acabou de ser ocupado. Tente novamente."]
+        )
+
+    # bulk_create não dispara sinais: notificar os dias afetados explicitamente
+    agendamentos_alterados_em_lote(
+        user.pk, [agendamento.data_agendamento for agendamento in criados]
+    )
+
+    return criados, sorted(problemas)
@@ -0,0 +1,181 @@
+"""
+Cálculos financeiros dos relatórios.
+
+O valor de cada agendamento é ``valor_cobrado`` ou, se vazio, o preço do
+serviço — resolvido no banco com ``Coalesce``. Todo o financeiro de um período
+(total, ticket médio, séries diária e mensal e crescimento) sai de uma única
+consulta agrupada por dia; mês e totais são somados em Python sobre essas
+linhas, que são no máximo uma por dia do período.
+
+O resultado completo de um relatório fica em cache por usuário e período. As
+chaves incluem um contador de geração por usuário, incrementado a cada escrita
+em Agendamento, TipoServico ou Cliente (ver agendamentos.signals): entradas
+antigas deixam de ser lidas e expiram sozinhas, sem varrer o cache.
+
+A geração só é confiável se todos os workers enxergarem o mesmo cache (Redis).
+Com o LocMemCache de produção cada worker tem o seu contador e a escrita
+invalidaria apenas o worker que a fez; nesse caso o relatório é sempre
+calculado na hora.
+"""
+
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, Sum
+from django.db.models.functions import Coalesce
+
+from core.cache import cache_compartilhado
+
+
+def valor_efetivo():
+    """Expressão do valor de um agendamento: valor cobrado ou preço do serviço."""
+    return Coalesce(
+        "valor_cobrado",
+        "servico__preco",
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def faturamento_por_dia(agendamentos):
+    """
+    Retorna {data: (faturamento, quantidade)} do queryset em uma consulta.
+    """
+    linhas = (
+        agendamentos.order_by()
+        .values("data_agendamento")
+        .annotate(total=Sum(valor_efetivo()), quantidade=Count("id"))
+        .values_list("data_agendamento", "total", "quantidade")
+    )
+    return {
+        data: (total or Decimal("0"), quantidade) for data, total, quantidade in linhas
+    }
+
+
+def _crescimento(faturamento_mensal):
+    """Variação percentual do último mês em relação ao anterior."""
+    if len(faturamento_mensal) < 2:
+        return 0
+    ultimo = faturamento_mensal[-1]["valor"]
+    penultimo = faturamento_mensal[-2]["valor"]
+    if penultimo <= 0:
+        return 0
+    return round((ultimo - penultimo) / penultimo * 100, 1)
+
+
+def resumo_financeiro(agendamentos, inicio, fim):
+    """
+    Calcula o financeiro do período [inicio, fim] para o queryset informado.
+
+    Retorna {"faturamento_dados": {...}, "kpis_financeiros": {...}} no formato
+    consumido pelo template de relatórios.
+    """
+    por_dia = faturamento_por_dia(agendamentos)
+
+    categorias = []
+    valores = []
+    data_atual = inicio
+    while data_atual <= fim:
+        total_dia, _ = por_dia.get(data_atual, (0, 0))
+        categorias.append(data_atual.strftime("%d/%m"))
+        valores.append(float(total_dia))
+        data_atual += timedelta(days=1)
+
+    por_mes = {}
+    for data, (total_dia, _) in sorted(por_dia.items()):
+        mes = data.replace(day=1)
+        por_mes[mes] = por_mes.get(mes, Decimal("0")) + total_dia
+    faturamento_mensal = [
+        {"mes": mes.strftime("%m/%Y"), "valor": float(valor)}
+        for mes, valor in por_mes.items()
+    ]
+
+    faturamento_total = float(sum((total for total, _ in por_dia.values()), Decimal("0")))
+    total_agendamentos = sum(quantidade for _, quantidade in por_dia.values())
+
+    return {
+        "faturamento_dados": {
+            "categorias": json.dumps(categorias),
+            "valores": json.dumps(valores),
+        },
+        "kpis_financeiros": {
+            "faturamento_total": faturamento_total,
+            "ticket_medio": (
+                faturamento_total / total_agendamentos if total_agendamentos else 0
+            ),
+            "total_agendamentos": total_agendamentos,
+            "faturamento_mensal": faturamento_mensal,
+            "crescimento_mensal": _crescimento(faturamento_mensal),
+            "dias_periodo": (fim - inicio).days + 1,
+        },
+    }
+
+
+# ========================================
+# CACHE DE RELATÓRIOS
+# ========================================
+
+CACHE_TIMEOUT_RELATORIOS = 60 * 30  # 30 minutos
+CACHE_TIMEOUT_GERACAO = 60 * 60 * 24 * 30  # 30 dias
+
+
+def _chave_geracao(user_id):
+    return f"agendamentos:relatorios:geracao:{user_id}"
+
+
+def geracao_relatorios(user_id):
+    """Retorna a geração atual dos relatórios do usuário (criando se preciso)."""
+    chave = _chave_geracao(user_id)
+    geracao = cache.get(chave)
+    if geracao is None:
+        # Valor inicial baseado no relógio: se o contador for despejado do
+        # cache, a nova geração não coincide com chaves antigas ainda vivas.
+        cache.add(chave, time.time_ns(), CACHE_TIMEOUT_GERACAO)
+        geracao = cache.get(chave)
+    return geracao
+
+
+def _incrementar_geracao(user_id):
+    chave = _chave_geracao(user_id)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.add(chave, time.time_ns(), CACHE_TIMEOUT_GERACAO)
+
+
+def invalidar_relatorios(user_id):
+    """
+    Invalida todos os relatórios em cache do usuário.
+
+    Incrementa a geração imediatamente e de novo após o commit, para que uma
+    leitura concorrente feita antes do commit não deixe dados velhos em cache.
+    """
+    if not user_id or not cache_compartilhado():
+        return
+    _incrementar_geracao(user_id)
+    transaction.on_commit(lambda: _incrementar_geracao(user_id))
+
+
+def chave_relatorio(user_id, inicio, fim):
+    return (
+        f"agendamentos:relatorios:{user_id}:{geracao_relatorios(user_id)}:"
+        f"{inicio.isoformat()}:{fim.isoformat()}"
+    )
+
+
+def relatorio_em_cache(user_id, inicio, fim, calcular):
+    """
+    Retorna o relatório do período a partir do cache ou o calcula com
+    ``calcular()`` e guarda o resultado.
+    """
+    if not cache_compartilhado():
+        return calcular()
+    chave = chave_relatorio(user_id, inicio, fim)
+    relatorio = cache.get(chave)
+    if relatorio is None:
+        relatorio = calcular()
+        cache.set(chave, relatorio, CACHE_TIMEOUT_RELATORIOS)
+    return relatorio
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .disponibilidade import invalidar_ocupacao
+from .estatisticas import recalcular_dias
+from .models import Agendamento, Cliente, TipoServico
+from .pendentes import STATUS_PENDENTE, ajustar_pendentes, invalidar_pendentes
+from .relatorios import invalidar_relatorios
+
+
+_STATUS_NAO_CARREGADO = object()  # instância carregada com .only()/.defer()
+
+
+@receiver(post_init, sender=Agendamento)
+def guardar_estado_original(sender, instance, **kwargs):
+    """Guarda os valores carregados para detectar mudanças de dia e status no save."""
+    instance._estado_original = {
+        "criado_por_id": instance.__dict__.get("criado_por_id"),
+        "data_agendamento": instance.__dict__.get("data_agendamento"),
+        "status": instance.__dict__.get("status", _STATUS_NAO_CARREGADO) if instance.pk else None,
+    }
+
+
+def _dias_afetados(instance):
+    """Retorna {user_id: {datas}} tocados pelo save (dia novo e dia anterior)."""
+    afetados = {instance.criado_por_id: {instance.data_agendamento}}
+    original = getattr(instance, "_estado_original", {})
+    if original.get("criado_por_id") and original.get("data_agendamento"):
+        afetados.setdefault(original["criado_por_id"], set()).add(
+            original["data_agendamento"]
+        )
+    return afetados
+
+
+def _ajustar_contador_pendentes(instance):
+    """Atualiza o badge de pendentes conforme a transição de status/dono."""
+    original = getattr(instance, "_estado_original", {})
+    if original.get("status") is _STATUS_NAO_CARREGADO:
+        invalidar_pendentes(original.get("criado_por_id"))
+        invalidar_pendentes(instance.criado_por_id)
+        return
+    if original.get("status") == STATUS_PENDENTE:
+        ajustar_pendentes(original.get("criado_por_id"), -1)
+    if instance.status == STATUS_PENDENTE:
+        ajustar_pendentes(instance.criado_por_id, 1)
+
+
+@receiver(post_save, sender=Agendamento)
+def agendamento_salvo(sender, instance, **kwargs):
+    for user_id, datas in _dias_afetados(instance).items():
+        _notificar_dias(user_id, datas)
+    _ajustar_contador_pendentes(instance)
+    guardar_estado_original(sender, instance)
+
+
+@receiver(post_delete, sender=Agendamento)
+def agendamento_removido(sender, instance, **kwargs):
+    _notificar_dias(instance.criado_por_id, [instance.data_agendamento])
+    if instance.status == STATUS_PENDENTE:
+        ajustar_pendentes(instance.criado_por_id, -1)
+
+
+def agendamentos_alterados_em_lote(user_id, datas):
+    """
+    Ponto único de notificação para escritas em lote (bulk_create/update),
+    que não disparam post_save/post_delete.
+    """
+    _notificar_dias(user_id, datas)
+    invalidar_pendentes(user_id)
+
+
+def _notificar_dias(user_id, datas):
+    datas = set(datas)
+    invalidar_ocupacao(user_id, *datas)
+    recalcular_dias(user_id, datas)
+    invalidar_relatorios(user_id)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=TipoServico)
+@receiver(post_delete, sender=TipoServico)
+def cadastro_alterado(sender, instance, **kwargs):
+    """Nomes e preços aparecem nos relatórios: invalida o cache do usuário."""
+    invalidar_relatorios(instance.criado_por_id)
@@ -1,4 +1,5 @@
 from django.test import TestCase
+from datetime import time
 
 
 class AgendamentoTestCase(TestCase):
@@ -7,3 +8,1178 @@ class AgendamentoTestCase(TestCase):
     def test_placeholder(self):
         """Placeholder test that always passes."""
         self.assertTrue(True)
+
+
+class ConflitosTestCase(TestCase):
+    """Testes do motor de detecção de conflitos"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from .models import Agendamento, Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="agenda", password="senha-123")
+        self.cliente = Cliente.objects.create(
+            nome="Maria", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Corte", duracao=timedelta(hours=1), preco=50, criado_por=self.user
+        )
+        self.data = date.today() + timedelta(days=1)
+        self.existente = Agendamento.objects.create(
+            cliente=self.cliente,
+            servico=self.servico,
+            data_agendamento=self.data,
+            hora_inicio=time(10, 0),
+            criado_por=self.user,
+        )
+
+    def test_save_preenche_hora_fim(self):
+        self.assertEqual(self.existente.hora_fim, time(11, 0))
+
+    def test_buscar_conflitos_intervalo(self):
+        from .conflitos import buscar_conflitos
+
+        self.assertEqual(
+            list(buscar_conflitos(self.user, self.data, time(10, 30), time(11, 30))),
+            [self.existente],
+        )
+        # Intervalos encostados não conflitam
+        self.assertFalse(
+            buscar_conflitos(self.user, self.data, time(11, 0), time(12, 0)).exists()
+        )
+        self.assertFalse(
+            buscar_conflitos(
+                self.user, self.data, time(10, 0), time(11, 0), excluir_pk=self.existente.pk
+            ).exists()
+        )
+
+    def test_agenda_do_dia(self):
+        from .conflitos import AgendaDoDia
+
+        agenda = AgendaDoDia([(time(8, 0), time(12, 0), "longo"), (time(9, 0), time(9, 30), "curto")])
+        agenda.adicionar(time(14, 0), time(15, 0), "tarde")
+
+        self.assertEqual(agenda.conflito(time(11, 0), time(11, 30))[2], "longo")
+        self.assertEqual(agenda.conflito(time(14, 30), time(16, 0))[2], "tarde")
+        self.assertTrue(agenda.livre(time(12, 0), time(14, 0)))
+        self.assertTrue(agenda.livre(time(7, 0), time(8, 0)))
+
+    def test_form_rejeita_conflito(self):
+        from .forms import AgendamentoForm
+
+        form = AgendamentoForm(
+            data={
+                "cliente": self.cliente.pk,
+                "servico": self.servico.pk,
+                "data_agendamento": self.data.isoformat(),
+                "hora_inicio": "10:30",
+            },
+            user=self.user,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("Conflito de horário", form.errors["hora_inicio"][0])
+
+    def test_form_edicao_recalcula_hora_fim(self):
+        from .forms import AgendamentoForm
+
+        form = AgendamentoForm(
+            data={
+                "cliente": self.cliente.pk,
+                "servico": self.servico.pk,
+                "data_agendamento": self.data.isoformat(),
+                "hora_inicio": "15:00",
+            },
+            instance=self.existente,
+            user=self.user,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().hora_fim, time(16, 0))
+
+
+class DisponibilidadeTestCase(TestCase):
+    """Testes da busca de horários livres"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from .models import Agendamento, Cliente, TipoServico
+
+        cache.clear()
+        self.user = User.objects.create_user(username="livres", password="senha-123")
+        self.cliente = Cliente.objects.create(
+            nome="João", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Consulta", duracao=timedelta(hours=1), preco=100, criado_por=self.user
+        )
+        self.data = date.today() + timedelta(days=2)
+        self.expediente = (time(8, 0), time(12, 0), set(range(7)))
+        Agendamento.objects.create(
+            cliente=self.cliente,
+            servico=self.servico,
+            data_agendamento=self.data,
+            hora_inicio=time(9, 0),
+            criado_por=self.user,
+        )
+
+    def buscar(self, **kwargs):
+        from .disponibilidade import buscar_horarios_livres
+
+        return buscar_horarios_livres(
+            self.user,
+            self.servico.duracao,
+            self.data,
+            self.data,
+            passo_minutos=30,
+            expediente=self.expediente,
+            **kwargs,
+        )
+
+    def test_intervalos_livres_uma_passada(self):
+        from .disponibilidade import intervalos_livres
+
+        ocupados = [(time(9, 0), time(10, 0)), (time(9, 30), time(10, 30)), (time(11, 0), time(11, 30))]
+        self.assertEqual(
+            list(intervalos_livres(ocupados, time(8, 0), time(12, 0))),
+            [(time(8, 0), time(9, 0)), (time(10, 30), time(11, 0)), (time(11, 30), time(12, 0))],
+        )
+
+    def test_horarios_respeitam_ocupacao(self):
+        horarios = [horario.time() for horario in self.buscar()]
+        self.assertEqual(horarios, [time(8, 0), time(10, 0), time(10, 30), time(11, 0)])
+        self.assertEqual(len(self.buscar(quantidade=2)), 2)
+
+    def test_ocupacao_em_cache_e_invalidada(self):
+        from .models import Agendamento
+
+        self.buscar()
+        with self.assertNumQueries(0):
+            self.buscar()
+
+        Agendamento.objects.create(
+            cliente=self.cliente,
+            servico=self.servico,
+            data_agendamento=self.data,
+            hora_inicio=time(10, 0),
+            criado_por=self.user,
+        )
+        horarios = [horario.time() for horario in self.buscar()]
+        self.assertEqual(horarios, [time(8, 0), time(11, 0)])
+
+    def test_sem_cache_compartilhado_le_sempre_do_banco(self):
+        from django.test import override_settings
+        from .models import Agendamento
+
+        with override_settings(CACHE_SHARED_ACROSS_WORKERS=False):
+            self.buscar()
+            # Agendamento gravado por outro worker: nenhuma invalidação chega aqui
+            Agendamento.objects.update(hora_inicio=time(10, 0), hora_fim=time(11, 0))
+            horarios = [horario.time() for horario in self.buscar()]
+        self.assertEqual(horarios, [time(8, 0), time(8, 30), time(9, 0), time(11, 0)])
+
+    def test_inicio_no_passado_com_fim_no_futuro(self):
+        from datetime import timedelta
+        from .disponibilidade import buscar_horarios_livres
+
+        horarios = buscar_horarios_livres(
+            self.user,
+            self.servico.duracao,
+            self.data - timedelta(days=200),
+            self.data,
+            quantidade=1,
+            passo_minutos=30,
+            expediente=self.expediente,
+        )
+        self.assertEqual(len(horarios), 1)
+
+    def test_endpoint_horarios_livres(self):
+        from django.urls import reverse
+
+        self.client.login(username="livres", password="senha-123")
+        response = self.client.get(
+            reverse("agendamentos:horarios_livres"),
+            {"servico": self.servico.pk, "data_inicio": self.data.isoformat(), "quantidade": 3},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.json()["horarios"]), 3)
+
+        response = self.client.get(reverse("agendamentos:horarios_livres"), {"servico": "x"})
+        self.assertEqual(response.status_code, 400)
+
+
+class RecorrenciaTestCase(TestCase):
+    """Testes da criação de séries recorrentes"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from .models import Agendamento, Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="serie", password="senha-123")
+        self.cliente = Cliente.objects.create(
+            nome="Ana", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Terapia", duracao=timedelta(minutes=50), preco=120, criado_por=self.user
+        )
+        self.inicio = date.today() + timedelta(days=1)
+        self.ocupado = Agendamento.objects.create(
+            cliente=self.cliente,
+            servico=self.servico,
+            data_agendamento=self.inicio + timedelta(weeks=2),
+            hora_inicio=time(14, 30),
+            criado_por=self.user,
+        )
+
+    def test_gerar_datas_mensal_ajusta_fim_do_mes(self):
+        from datetime import date
+        from .recorrencia import gerar_datas_serie
+
+        self.assertEqual(
+            gerar_datas_serie(date(2027, 1, 31), "mensal", 3),
+            [date(2027, 1, 31), date(2027, 2, 28), date(2027, 3, 31)],
+        )
+        self.assertEqual(len(set(gerar_datas_serie(date(2027, 1, 4), "quinzenal", 26))), 26)
+
+    def test_agendamento_concorrente_vira_erro_de_validacao(self):
+        from unittest import mock
+        from django.core.exceptions import ValidationError
+        from .models import Agendamento
+        from . import recorrencia
+
+        # A verificação não vê o agendamento gravado "ao mesmo tempo" por
+        # outra requisição; a restrição única o encontra no bulk_create
+        verificar = recorrencia.verificar_serie
+        chamadas = []
+
+        def verificar_atrasado(*args):
+            chamadas.append(args)
+            return {} if len(chamadas) == 1 else verificar(*args)
+
+        with mock.patch.object(recorrencia, "verificar_serie", verificar_atrasado):
+            with self.assertRaises(ValidationError) as contexto:
+                recorrencia.criar_serie(
+                    self.user, self.cliente, self.servico, self.inicio, time(14, 30), "semanal", 4
+                )
+
+        self.assertIn(self.ocupado.data_agendamento.strftime("%d/%m/%Y"), str(contexto.exception))
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_conflito_bloqueia_serie_inteira(self):
+        from django.core.exceptions import ValidationError
+        from .models import Agendamento
+        from .recorrencia import criar_serie
+
+        with self.assertRaises(ValidationError):
+            criar_serie(
+                self.user, self.cliente, self.servico, self.inicio, time(14, 0), "semanal", 4
+            )
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_serie_anual_com_consultas_constantes(self):
+        from .models import Agendamento
+        from .recorrencia import criar_serie
+
+        # verificação + savepoint/insert/release da série + agregado + savepoint/upsert/release do consolidado
+        with self.assertNumQueries(8):
+            criados, ignorados = criar_serie(
+                self.user,
+                self.cliente,
+                self.servico,
+                self.inicio,
+                time(14, 0),
+                "semanal",
+                52,
+                pular_conflitos=True,
+            )
+
+        self.assertEqual(len(criados), 51)
+        self.assertEqual(ignorados, [self.ocupado.data_agendamento])
+        self.assertEqual(
+            Agendamento.objects.filter(hora_fim=time(14, 50), valor_cobrado=120).count(), 51
+        )
+
+    def test_view_cria_serie(self):
+        from datetime import timedelta
+        from django.urls import reverse
+        from django.utils import timezone
+        from authentication.models import AssinaturaUsuario, Plano
+        from .models import Agendamento
+
+        plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        AssinaturaUsuario.objects.create(
+            usuario=self.user, plano=plano, status="ativa", data_fim=timezone.now() + timedelta(days=30)
+        )
+        self.client.login(username="serie", password="senha-123")
+        self.assertEqual(
+            self.client.get(reverse("agendamentos:agendamento_serie_create")).status_code, 200
+        )
+        response = self.client.post(
+            reverse("agendamentos:agendamento_serie_create"),
+            {
+                "cliente": self.cliente.pk,
+                "servico": self.servico.pk,
+                "data_agendamento": self.inicio.isoformat(),
+                "hora_inicio": "09:00",
+                "frequencia": "mensal",
+                "quantidade": 6,
+            },
+        )
+        self.assertRedirects(response, reverse("agendamentos:agendamento_list"))
+        self.assertEqual(Agendamento.objects.filter(hora_inicio=time(9, 0)).count(), 6)
+
+    def test_view_sem_datas_livres_nao_informa_sucesso(self):
+        from datetime import timedelta
+        from django.urls import reverse
+        from django.utils import timezone
+        from authentication.models import AssinaturaUsuario, Plano
+        from .models import Agendamento
+
+        plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        AssinaturaUsuario.objects.create(
+            usuario=self.user, plano=plano, status="ativa", data_fim=timezone.now() + timedelta(days=30)
+        )
+        self.client.login(username="serie", password="senha-123")
+        response = self.client.post(
+            reverse("agendamentos:agendamento_serie_create"),
+            {
+                "cliente": self.cliente.pk,
+                "servico": self.servico.pk,
+                "data_agendamento": self.ocupado.data_agendamento.isoformat(),
+                "hora_inicio": "14:00",
+                "frequencia": "semanal",
+                "quantidade": 1,
+                "pular_conflitos": "on",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        erros = response.context["form"].non_field_errors()
+        self.assertIn(self.ocupado.data_agendamento.strftime("%d/%m/%Y"), erros[0])
+        mensagens = [str(m) for m in response.context["messages"]]
+        self.assertFalse(any("criados" in m for m in mensagens))
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+
+class EstatisticaDiariaTestCase(TestCase):
+    """Testes do consolidado diário usado pelo dashboard"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from .models import Agendamento, Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="painel", password="senha-123")
+        self.cliente = Cliente.objects.create(
+            nome="Pedro", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Avaliação", duracao=timedelta(minutes=30), preco=80, criado_por=self.user
+        )
+        self.hoje = timezone.now().date()
+        self.agendamento = Agendamento.objects.create(
+            cliente=self.cliente,
+            servico=self.servico,
+            data_agendamento=self.hoje,
+            hora_inicio=time(9, 0),
+            criado_por=self.user,
+        )
+
+    def estatistica(self, data):
+        from .models import EstatisticaDiaria
+
+        return EstatisticaDiaria.objects.filter(usuario=self.user, data=data).first()
+
+    def test_sinais_mantem_consolidado(self):
+        from datetime import timedelta
+
+        stats = self.estatistica(self.hoje)
+        self.assertEqual((stats.total, stats.agendados, stats.faturamento), (1, 1, 0))
+
+        self.agendamento.status = "concluido"
+        self.agendamento.save(skip_date_validation=True)
+        stats = self.estatistica(self.hoje)
+        self.assertEqual((stats.agendados, stats.concluidos, stats.faturamento), (0, 1, 80))
+
+        amanha = self.hoje + timedelta(days=1)
+        self.agendamento.data_agendamento = amanha
+        self.agendamento.save()
+        self.assertIsNone(self.estatistica(self.hoje))
+        self.assertEqual(self.estatistica(amanha).total, 1)
+
+        self.agendamento.delete()
+        self.assertIsNone(self.estatistica(amanha))
+
+    def test_reconstruir_confere_com_sinais(self):
+        from .estatisticas import reconstruir
+        from .models import EstatisticaDiaria
+
+        antes = list(EstatisticaDiaria.objects.values_list("data", "total", "agendados"))
+        EstatisticaDiaria.objects.all().delete()
+        self.assertEqual(reconstruir(), 1)
+        self.assertEqual(
+            list(EstatisticaDiaria.objects.values_list("data", "total", "agendados")), antes
+        )
+
+    def test_dashboard_le_consolidado(self):
+        import json
+        from django.urls import reverse
+
+        self.client.login(username="painel", password="senha-123")
+        response = self.client.get(reverse("agendamentos:dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["agendamentos_hoje"], 1)
+        self.assertEqual(response.context["agendamentos_pendentes"], 1)
+        valores = json.loads(response.context["grafico_agendamentos_dados"]["valores"])
+        self.assertEqual((len(valores), valores[-1]), (30, 1))
+
+
+class RelatoriosFinanceirosTestCase(TestCase):
+    """Testes do cálculo financeiro agregado dos relatórios"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from .models import Agendamento, Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="relatorio", password="senha-123")
+        cliente = Cliente.objects.create(
+            nome="Rita", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        servico = TipoServico.objects.create(
+            nome="Sessão", duracao=timedelta(minutes=30), preco=100, criado_por=self.user
+        )
+        self.inicio = date(2025, 1, 1)
+        self.fim = date(2025, 2, 28)
+        # Janeiro: 100 (preço do serviço) + 50; fevereiro: 3 x 100
+        dias = [(date(2025, 1, 10), time(9, 0), 50), (date(2025, 1, 10), time(10, 0), None)]
+        dias += [(date(2025, 2, dia), time(9, 0), None) for dia in (3, 4, 5)]
+        for data, hora, valor in dias:
+            agendamento = Agendamento(
+                cliente=cliente,
+                servico=servico,
+                data_agendamento=data,
+                hora_inicio=hora,
+                status="concluido",
+                criado_por=self.user,
+                valor_cobrado=valor,
+            )
+            agendamento.save(skip_date_validation=True)
+        # save() preenche valor_cobrado; zera para simular registros antigos
+        Agendamento.objects.filter(valor_cobrado=100).update(valor_cobrado=None)
+
+    def test_resumo_financeiro_em_uma_consulta(self):
+        import json
+        from .models import Agendamento
+        from .relatorios import resumo_financeiro
+
+        agendamentos = Agendamento.objects.filter(criado_por=self.user, status="concluido")
+        with self.assertNumQueries(1):
+            resumo = resumo_financeiro(agendamentos, self.inicio, self.fim)
+
+        kpis = resumo["kpis_financeiros"]
+        self.assertEqual(kpis["faturamento_total"], 450.0)
+        self.assertEqual(kpis["total_agendamentos"], 5)
+        self.assertEqual(kpis["ticket_medio"], 90.0)
+        self.assertEqual(
+            kpis["faturamento_mensal"],
+            [{"mes": "01/2025", "valor": 150.0}, {"mes": "02/2025", "valor": 300.0}],
+        )
+        self.assertEqual(kpis["crescimento_mensal"], 100.0)
+        self.assertEqual(kpis["dias_periodo"], 59)
+
+        valores = json.loads(resumo["faturamento_dados"]["valores"])
+        self.assertEqual(len(valores), 59)
+        self.assertEqual(valores[9], 150.0)
+
+    def test_view_relatorios(self):
+        from django.urls import reverse
+
+        self.client.login(username="relatorio", password="senha-123")
+        response = self.client.get(
+            reverse("agendamentos:relatorios"),
+            {"data_inicio": "2025-01-01", "data_fim": "2025-02-28"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["kpis_financeiros"]["faturamento_total"], 450.0)
+
+
+class RelatoriosCacheTestCase(TestCase):
+    """Testes do cache de relatórios com invalidação por geração"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from .models import Agendamento, Cliente, TipoServico
+
+        cache.clear()
+        self.user = User.objects.create_user(username="cache", password="senha-123")
+        self.cliente = Cliente.objects.create(
+            nome="Caio", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Consulta", duracao=timedelta(minutes=30), preco=70, criado_por=self.user
+        )
+        agendamento = Agendamento(
+            cliente=self.cliente,
+            servico=self.servico,
+            data_agendamento=date(2025, 3, 10),
+            hora_inicio=time(9, 0),
+            status="concluido",
+            criado_por=self.user,
+        )
+        agendamento.save(skip_date_validation=True)
+        self.parametros = {"data_inicio": "2025-03-01", "data_fim": "2025-03-31"}
+        self.client.login(username="cache", password="senha-123")
+
+    def get_relatorio(self):
+        from django.urls import reverse
+
+        return self.client.get(reverse("agendamentos:relatorios"), self.parametros)
+
+    def test_segunda_leitura_nao_consulta_agendamentos(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.get_relatorio()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_relatorio()
+        # Todas as consultas do relatório são agregações (GROUP BY)
+        self.assertFalse(any("GROUP BY" in query["sql"] for query in queries))
+        self.assertEqual(response.context["kpis_financeiros"]["faturamento_total"], 70.0)
+
+    def test_escritas_invalidam_o_cache(self):
+        import json
+
+        self.get_relatorio()
+
+        self.cliente.nome = "Caio Souza"
+        self.cliente.save()
+        clientes = self.get_relatorio().context["clientes_dados"]
+        self.assertEqual(json.loads(clientes["categorias"]), ["Caio Souza"])
+
+        self.servico.preco = 90
+        self.servico.save()
+        from .models import Agendamento
+
+        Agendamento.objects.filter(criado_por=self.user).update(valor_cobrado=None)
+        self.servico.save()  # a atualização em massa não dispara sinais
+        kpis = self.get_relatorio().context["kpis_financeiros"]
+        self.assertEqual(kpis["faturamento_total"], 90.0)
+
+    def test_geracao_independente_por_usuario(self):
+        from .relatorios import geracao_relatorios, invalidar_relatorios
+
+        outro = self.user.pk + 1000
+        antes = geracao_relatorios(self.user.pk), geracao_relatorios(outro)
+        invalidar_relatorios(self.user.pk)
+        self.assertNotEqual(geracao_relatorios(self.user.pk), antes[0])
+        self.assertEqual(geracao_relatorios(outro), antes[1])
+
+    def test_sem_cache_compartilhado_calcula_sempre(self):
+        from django.test import override_settings
+        from .models import Agendamento
+
+        with override_settings(CACHE_SHARED_ACROSS_WORKERS=False):
+            self.get_relatorio()
+            # Escrita feita por outro worker: nenhuma invalidação chega aqui
+            Agendamento.objects.filter(criado_por=self.user).update(valor_cobrado=120)
+            kpis = self.get_relatorio().context["kpis_financeiros"]
+        self.assertEqual(kpis["faturamento_total"], 120.0)
+
+
+class ExportacaoTestCase(TestCase):
+    """Testes da exportação em streaming"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from .models import Agendamento, Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="exporta", password="senha-123")
+        outro = User.objects.create_user(username="outro-exporta")
+        self.cliente = Cliente.objects.create(
+            nome="José, o \"Zé\"", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        Cliente.objects.create(nome="Inativo", telefone="(11) 98888-8888", ativo=False, criado_por=self.user)
+        Cliente.objects.create(nome="Alheio", telefone="(11) 97777-7777", criado_por=outro)
+        servico = TipoServico.objects.create(
+            nome="Massagem", duracao=timedelta(minutes=60), preco=150, criado_por=self.user
+        )
+        for dia, status in ((10, "concluido"), (11, "cancelado"), (12, "concluido")):
+            agendamento = Agendamento(
+                cliente=self.cliente,
+                servico=servico,
+                data_agendamento=date(2025, 6, dia),
+                hora_inicio=time(10, 0),
+                status=status,
+                criado_por=self.user,
+            )
+            agendamento.save(skip_date_validation=True)
+        self.client.login(username="exporta", password="senha-123")
+
+    def exportar(self, nome_url, **parametros):
+        from django.urls import reverse
+
+        response = self.client.get(reverse(nome_url), parametros)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv_agendamentos_respeita_filtros(self):
+        import csv
+        import io
+
+        conteudo = self.exportar("agendamentos:agendamento_export", status="concluido")
+        linhas = list(csv.reader(io.StringIO(conteudo.lstrip("\ufeff"))))
+        self.assertEqual(linhas[0][:3], ["id", "data", "hora_inicio"])
+        self.assertEqual([linha[1] for linha in linhas[1:]], ["2025-06-12", "2025-06-10"])
+        self.assertEqual(linhas[1][4], 'José, o "Zé"')
+        self.assertEqual(linhas[1][8], "150.00")
+
+    def test_csv_neutraliza_formulas(self):
+        import csv
+        import io
+        from .models import Cliente
+
+        cliente = Cliente.objects.create(
+            nome="=HYPERLINK(\"http://x\")", email="soma@x.com", telefone="+55 11 96666-6666",
+            criado_por=self.user,
+        )
+        conteudo = self.exportar("agendamentos:cliente_export")
+        linhas = list(csv.reader(io.StringIO(conteudo.lstrip("\ufeff"))))
+        linha = next(linha for linha in linhas if linha[0] == str(cliente.pk))
+        self.assertEqual(linha[1:4], ['\'=HYPERLINK("http://x")', "soma@x.com", "'+55 11 96666-6666"])
+
+    def test_jsonl_clientes(self):
+        import json
+
+        conteudo = self.exportar("agendamentos:cliente_export", formato="jsonl", status="ativo")
+        registros = [json.loads(linha) for linha in conteudo.splitlines()]
+        self.assertEqual([registro["nome"] for registro in registros], ['José, o "Zé"'])
+        self.assertTrue(registros[0]["ativo"])
+
+    def test_cabecalho_antes_da_consulta(self):
+        from .exportacao import COLUNAS_AGENDAMENTO, linhas_csv
+        from .models import Agendamento
+
+        linhas = linhas_csv(Agendamento.objects.select_related("cliente", "servico"), COLUNAS_AGENDAMENTO)
+        with self.assertNumQueries(0):
+            next(linhas)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(linhas)), 3)
+
+    def test_formato_invalido(self):
+        from django.urls import reverse
+
+        response = self.client.get(reverse("agendamentos:agendamento_export"), {"formato": "xls"})
+        self.assertEqual(response.status_code, 400)
+
+
+class PaginacaoKeysetTestCase(TestCase):
+    """Testes da paginação por keyset das listagens"""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from .models import Cliente
+
+        self.user = User.objects.create_user(username="pagina", password="senha-123")
+        # Nomes repetidos para exercitar o desempate por id
+        Cliente.objects.bulk_create(
+            Cliente(
+                nome=f"Cliente {indice // 2:02d}",
+                telefone="(11) 99999-9999",
+                criado_por=self.user,
+            )
+            for indice in range(45)
+        )
+        self.client.login(username="pagina", password="senha-123")
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        from .models import Cliente
+        from .paginacao import paginar_keyset
+
+        queryset = Cliente.objects.filter(criado_por=self.user)
+        ordenacao = ["nome", "id"]
+        vistos = []
+        paginas = []
+        cursor = None
+        while True:
+            pagina = paginar_keyset(queryset, ordenacao, cursor, tamanho=20)
+            paginas.append(pagina)
+            vistos += [cliente.pk for cliente in pagina]
+            if not pagina.has_next():
+                break
+            cursor = pagina.next_cursor
+
+        esperado = list(queryset.order_by("nome", "id").values_list("pk", flat=True))
+        self.assertEqual(vistos, esperado)
+        self.assertEqual([len(pagina) for pagina in paginas], [20, 20, 5])
+
+        # Voltando a partir da última página chega-se à segunda
+        anterior = paginar_keyset(
+            queryset, ordenacao, paginas[-1].previous_cursor, "anterior", tamanho=20
+        )
+        self.assertEqual(list(anterior), list(paginas[1]))
+        self.assertTrue(anterior.has_previous())
+
+    def test_ordenacao_descendente_composta(self):
+        from datetime import date, timedelta
+        from .models import Agendamento, Cliente, TipoServico
+        from .paginacao import paginar_keyset
+
+        cliente = Cliente.objects.filter(criado_por=self.user).first()
+        servico = TipoServico.objects.create(
+            nome="Corte", duracao=timedelta(minutes=30), preco=40, criado_por=self.user
+        )
+        Agendamento.objects.bulk_create(
+            Agendamento(
+                cliente=cliente,
+                servico=servico,
+                data_agendamento=date(2025, 1, 1) + timedelta(days=indice // 3),
+                hora_inicio=time(8 + indice % 3, 0),
+                hora_fim=time(8 + indice % 3, 30),
+                criado_por=self.user,
+            )
+            for indice in range(10)
+        )
+        ordenacao = ["-data_agendamento", "-hora_inicio", "-id"]
+        queryset = Agendamento.objects.filter(criado_por=self.user)
+        primeira = paginar_keyset(queryset, ordenacao, tamanho=4)
+        segunda = paginar_keyset(queryset, ordenacao, primeira.next_cursor, tamanho=4)
+        esperado = list(queryset.order_by(*ordenacao))
+        self.assertEqual(list(primeira) + list(segunda), esperado[:8])
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        from .models import Cliente
+        from .paginacao import paginar_keyset
+
+        pagina = paginar_keyset(
+            Cliente.objects.filter(criado_por=self.user), ["nome", "id"], "%%lixo%%"
+        )
+        self.assertFalse(pagina.has_previous())
+
+    def test_cursor_com_valores_invalidos_volta_para_primeira_pagina(self):
+        from datetime import date
+        from django.urls import reverse
+        from .models import Agendamento
+        from .paginacao import codificar_cursor, decodificar_cursor
+
+        ordenacao = ["-data_agendamento", "-hora_inicio", "-id"]
+        cursor = codificar_cursor(["2025-13-99", "10:00", "x"])
+        self.assertIsNone(decodificar_cursor(cursor, Agendamento, ordenacao))
+        self.assertEqual(
+            decodificar_cursor(codificar_cursor(["2025-01-02", "10:00", "7"]), Agendamento, ordenacao),
+            [date(2025, 1, 2), time(10, 0), 7],
+        )
+
+        response = self.client.get(reverse("agendamentos:agendamento_list"), {"cursor": cursor})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse("agendamentos:cliente_autocomplete"), {"cursor": codificar_cursor(["a", "x"])}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_clientes(self):
+        from django.urls import reverse
+
+        url = reverse("agendamentos:cliente_list")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["clientes"]), 20)
+        self.assertEqual(response.context["total_clientes"], 45)
+        self.assertIsNone(response.context["url_pagina_anterior"])
+
+        response = self.client.get(url + response.context["url_proxima_pagina"])
+        self.assertEqual(response.context["clientes"][0].nome, "Cliente 10")
+        self.assertIsNotNone(response.context["url_pagina_anterior"])
+
+    def test_contagem_limitada(self):
+        from unittest import mock
+        from django.urls import reverse
+        from .paginacao import KeysetPaginationMixin
+
+        with mock.patch.object(KeysetPaginationMixin, "limite_contagem", 30):
+            response = self.client.get(reverse("agendamentos:cliente_list"))
+        self.assertEqual(response.context["total_clientes"], 30)
+        self.assertTrue(response.context["total_aproximado"])
+        self.assertContains(response, "mais de 30")
+
+
+class BuscaTestCase(TestCase):
+    """Testes da busca normalizada (sem acentos, dígitos de telefone/CPF)"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from .models import Agendamento, Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="busca", password="senha-123")
+        self.joao = Cliente.objects.create(
+            nome="João Conceição",
+            email="Joao@Example.com",
+            telefone="(11) 98765-4321",
+            cpf="123.456.789-09",
+            criado_por=self.user,
+        )
+        self.maria = Cliente.objects.create(
+            nome="Maria Souza", telefone="(21) 91234-5678", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Depilação", duracao=timedelta(minutes=30), preco=60, criado_por=self.user
+        )
+        self.agendamento = Agendamento(
+            cliente=self.maria,
+            servico=self.servico,
+            data_agendamento=date(2025, 5, 5),
+            hora_inicio=time(9, 0),
+            criado_por=self.user,
+        )
+        self.agendamento.save(skip_date_validation=True)
+
+    def buscar_clientes(self, termo):
+        from .busca import buscar
+        from .models import Cliente
+
+        return list(buscar(Cliente.objects.filter(criado_por=self.user), termo))
+
+    def test_texto_normalizado(self):
+        self.assertEqual(
+            self.joao.busca,
+            "joao conceicao joao@example.com 11987654321 12345678909",
+        )
+
+    def test_busca_sem_acento_e_por_digitos(self):
+        self.assertEqual(self.buscar_clientes("joao"), [self.joao])
+        self.assertEqual(self.buscar_clientes("CONCEIÇÃO jo"), [self.joao])
+        self.assertEqual(self.buscar_clientes("98765-4321"), [self.joao])
+        self.assertEqual(self.buscar_clientes("123.456.789-09"), [self.joao])
+        self.assertEqual(self.buscar_clientes("souza joao"), [])
+
+    def test_atualizacao_reflete_no_indice(self):
+        self.joao.nome = "Joana Prado"
+        self.joao.save()
+        self.assertEqual(self.buscar_clientes("prado"), [self.joao])
+        self.assertEqual(self.buscar_clientes("conceicao"), [])
+        self.joao.delete()
+        self.assertEqual(self.buscar_clientes("prado"), [])
+
+    def test_indice_fts_no_sqlite(self):
+        from django.db import connection
+        from .busca import tabela_fts
+        from .models import Cliente
+
+        if connection.vendor != "sqlite":
+            self.skipTest("FTS5 apenas no SQLite")
+        self.assertEqual(tabela_fts(Cliente), "agendamentos_cliente_busca")
+
+    def test_busca_de_agendamentos_e_servicos(self):
+        from .busca import buscar
+        from .models import Agendamento, TipoServico
+
+        agendamentos = Agendamento.objects.filter(criado_por=self.user)
+        self.assertEqual(list(buscar(agendamentos, "depilacao")), [self.agendamento])
+        self.assertEqual(list(buscar(agendamentos, "maria")), [self.agendamento])
+        self.assertEqual(list(buscar(agendamentos, "joao")), [])
+        servicos = TipoServico.objects.filter(criado_por=self.user)
+        self.assertEqual(list(buscar(servicos, "DEPILAÇÃO")), [self.servico])
+
+    def test_view_clientes_usa_busca(self):
+        from django.urls import reverse
+
+        self.client.login(username="busca", password="senha-123")
+        response = self.client.get(reverse("agendamentos:cliente_list"), {"search": "joão"})
+        self.assertEqual(list(response.context["clientes"]), [self.joao])
+
+
+class AutocompleteTestCase(TestCase):
+    """Testes do autocomplete de clientes/serviços e do widget assíncrono"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from .models import Cliente, TipoServico
+
+        self.user = User.objects.create_user(username="auto", password="senha-123")
+        outro = User.objects.create_user(username="auto-outro")
+        self.clientes = [
+            Cliente.objects.create(
+                nome=f"Ana {indice:02d}", telefone="(11) 99999-9999", criado_por=self.user
+            )
+            for indice in range(25)
+        ]
+        Cliente.objects.create(
+            nome="Ana Inativa", telefone="(11) 99999-9999", ativo=False, criado_por=self.user
+        )
+        Cliente.objects.create(nome="Ana Alheia", telefone="(11) 99999-9999", criado_por=outro)
+        self.servico = TipoServico.objects.create(
+            nome="Escova", duracao=timedelta(minutes=45), preco=55, criado_por=self.user
+        )
+        self.client.login(username="auto", password="senha-123")
+
+    def test_autocomplete_paginado_e_restrito_ao_usuario(self):
+        from django.urls import reverse
+
+        url = reverse("agendamentos:cliente_autocomplete")
+        dados = self.client.get(url, {"q": "ana"}).json()
+        self.assertEqual(len(dados["results"]), 20)
+        self.assertEqual(dados["results"][0]["text"], str(self.clientes[0]))
+
+        dados = self.client.get(url, {"q": "ana", "cursor": dados["next"]}).json()
+        nomes = [item["text"].split(" - ")[0] for item in dados["results"]]
+        self.assertEqual(nomes, [f"Ana {indice:02d}" for indice in range(20, 25)])
+        self.assertIsNone(dados["next"])
+
+    def test_autocomplete_servico_inclui_preco(self):
+        from django.urls import reverse
+
+        dados = self.client.get(
+            reverse("agendamentos:servico_autocomplete"), {"q": "esc"}
+        ).json()
+        self.assertEqual(dados["results"][0]["preco"], "55.00")
+
+    def test_formulario_renderiza_apenas_o_selecionado(self):
+        from .forms import AgendamentoForm
+
+        form = AgendamentoForm(user=self.user, initial={"cliente": self.clientes[3].pk})
+        html = str(form["cliente"])
+        self.assertIn("data-autocomplete-url", html)
+        self.assertIn(str(self.clientes[3]), html)
+        self.assertNotIn(str(self.clientes[4]), html)
+        self.assertIn("js/autocomplete.js", str(form.media))
+
+    def test_formulario_valida_com_o_queryset(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .forms import AgendamentoForm
+        from .models import Cliente
+
+        inativo = Cliente.objects.get(nome="Ana Inativa")
+        dados = {
+            "cliente": inativo.pk,
+            "servico": self.servico.pk,
+            "data_agendamento": timezone.now().date() + timedelta(days=1),
+            "hora_inicio": "10:00",
+        }
+        self.assertIn("cliente", AgendamentoForm(dados, user=self.user).errors)
+        dados["cliente"] = self.clientes[0].pk
+        self.assertTrue(AgendamentoForm(dados, user=self.user).is_valid())
+
+
+class AgendamentosPendentesTestCase(TestCase):
+    """Testes do contador de pendentes em cache (badge da navbar)"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from django.utils import timezone
+        from .models import Cliente, TipoServico
+
+        cache.clear()
+        self.user = User.objects.create_user(username="badge", password="senha-123")
+        self.cliente = Cliente.objects.create(
+            nome="Rita", telefone="(11) 97777-0000", criado_por=self.user
+        )
+        self.servico = TipoServico.objects.create(
+            nome="Sessão", duracao=timedelta(minutes=30), preco=50, criado_por=self.user
+        )
+        self.hoje = timezone.now().date()
+
+    def criar(self, hora):
+        from .models import Agendamento
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return Agendamento.objects.create(
+                cliente=self.cliente,
+                servico=self.servico,
+                data_agendamento=self.hoje,
+                hora_inicio=time(hora, 0),
+                criado_por=self.user,
+            )
+
+    def test_contador_ajustado_pelos_sinais_sem_consulta(self):
+        from .models import Agendamento
+        from .pendentes import contar_pendentes
+
+        self.assertEqual(contar_pendentes(self.user.pk), 0)
+        primeiro = self.criar(9)
+        self.criar(10)
+        with self.assertNumQueries(0):
+            self.assertEqual(contar_pendentes(self.user.pk), 2)
+
+        primeiro = Agendamento.objects.get(pk=primeiro.pk)
+        primeiro.status = "concluido"
+        with self.captureOnCommitCallbacks(execute=True):
+            primeiro.save(skip_date_validation=True)
+        primeiro.observacoes = "sem mudar status"
+        with self.captureOnCommitCallbacks(execute=True):
+            primeiro.save(skip_date_validation=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(contar_pendentes(self.user.pk), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Agendamento.objects.filter(status="agendado").get().delete()
+        self.assertEqual(contar_pendentes(self.user.pk), 0)
+
+    def test_reconciliacao_corrige_divergencia(self):
+        from io import StringIO
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from .pendentes import chave_pendentes, contar_pendentes
+
+        self.criar(9)
+        contar_pendentes(self.user.pk)
+        cache.set(chave_pendentes(self.user.pk), 7)
+
+        saida = StringIO()
+        call_command("reconciliar_agendamentos_pendentes", stdout=saida)
+        self.assertIn(f"Usuário {self.user.pk}: 7 -> 1", saida.getvalue())
+        self.assertEqual(contar_pendentes(self.user.pk), 1)
+
+    def test_reconciliacao_em_lotes(self):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from . import pendentes
+        from .pendentes import chave_pendentes, contar_pendentes, reconciliar_pendentes
+
+        outro = User.objects.create_user(username="badge2", password="senha-123")
+        self.criar(9)
+        contar_pendentes(self.user.pk)
+        cache.set(chave_pendentes(self.user.pk), 3)
+        cache.set(chave_pendentes(outro.pk), 2)
+
+        with mock.patch.object(pendentes, "LOTE_RECONCILIACAO", 1):
+            corrigidos = reconciliar_pendentes()
+        self.assertEqual(corrigidos, {self.user.pk: (3, 1), outro.pk: (2, 0)})
+        self.assertEqual(cache.get(chave_pendentes(outro.pk)), 0)
+
+    def test_sem_cache_compartilhado_conta_no_banco(self):
+        from django.test import override_settings
+        from .models import Agendamento
+        from .pendentes import contar_pendentes
+
+        self.criar(9)
+        self.assertEqual(contar_pendentes(self.user.pk), 1)
+        with override_settings(CACHE_SHARED_ACROSS_WORKERS=False):
+            # Agendamento gravado por outro worker: o ajuste não chega aqui
+            Agendamento.objects.update(status="concluido")
+            with self.assertNumQueries(1):
+                self.assertEqual(contar_pendentes(self.user.pk), 0)
+
+
+class PerfilConsultasTestCase(TestCase):
+    """Testes do perfil de consultas (core.perfil_consultas) e dos N+1 corrigidos"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from authentication.models import AssinaturaUsuario, Plano
+        from .models import Cliente
+
+        self.user = User.objects.create_user(
+            username="perfil", password="senha-123", is_staff=True, is_superuser=True
+        )
+        plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        AssinaturaUsuario.objects.create(
+            usuario=self.user, plano=plano, status="ativa", data_fim=timezone.now() + timedelta(days=30)
+        )
+        self.cliente = Cliente.objects.create(
+            nome="Rita", telefone="(11) 99999-9999", criado_por=self.user
+        )
+        self.hoje = timezone.localdate()
+        self.criados = 0
+        self.client.login(username="perfil", password="senha-123")
+
+    def criar_agendamentos(self, quantidade):
+        from datetime import time, timedelta
+        from .models import Agendamento, TipoServico
+
+        for _ in range(quantidade):
+            indice = self.criados
+            self.criados += 1
+            # Um serviço por agendamento: o N+1 apareceria como uma consulta por linha
+            servico = TipoServico.objects.create(
+                nome=f"Serviço {indice}", duracao=timedelta(minutes=30), preco=50, criado_por=self.user
+            )
+            Agendamento.objects.create(
+                cliente=self.cliente,
+                servico=servico,
+                data_agendamento=self.hoje + timedelta(days=indice % 3),
+                hora_inicio=time(8 + indice % 10, 0),
+                status="concluido" if indice % 2 else "agendado",
+                criado_por=self.user,
+            )
+
+    def consultas(self, url):
+        from core.perfil_consultas import orcamento_de_consultas
+
+        self.client.get(url)  # consolidados e caches já aquecidos
+        with orcamento_de_consultas(1000) as perfil:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return perfil
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        from django.urls import reverse
+
+        urls = [
+            reverse("agendamentos:dashboard"),
+            reverse("agendamentos:cliente_detail", args=[self.cliente.pk]),
+            reverse("admin:agendamentos_agendamento_changelist"),
+        ]
+        self.criar_agendamentos(2)
+        poucas = [self.consultas(url).total for url in urls]
+        self.criar_agendamentos(6)
+        muitas = [self.consultas(url) for url in urls]
+        self.assertEqual([perfil.total for perfil in muitas], poucas)
+        for perfil in muitas:
+            self.assertEqual(perfil.repetidas(), [])
+
+    def test_cabecalho_e_orcamento_da_view(self):
+        from django.test import override_settings
+        from django.urls import reverse
+        from core.perfil_consultas import CABECALHO, ConsultasAcimaDoOrcamento
+
+        url = reverse("agendamentos:cliente_detail", args=[self.cliente.pk])
+        self.criar_agendamentos(3)
+
+        with override_settings(QUERY_PROFILER_ENABLED=True, QUERY_BUDGET_RAISE=False):
+            response = self.client.get(url)
+        self.assertRegex(response[CABECALHO], r"^count=\d+; time_ms=[\d.]+; duplicates=0; repeated=0; budget=\d+$")
+
+        with override_settings(
+            QUERY_BUDGETS={"agendamentos:cliente_detail": 2}, QUERY_BUDGET_RAISE=True
+        ):
+            with self.assertRaisesMessage(ConsultasAcimaDoOrcamento, "(orçamento: 2)"):
+                self.client.get(url)
+
+    def test_impressao_digital_detecta_n_mais_1(self):
+        from core.perfil_consultas import PerfilConsultas, impressao_digital
+        from .models import Agendamento
+
+        self.assertEqual(
+            impressao_digital('SELECT "a" FROM "t" WHERE "id" IN (%s, %s,\n %s) AND "x" = \'y\' LIMIT 21'),
+            'SELECT "a" FROM "t" WHERE "id" IN (...) AND "x" = ? LIMIT ?',
+        )
+
+        self.criar_agendamentos(4)
+        perfil = PerfilConsultas()
+        with perfil.medir():
+            for agendamento in Agendamento.objects.all():
+                str(agendamento)  # __str__ acessa agendamento.cliente
+                agendamento.servico
+        self.assertEqual(perfil.total, 9)
+        # cliente: a mesma consulta idêntica 4 vezes; servico: 4 ids diferentes
+        self.assertEqual(perfil.duplicadas, 3)
+        self.assertEqual([vezes for _, vezes in perfil.repetidas()], [4, 4])
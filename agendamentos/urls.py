@@ -10,6 +10,7 @@ urlpatterns = [
     
     # Clientes
     path('clientes/', views.ClienteListView.as_view(), name='cliente_list'),
+    path('clientes/exportar/', views.ClienteExportView.as_view(), name='cliente_export'),
     path('clientes/criar/', views.ClienteCreateView.as_view(), name='cliente_create'),
     path('clientes/<int:pk>/', views.ClienteDetailView.as_view(), name='cliente_detail'),
     path('clientes/<int:pk>/editar/', views.ClienteUpdateView.as_view(), name='cliente_update'),
@@ -23,12 +24,19 @@ urlpatterns = [
     
     # Agendamentos
     path('agendamentos/', views.AgendamentoListView.as_view(), name='agendamento_list'),
+    path('agendamentos/exportar/', views.AgendamentoExportView.as_view(), name='agendamento_export'),
     path('agendamentos/criar/', views.AgendamentoCreateView.as_view(), name='agendamento_create'),
+    path('agendamentos/serie/criar/', views.AgendamentoSerieCreateView.as_view(), name='agendamento_serie_create'),
     path('agendamentos/<int:pk>/', views.AgendamentoDetailView.as_view(), name='agendamento_detail'),
     path('agendamentos/<int:pk>/editar/', views.AgendamentoUpdateView.as_view(), name='agendamento_update'),
     path('agendamentos/<int:pk>/deletar/', views.AgendamentoDeleteView.as_view(), name='agendamento_delete'),
     path('agendamentos/<int:pk>/status/', views.AgendamentoStatusUpdateView.as_view(), name='agendamento_status'),
 
+    # APIs de agenda
+    path('api/horarios-livres/', views.HorariosLivresView.as_view(), name='horarios_livres'),
+    path('api/clientes/autocomplete/', views.ClienteAutocompleteView.as_view(), name='cliente_autocomplete'),
+    path('api/servicos/autocomplete/', views.TipoServicoAutocompleteView.as_view(), name='servico_autocomplete'),
+
     # Relatorios
     path('relatorios/', views.RelatoriosView.as_view(), name='relatorios'),
     
@@ -9,18 +9,37 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
     DetailView,
+    FormView,
     View,
 )
 from authentication.mixins import SubscriptionRequiredMixin, ReadOnlyForExpiredMixin
-from django.db.models import Q, Count, Sum
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
 from django.utils import timezone
 from django.http import JsonResponse
+from django.core.exceptions import ValidationError
 from datetime import datetime, timedelta
 
 import json
 from .models import Cliente, TipoServico, Agendamento, StatusAgendamento
-from .forms import ClienteForm, TipoServicoForm, AgendamentoForm, AgendamentoStatusForm
-from django.db.models.functions import TruncMonth
+from .forms import (
+    ClienteForm,
+    TipoServicoForm,
+    AgendamentoForm,
+    AgendamentoSerieForm,
+    AgendamentoStatusForm,
+)
+from .busca import buscar
+from .disponibilidade import buscar_horarios_livres
+from .estatisticas import resumo_dashboard
+from .exportacao import (
+    COLUNAS_AGENDAMENTO,
+    COLUNAS_CLIENTE,
+    FORMATOS_EXPORTACAO,
+    resposta_exportacao,
+)
+from .paginacao import KeysetPaginationMixin, paginar_keyset
+from .relatorios import relatorio_em_cache, resumo_financeiro
 
 # ========================================
 # VIEWS PRINCIPAIS
@@ -54,25 +73,17 @@ class DashboardView(LoginRequiredMixin, ReadOnlyForExpiredMixin, TemplateView):
 
         # Data atual
         hoje = timezone.now().date()
-        inicio_semana = hoje - timedelta(days=hoje.weekday())
-        fim_semana = inicio_semana + timedelta(days=6)
-        inicio_mes = hoje.replace(day=1)
+
+        # Estatísticas básicas a partir do consolidado diário (uma única leitura)
+        resumo = resumo_dashboard(user, hoje)
+        context["agendamentos_hoje"] = resumo["agendamentos_hoje"]
+        context["agendamentos_semana"] = resumo["agendamentos_semana"]
+        context["total_clientes"] = Cliente.objects.filter(criado_por=user).count()
+        context["agendamentos_pendentes"] = resumo["agendamentos_pendentes"]
 
         # Queryset base
         agendamentos = Agendamento.objects.filter(criado_por=user)
 
-        # Estatísticas básicas
-        context["agendamentos_hoje"] = agendamentos.filter(
-            data_agendamento=hoje
-        ).count()
-        context["agendamentos_semana"] = agendamentos.filter(
-            data_agendamento__range=[inicio_semana, fim_semana]
-        ).count()
-        context["total_clientes"] = Cliente.objects.filter(criado_por=user).count()
-        context["agendamentos_pendentes"] = agendamentos.filter(
-            status="agendado"
-        ).count()
-
         # NOVO: Agendamentos de hoje com detalhes para o dashboard
         context["agendamentos_hoje_detalhes"] = agendamentos.filter(
             data_agendamento=hoje
@@ -81,19 +92,14 @@ class DashboardView(LoginRequiredMixin, ReadOnlyForExpiredMixin, TemplateView):
         # Próximos agendamentos
         context["proximos_agendamentos"] = agendamentos.filter(
             data_agendamento__gte=hoje
-        ).order_by("data_agendamento", "hora_inicio")[:5]
+        ).select_related("cliente", "servico").order_by("data_agendamento", "hora_inicio")[:5]
 
         # Estatísticas do mês
-        agendamentos_mes = agendamentos.filter(data_agendamento__gte=inicio_mes)
-        context["agendamentos_mes_realizados"] = agendamentos_mes.filter(
-            status="concluido"
-        ).count()
-        context["agendamentos_mes_cancelados"] = agendamentos_mes.filter(
-            status__in=["cancelado", "nao_compareceu"]
-        ).count()
+        context["agendamentos_mes_realizados"] = resumo["agendamentos_mes_realizados"]
+        context["agendamentos_mes_cancelados"] = resumo["agendamentos_mes_cancelados"]
 
         # Taxa de comparecimento
-        total_mes = agendamentos_mes.count()
+        total_mes = resumo["total_mes"]
         if total_mes > 0:
             context["taxa_comparecimento"] = round(
                 (context["agendamentos_mes_realizados"] / total_mes) * 100, 1
@@ -102,51 +108,16 @@ class DashboardView(LoginRequiredMixin, ReadOnlyForExpiredMixin, TemplateView):
             context["taxa_comparecimento"] = 0
 
         # Dados para gráfico de agendamentos por dia (últimos 30 dias)
-        context["grafico_agendamentos_dados"] = self.get_agendamentos_por_dia(user)
+        context["grafico_agendamentos_dados"] = {
+            "categorias": json.dumps(resumo["grafico_categorias"]),
+            "valores": json.dumps(resumo["grafico_valores"]),
+        }
 
         # Dados para outros contextos
         context["today"] = hoje
 
         return context
 
-    def get_agendamentos_por_dia(self, user):
-        """Gera dados para gráfico de agendamentos por dia"""
-        hoje = timezone.now().date()
-        inicio_periodo = hoje - timedelta(days=29)  # Últimos 30 dias
-
-        # Buscar agendamentos do período
-        agendamentos = (
-            Agendamento.objects.filter(
-                criado_por=user, data_agendamento__range=[inicio_periodo, hoje]
-            )
-            .values("data_agendamento")
-            .annotate(total=Count("id"))
-            .order_by("data_agendamento")
-        )
-
-        # Criar lista de todos os dias do período
-        dados = {}
-        data_atual = inicio_periodo
-        while data_atual <= hoje:
-            dados[data_atual.strftime("%Y-%m-%d")] = 0
-            data_atual += timedelta(days=1)
-
-        # Preencher com dados reais
-        for item in agendamentos:
-            data_str = item["data_agendamento"].strftime("%Y-%m-%d")
-            dados[data_str] = item["total"]
-
-        # Preparar dados para o gráfico
-        categorias = []
-        valores = []
-
-        for data_str, total in dados.items():
-            data_obj = datetime.strptime(data_str, "%Y-%m-%d").date()
-            categorias.append(data_obj.strftime("%d/%m"))
-            valores.append(total)
-
-        return {"categorias": json.dumps(categorias), "valores": json.dumps(valores)}
-
 
 class RelatoriosView(LoginRequiredMixin, TemplateView):
     """View para relatórios avançados com gráficos"""
@@ -180,24 +151,30 @@ class RelatoriosView(LoginRequiredMixin, TemplateView):
             status="concluido",  # Apenas agendamentos concluídos para relatórios
         )
 
-        # Gráfico de serviços mais realizados
-        context["servicos_dados"] = self.get_servicos_mais_realizados(agendamentos)
-
-        # Gráfico de clientes mais frequentes
-        context["clientes_dados"] = self.get_clientes_mais_frequentes(agendamentos)
-
-        # Gráfico de faturamento por dia
-        context["faturamento_dados"] = self.get_faturamento_por_dia(
-            agendamentos, inicio_periodo, hoje
-        )
-
-        # KPIs financeiros
-        context["kpis_financeiros"] = self.get_kpis_financeiros(
-            agendamentos, inicio_periodo, hoje
+        # Resultado em cache por usuário/período (invalidado a cada escrita)
+        context.update(
+            relatorio_em_cache(
+                user.pk,
+                inicio_periodo,
+                hoje,
+                lambda: self.calcular_relatorio(agendamentos, inicio_periodo, hoje),
+            )
         )
 
         return context
 
+    def calcular_relatorio(self, agendamentos, inicio, fim):
+        """Calcula todos os dados do relatório do período"""
+        relatorio = {
+            # Gráfico de serviços mais realizados
+            "servicos_dados": self.get_servicos_mais_realizados(agendamentos),
+            # Gráfico de clientes mais frequentes
+            "clientes_dados": self.get_clientes_mais_frequentes(agendamentos),
+        }
+        # Faturamento por dia e KPIs financeiros (uma única consulta agregada)
+        relatorio.update(resumo_financeiro(agendamentos, inicio, fim))
+        return relatorio
+
     def get_servicos_mais_realizados(self, agendamentos):
         """Dados para gráfico de pizza dos serviços mais realizados"""
         servicos = (
@@ -229,130 +206,22 @@ class RelatoriosView(LoginRequiredMixin, TemplateView):
 
         return {"categorias": json.dumps(categorias), "valores": json.dumps(valores)}
 
-    def get_faturamento_por_dia(self, agendamentos, inicio, fim):
-        """Dados para gráfico de faturamento por dia"""
-        # Agrupar por data e somar valores
-        faturamento = (
-            agendamentos.values("data_agendamento")
-            .annotate(total=Sum("valor_cobrado"))
-            .order_by("data_agendamento")
-        )
-
-        # Criar dicionário com todas as datas
-        dados = {}
-        data_atual = inicio
-        while data_atual <= fim:
-            dados[data_atual.strftime("%Y-%m-%d")] = 0
-            data_atual += timedelta(days=1)
-
-        # Preencher com dados reais
-        for item in faturamento:
-            if item["total"]:
-                data_str = item["data_agendamento"].strftime("%Y-%m-%d")
-                dados[data_str] = float(item["total"])
-            else:
-                # Se valor_cobrado for None, usar preço do serviço
-                agendamento_item = agendamentos.filter(
-                    data_agendamento=item["data_agendamento"]
-                ).first()
-                if agendamento_item:
-                    data_str = item["data_agendamento"].strftime("%Y-%m-%d")
-                    dados[data_str] = float(agendamento_item.servico.preco)
-
-        categorias = []
-        valores = []
-
-        for data_str, valor in dados.items():
-            data_obj = datetime.strptime(data_str, "%Y-%m-%d").date()
-            categorias.append(data_obj.strftime("%d/%m"))
-            valores.append(valor)
-
-        return {"categorias": json.dumps(categorias), "valores": json.dumps(valores)}
-
-    def get_kpis_financeiros(self, agendamentos, inicio, fim):
-        """KPIs financeiros do período - CORRIGIDO para SQLite"""
-        # Faturamento total
-        total_valor_cobrado = (
-            agendamentos.filter(valor_cobrado__isnull=False).aggregate(
-                total=Sum("valor_cobrado")
-            )["total"]
-            or 0
-        )
-
-        # Para agendamentos sem valor_cobrado, usar preço do serviço
-        agendamentos_sem_valor = agendamentos.filter(valor_cobrado__isnull=True)
-        total_preco_servico = 0
-        for agendamento in agendamentos_sem_valor:
-            total_preco_servico += float(agendamento.servico.preco)
-
-        faturamento_total = float(total_valor_cobrado) + total_preco_servico
-
-        # Ticket médio
-        total_agendamentos = agendamentos.count()
-        ticket_medio = (
-            faturamento_total / total_agendamentos if total_agendamentos > 0 else 0
-        )
-
-        # Faturamento por mês usando TruncMonth (compatível com SQLite)
-        meses = (
-            agendamentos.annotate(mes=TruncMonth("data_agendamento"))
-            .values("mes")
-            .annotate(total_valor=Sum("valor_cobrado"), count_agendamentos=Count("id"))
-            .order_by("mes")
-        )
-
-        faturamento_mensal = []
-        for item in meses:
-            mes_obj = item["mes"]
-            valor_cobrado = float(item["total_valor"] or 0)
-
-            # Calcular valor dos serviços sem valor_cobrado neste mês
-            agendamentos_mes_sem_valor = agendamentos.filter(
-                data_agendamento__year=mes_obj.year,
-                data_agendamento__month=mes_obj.month,
-                valor_cobrado__isnull=True,
-            )
-
-            valor_servicos = 0
-            for agendamento in agendamentos_mes_sem_valor:
-                valor_servicos += float(agendamento.servico.preco)
-
-            valor_total_mes = valor_cobrado + valor_servicos
-
-            faturamento_mensal.append(
-                {"mes": mes_obj.strftime("%m/%Y"), "valor": valor_total_mes}
-            )
-
-        # Crescimento mensal
-        crescimento = 0
-        if len(faturamento_mensal) >= 2:
-            ultimo = faturamento_mensal[-1]["valor"]
-            penultimo = faturamento_mensal[-2]["valor"]
-            if penultimo > 0:
-                crescimento = ((ultimo - penultimo) / penultimo) * 100
-
-        return {
-            "faturamento_total": faturamento_total,
-            "ticket_medio": ticket_medio,
-            "total_agendamentos": total_agendamentos,
-            "faturamento_mensal": faturamento_mensal,
-            "crescimento_mensal": round(crescimento, 1),
-            "dias_periodo": (fim - inicio).days + 1,
-        }
-
 
 # ========================================
 # VIEWS DE CLIENTES
 # ========================================
 
 
-class ClienteListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView):
+class ClienteListView(
+    LoginRequiredMixin, ReadOnlyForExpiredMixin, KeysetPaginationMixin, ListView
+):
     """Lista todos os clientes do usuário"""
 
     model = Cliente
     template_name = "agendamentos/cliente_list.html"
     context_object_name = "clientes"
     paginate_by = 20
+    ordenacao_keyset = ["nome", "id"]
 
     def get_queryset(self):
         queryset = Cliente.objects.filter(criado_por=self.request.user)
@@ -360,12 +229,7 @@ class ClienteListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView):
         # Filtro de busca
         search = self.request.GET.get("search")
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search)
-                | Q(email__icontains=search)
-                | Q(telefone__icontains=search)
-                | Q(cpf__icontains=search)
-            )
+            queryset = buscar(queryset, search)
 
         # Filtro de status
         status = self.request.GET.get("status")
@@ -374,13 +238,13 @@ class ClienteListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView):
         elif status == "inativo":
             queryset = queryset.filter(ativo=False)
 
-        return queryset.order_by("nome")
+        return queryset.order_by(*self.ordenacao_keyset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["search"] = self.request.GET.get("search", "")
         context["status"] = self.request.GET.get("status", "")
-        context["total_clientes"] = self.get_queryset().count()
+        context["total_clientes"], context["total_aproximado"] = self.get_total()
         return context
 
 
@@ -418,23 +282,34 @@ class ClienteDetailView(LoginRequiredMixin, ReadOnlyForExpiredMixin, DetailView)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cliente = self.get_object()
+        cliente = self.object
 
         # Histórico de agendamentos
-        context["agendamentos"] = Agendamento.objects.filter(cliente=cliente).order_by(
-            "-data_agendamento", "-hora_inicio"
-        )[:10]
+        context["agendamentos"] = list(
+            Agendamento.objects.filter(cliente=cliente)
+            .select_related("servico")
+            .order_by("-data_agendamento", "-hora_inicio")[:10]
+        )
 
-        # Estatísticas do cliente
-        context["total_agendamentos"] = Agendamento.objects.filter(
-            cliente=cliente
-        ).count()
-        context["agendamentos_concluidos"] = Agendamento.objects.filter(
-            cliente=cliente, status="concluido"
-        ).count()
-        context["agendamentos_cancelados"] = Agendamento.objects.filter(
-            cliente=cliente, status__in=["cancelado", "nao_compareceu"]
-        ).count()
+        # Estatísticas e informações financeiras em uma única consulta
+        concluidos = Q(status="concluido")
+        estatisticas = Agendamento.objects.filter(cliente=cliente).aggregate(
+            total=Count("id"),
+            concluidos=Count("id", filter=concluidos),
+            cancelados=Count("id", filter=Q(status__in=["cancelado", "nao_compareceu"])),
+            # Sem valor cobrado (ou zerado), vale o preço do serviço
+            total_faturado=Sum(
+                Coalesce(
+                    NullIf("valor_cobrado", Value(0, output_field=DecimalField())),
+                    "servico__preco",
+                ),
+                filter=concluidos,
+            ),
+            ultima_visita=Max("data_agendamento", filter=concluidos),
+        )
+        context["total_agendamentos"] = estatisticas["total"]
+        context["agendamentos_concluidos"] = estatisticas["concluidos"]
+        context["agendamentos_cancelados"] = estatisticas["cancelados"]
 
         # Taxa de comparecimento
         if context["total_agendamentos"] > 0:
@@ -446,26 +321,12 @@ class ClienteDetailView(LoginRequiredMixin, ReadOnlyForExpiredMixin, DetailView)
         else:
             context["taxa_comparecimento"] = 0
 
-        # Informações financeiras
-        agendamentos_concluidos = Agendamento.objects.filter(
-            cliente=cliente, status="concluido"
-        )
-
-        if agendamentos_concluidos.exists():
-            valores = []
-            for agendamento in agendamentos_concluidos:
-                valor = agendamento.valor_cobrado or agendamento.servico.preco
-                valores.append(valor)
-
-            context["total_faturado"] = sum(valores)
-            context["ticket_medio"] = context["total_faturado"] / len(valores)
-
-            # Última visita
-            context["ultima_visita"] = (
-                agendamentos_concluidos.order_by("-data_agendamento")
-                .first()
-                .data_agendamento
+        if context["agendamentos_concluidos"]:
+            context["total_faturado"] = estatisticas["total_faturado"] or 0
+            context["ticket_medio"] = (
+                context["total_faturado"] / context["agendamentos_concluidos"]
             )
+            context["ultima_visita"] = estatisticas["ultima_visita"]
         else:
             context["total_faturado"] = 0
             context["ticket_medio"] = 0
@@ -549,9 +410,7 @@ class TipoServicoListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView)
         # Filtro de busca
         search = self.request.GET.get("search")
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) | Q(descricao__icontains=search)
-            )
+            queryset = buscar(queryset, search)
 
         # Filtro de status
         status = self.request.GET.get("status")
@@ -688,13 +547,16 @@ class TipoServicoDeleteView(LoginRequiredMixin, SubscriptionRequiredMixin, Delet
 # ========================================
 
 
-class AgendamentoListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView):
+class AgendamentoListView(
+    LoginRequiredMixin, ReadOnlyForExpiredMixin, KeysetPaginationMixin, ListView
+):
     """Lista todos os agendamentos do usuário"""
 
     model = Agendamento
     template_name = "agendamentos/agendamento_list.html"
     context_object_name = "agendamentos"
     paginate_by = 20
+    ordenacao_keyset = ["-data_agendamento", "-hora_inicio", "-id"]
 
     def get_queryset(self):
         queryset = Agendamento.objects.filter(criado_por=self.request.user)
@@ -702,11 +564,7 @@ class AgendamentoListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView)
         # Filtro de busca
         search = self.request.GET.get("search")
         if search:
-            queryset = queryset.filter(
-                Q(cliente__nome__icontains=search)
-                | Q(servico__nome__icontains=search)
-                | Q(observacoes__icontains=search)
-            )
+            queryset = buscar(queryset, search)
 
         # Filtro de status
         status = self.request.GET.get("status")
@@ -778,7 +636,9 @@ class AgendamentoListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView)
 
             queryset = queryset.filter(data_agendamento__lte=data_fim)
 
-        return queryset.order_by("-data_agendamento", "-hora_inicio")
+        return queryset.select_related("cliente", "servico").order_by(
+            *self.ordenacao_keyset
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -787,7 +647,7 @@ class AgendamentoListView(LoginRequiredMixin, ReadOnlyForExpiredMixin, ListView)
         context["data_inicio"] = self.request.GET.get("data_inicio", "")
         context["data_fim"] = self.request.GET.get("data_fim", "")
         context["status_choices"] = StatusAgendamento.choices
-        context["total_agendamentos"] = self.get_queryset().count()
+        context["total_agendamentos"], context["total_aproximado"] = self.get_total()
 
         # Datas para filtros rápidos
         hoje = timezone.now().date()
@@ -841,6 +701,52 @@ class AgendamentoCreateView(LoginRequiredMixin, SubscriptionRequiredMixin, Creat
         return super().form_invalid(form)
 
 
+class AgendamentoSerieCreateView(LoginRequiredMixin, SubscriptionRequiredMixin, FormView):
+    """Criar uma série recorrente de agendamentos (semanal, quinzenal ou mensal)"""
+
+    form_class = AgendamentoSerieForm
+    template_name = "agendamentos/agendamento_serie_form.html"
+    success_url = reverse_lazy("agendamentos:agendamento_list")
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        try:
+            criados, datas_ignoradas = form.save()
+        except ValidationError:
+            return self.form_invalid(form)
+
+        if not criados:
+            form.add_error(
+                None,
+                "Nenhum agendamento criado: todas as datas da série estão ocupadas ("
+                + ", ".join(data.strftime("%d/%m/%Y") for data in datas_ignoradas)
+                + ").",
+            )
+            return self.form_invalid(form)
+
+        messages.success(
+            self.request,
+            f'{len(criados)} agendamento(s) criados para "{form.cleaned_data["cliente"].nome}"!',
+        )
+        if datas_ignoradas:
+            messages.warning(
+                self.request,
+                "Datas ignoradas por conflito: "
+                + ", ".join(data.strftime("%d/%m/%Y") for data in datas_ignoradas),
+            )
+        return super().form_valid(form)
+
+    def form_invalid(self, form):
+        messages.error(
+            self.request, "Erro ao criar a série de agendamentos. Verifique os dados informados."
+        )
+        return super().form_invalid(form)
+
+
 class AgendamentoDetailView(LoginRequiredMixin, ReadOnlyForExpiredMixin, DetailView):
     """Detalhes do agendamento"""
 
@@ -969,6 +875,45 @@ class AgendamentoStatusUpdateView(LoginRequiredMixin, SubscriptionRequiredMixin,
         })
 
 
+# ========================================
+# EXPORTAÇÃO
+# ========================================
+
+
+class ExportacaoMixin:
+    """Responde com o queryset filtrado da listagem em streaming (CSV/JSONL)"""
+
+    colunas_exportacao = None
+    nome_exportacao = None
+
+    def get(self, request, *args, **kwargs):
+        formato = request.GET.get("formato", "csv")
+        if formato not in FORMATOS_EXPORTACAO:
+            return JsonResponse(
+                {"error": "Formato inválido. Use csv ou jsonl."}, status=400
+            )
+        return resposta_exportacao(
+            self.get_queryset(),
+            self.colunas_exportacao,
+            self.nome_exportacao,
+            formato,
+        )
+
+
+class AgendamentoExportView(ExportacaoMixin, AgendamentoListView):
+    """Exporta os agendamentos com os mesmos filtros da listagem"""
+
+    colunas_exportacao = COLUNAS_AGENDAMENTO
+    nome_exportacao = "agendamentos"
+
+
+class ClienteExportView(ExportacaoMixin, ClienteListView):
+    """Exporta os clientes com os mesmos filtros da listagem"""
+
+    colunas_exportacao = COLUNAS_CLIENTE
+    nome_exportacao = "clientes"
+
+
 # ========================================
 # VIEWS DE CONFIGURAÇÃO
 # ========================================
@@ -986,5 +931,115 @@ class ConfiguracaoView(LoginRequiredMixin, TemplateView):
 
 
 # ========================================
-# APIS DE CONFIGURAÇÃO
+# APIS DE AGENDA
 # ========================================
+
+
+class HorariosLivresView(LoginRequiredMixin, View):
+    """
+    Retorna (JSON) os próximos horários livres para a duração de um serviço.
+
+    Parâmetros GET: servico (obrigatório), data_inicio, data_fim (YYYY-MM-DD)
+    e quantidade (padrão 10, máximo 50).
+    """
+
+    QUANTIDADE_PADRAO = 10
+    QUANTIDADE_MAXIMA = 50
+
+    def get(self, request, *args, **kwargs):
+        hoje = timezone.localdate()
+
+        try:
+            servico_id = int(request.GET.get("servico", ""))
+            data_inicio = request.GET.get("data_inicio")
+            data_inicio = (
+                datetime.strptime(data_inicio, "%Y-%m-%d").date() if data_inicio else hoje
+            )
+            data_fim = request.GET.get("data_fim")
+            data_fim = (
+                datetime.strptime(data_fim, "%Y-%m-%d").date()
+                if data_fim
+                else data_inicio + timedelta(days=30)
+            )
+            quantidade = int(request.GET.get("quantidade", self.QUANTIDADE_PADRAO))
+        except ValueError:
+            return JsonResponse({"error": "Parâmetros inválidos"}, status=400)
+
+        quantidade = max(1, min(quantidade, self.QUANTIDADE_MAXIMA))
+        servico = get_object_or_404(
+            TipoServico, pk=servico_id, criado_por=request.user, ativo=True
+        )
+
+        horarios = buscar_horarios_livres(
+            request.user, servico.duracao, data_inicio, data_fim, quantidade=quantidade
+        )
+
+        return JsonResponse(
+            {
+                "servico": servico.pk,
+                "duracao": servico.duracao_formatada,
+                "horarios": [
+                    {
+                        "data": horario.date().isoformat(),
+                        "hora_inicio": horario.strftime("%H:%M"),
+                        "hora_fim": (horario + servico.duracao).strftime("%H:%M"),
+                    }
+                    for horario in horarios
+                ],
+            }
+        )
+
+
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    Autocomplete (JSON) paginado por keyset sobre a busca normalizada.
+
+    Parâmetros GET: q (termo), cursor (página seguinte) e quantidade
+    (padrão 20, máximo 50). Retorna {"results": [...], "next": cursor}.
+    """
+
+    model = None
+    QUANTIDADE_PADRAO = 20
+    QUANTIDADE_MAXIMA = 50
+
+    def get_queryset(self):
+        return self.model.objects.filter(criado_por=self.request.user, ativo=True)
+
+    def serializar(self, objeto):
+        return {"id": objeto.pk, "text": str(objeto)}
+
+    def get(self, request, *args, **kwargs):
+        try:
+            quantidade = int(request.GET.get("quantidade", self.QUANTIDADE_PADRAO))
+        except ValueError:
+            return JsonResponse({"error": "Parâmetros inválidos"}, status=400)
+        quantidade = max(1, min(quantidade, self.QUANTIDADE_MAXIMA))
+
+        queryset = buscar(self.get_queryset(), request.GET.get("q", ""))
+        pagina = paginar_keyset(
+            queryset, ["nome", "id"], request.GET.get("cursor"), tamanho=quantidade
+        )
+        return JsonResponse(
+            {
+                "results": [self.serializar(objeto) for objeto in pagina],
+                "next": pagina.next_cursor,
+            }
+        )
+
+
+class ClienteAutocompleteView(AutocompleteView):
+    model = Cliente
+
+    def serializar(self, objeto):
+        return {**super().serializar(objeto), "telefone": objeto.telefone}
+
+
+class TipoServicoAutocompleteView(AutocompleteView):
+    model = TipoServico
+
+    def serializar(self, objeto):
+        return {
+            **super().serializar(objeto),
+            "preco": str(objeto.preco),
+            "duracao": objeto.duracao_formatada,
+        }
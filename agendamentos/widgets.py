@@ -0,0 +1,58 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select que renderiza apenas a opção selecionada; as demais são buscadas
+    sob demanda no endpoint de autocomplete (static/js/autocomplete.js).
+
+    Evita carregar todos os clientes/serviços do usuário no HTML do formulário.
+    A validação continua a cargo do queryset do ModelChoiceField.
+    """
+
+    class Media:
+        js = ["js/autocomplete.js"]
+
+    def __init__(self, url_name, placeholder="Digite para buscar...", attrs=None):
+        attrs = {"class": "form-select", **(attrs or {})}
+        super().__init__(attrs=attrs)
+        self.url_name = url_name
+        self.placeholder = placeholder
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context["widget"]["attrs"]
+        widget_attrs["data-autocomplete-url"] = reverse(self.url_name)
+        widget_attrs["data-placeholder"] = self.placeholder
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        """Gera só a opção vazia e as selecionadas (uma consulta por pk)."""
+        selecionados = [valor for valor in value if valor not in (None, "")]
+        opcoes = []
+        field = getattr(self.choices, "field", None)
+        if field is not None and field.empty_label is not None:
+            opcoes.append(("", field.empty_label))
+
+        queryset = getattr(self.choices, "queryset", None)
+        if selecionados and queryset is not None:
+            try:
+                encontrados = queryset.filter(pk__in=selecionados)
+                opcoes += [(str(objeto.pk), str(objeto)) for objeto in encontrados]
+            except (ValueError, TypeError):
+                pass
+
+        valores = {str(valor) for valor in selecionados}
+        return [
+            (
+                None,
+                [
+                    self.create_option(
+                        name, valor, rotulo, valor in valores, indice, attrs=attrs
+                    )
+                ],
+                indice,
+            )
+            for indice, (valor, rotulo) in enumerate(opcoes)
+        ]
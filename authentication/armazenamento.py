@@ -0,0 +1,181 @@
+"""
+Contabilidade de armazenamento por usuário (tenant).
+
+Mede quantos bytes do banco pertencem a cada usuário, tabela por tabela,
+considerando todas as tabelas com chave estrangeira para o usuário (e a
+própria tabela de usuários):
+
+- PostgreSQL: ``pg_column_size(linha)`` somado por usuário e escalado por
+  ``pg_total_relation_size`` da tabela, o que distribui índices, TOAST e
+  espaço livre proporcionalmente ao tamanho das linhas;
+- SQLite: a tabela virtual ``dbstat`` dá os bytes de páginas de cada tabela e
+  dos seus índices, distribuídos pelo tamanho (LENGTH) das colunas de cada linha;
+- outros bancos: apenas a soma de LENGTH das colunas (estimativa lógica).
+
+O resultado é gravado em ``UserActivityLog.estimated_data_volume_bytes`` /
+``last_data_volume_calculated`` pelo comando ``calcular_armazenamento_usuarios``
+(agendado para rodar de madrugada); o painel do admin só lê esses números.
+"""
+
+import logging
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import UserActivityLog
+
+logger = logging.getLogger(__name__)
+
+METODO_POSTGRESQL = "postgresql"
+METODO_SQLITE = "sqlite-dbstat"
+METODO_ESTIMATIVA = "estimativa"
+
+
+def tabelas_por_usuario():
+    """[(tabela, coluna do usuário, colunas)] de todos os modelos do usuário."""
+    User = get_user_model()
+    tabelas = [
+        (
+            User._meta.db_table,
+            User._meta.pk.column,
+            [campo.column for campo in User._meta.concrete_fields],
+        )
+    ]
+    for model in apps.get_models():
+        if model is User or model._meta.proxy or not model._meta.managed:
+            continue
+        for campo in model._meta.concrete_fields:
+            if campo.is_relation and campo.related_model is User:
+                tabelas.append(
+                    (
+                        model._meta.db_table,
+                        campo.column,
+                        [c.column for c in model._meta.concrete_fields],
+                    )
+                )
+                break
+    return tabelas
+
+
+def _soma_por_usuario(cursor, tabela, coluna_usuario, expressao):
+    q = connection.ops.quote_name
+    cursor.execute(
+        f"SELECT {q(coluna_usuario)}, SUM({expressao}) FROM {q(tabela)} t "
+        f"WHERE {q(coluna_usuario)} IS NOT NULL GROUP BY {q(coluna_usuario)}"
+    )
+    return {user_id: int(total or 0) for user_id, total in cursor.fetchall()}
+
+
+def _expressao_linha(colunas):
+    """Tamanho lógico de uma linha: soma de LENGTH das colunas."""
+    q = connection.ops.quote_name
+    return " + ".join(f"COALESCE(LENGTH({q(coluna)}), 0)" for coluna in colunas)
+
+
+def _bytes_fisicos_sqlite(cursor):
+    """Bytes de páginas por tabela (tabela + índices), via dbstat."""
+    cursor.execute(
+        "SELECT m.tbl_name, SUM(d.pgsize) FROM dbstat d "
+        "JOIN sqlite_master m ON m.name = d.name GROUP BY m.tbl_name"
+    )
+    return {tabela: int(total or 0) for tabela, total in cursor.fetchall()}
+
+
+def _medir_tabela(cursor, metodo, tabela, coluna_usuario, colunas, fisicos):
+    q = connection.ops.quote_name
+    if metodo == METODO_POSTGRESQL:
+        expressao = "pg_column_size(t.*)"
+        cursor.execute("SELECT pg_total_relation_size(%s::regclass)", [tabela])
+        total_fisico = cursor.fetchone()[0] or 0
+    else:
+        expressao = _expressao_linha(colunas)
+        total_fisico = fisicos.get(tabela, 0)
+
+    por_usuario = _soma_por_usuario(cursor, tabela, coluna_usuario, expressao)
+    if not total_fisico:
+        return por_usuario
+
+    # Distribuir o tamanho físico da tabela na proporção do tamanho das linhas
+    # (linhas sem usuário também entram no denominador)
+    cursor.execute(f"SELECT SUM({expressao}) FROM {q(tabela)} t")
+    total_logico = cursor.fetchone()[0] or 0
+    if not total_logico:
+        return por_usuario
+    fator = total_fisico / total_logico
+    return {user_id: round(valor * fator) for user_id, valor in por_usuario.items()}
+
+
+def medir_armazenamento():
+    """
+    Mede os bytes de cada usuário. Retorna ``(metodo, {user_id: bytes},
+    {tabela: bytes})``.
+    """
+    fisicos = {}
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            metodo = METODO_POSTGRESQL
+        elif connection.vendor == "sqlite":
+            try:
+                fisicos = _bytes_fisicos_sqlite(cursor)
+                metodo = METODO_SQLITE
+            except DatabaseError:
+                # SQLite compilado sem SQLITE_ENABLE_DBSTAT_VTAB
+                metodo = METODO_ESTIMATIVA
+        else:
+            metodo = METODO_ESTIMATIVA
+
+        por_usuario = defaultdict(int)
+        por_tabela = {}
+        for tabela, coluna_usuario, colunas in tabelas_por_usuario():
+            medidos = _medir_tabela(cursor, metodo, tabela, coluna_usuario, colunas, fisicos)
+            por_tabela[tabela] = sum(medidos.values())
+            for user_id, valor in medidos.items():
+                por_usuario[user_id] += valor
+    return metodo, dict(por_usuario), por_tabela
+
+
+def tamanho_banco():
+    """Tamanho total do banco em bytes (None se o backend não informar)."""
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_database_size(current_database())")
+                return cursor.fetchone()[0]
+            if connection.vendor == "sqlite":
+                cursor.execute("PRAGMA page_count")
+                page_count = cursor.fetchone()[0]
+                cursor.execute("PRAGMA page_size")
+                return page_count * cursor.fetchone()[0]
+    except DatabaseError:
+        logger.warning("Não foi possível obter o tamanho do banco", exc_info=True)
+    return None
+
+
+def atualizar_armazenamento(batch_size=500):
+    """
+    Mede e grava o armazenamento de todos os usuários.
+    Retorna ``(metodo, total_usuarios, total_bytes)``.
+    """
+    metodo, por_usuario, _ = medir_armazenamento()
+    agora = timezone.now()
+    user_ids = list(get_user_model().objects.values_list("pk", flat=True))
+
+    with transaction.atomic():
+        UserActivityLog.objects.bulk_create(
+            [UserActivityLog(user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True,
+            batch_size=batch_size,
+        )
+        logs = list(UserActivityLog.objects.only("id", "user_id"))
+        for log in logs:
+            log.estimated_data_volume_bytes = por_usuario.get(log.user_id, 0)
+            log.last_data_volume_calculated = agora
+        UserActivityLog.objects.bulk_update(
+            logs,
+            ["estimated_data_volume_bytes", "last_data_volume_calculated"],
+            batch_size=batch_size,
+        )
+    return metodo, len(logs), sum(por_usuario.values())
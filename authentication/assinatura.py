@@ -0,0 +1,123 @@
+"""
+Resolução do status de assinatura do usuário.
+
+O middleware de expiração e os mixins de views consultam o status na mesma
+requisição; ``status_assinatura(request)`` calcula uma única vez e memoriza o
+resultado no próprio ``request``. Entre requisições, a assinatura ativa mais
+recente (id e data_fim) fica em cache por usuário com TTL curto; o status é
+derivado de ``data_fim`` a cada leitura, então o cache não atrasa a expiração.
+
+Qualquer gravação em AssinaturaUsuario (checkout, webhook, expiração) invalida
+a entrada do usuário (ver authentication.signals).
+
+O caminho da requisição é somente leitura: a troca de status "ativa" para
+"expirada" é feita em lote por ``expirar_assinaturas_vencidas`` (comando
+``expirar_assinaturas``, agendado no cron), que emite ``assinatura_expirada``
+para cada usuário afetado.
+"""
+
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import AssinaturaUsuario
+
+STATUS_ATIVA = "ativa"
+STATUS_EXPIRADA = "expirada"
+STATUS_SEM_ASSINATURA = "sem_assinatura"
+
+CACHE_TIMEOUT_ASSINATURA = 60  # 1 minuto
+_NENHUMA = "nenhuma"  # marca "sem assinatura ativa" no cache (None = ausente)
+
+logger = logging.getLogger(__name__)
+
+# Enviado uma vez por usuário cujas assinaturas foram expiradas pelo sweeper.
+# Argumentos: usuario_id, quantidade.
+assinatura_expirada = Signal()
+
+
+def _chave_assinatura(user_id):
+    return f"authentication:assinatura_ativa:{user_id}"
+
+
+def assinatura_ativa_recente(user_id):
+    """Retorna (id, data_fim) da assinatura ativa mais recente, ou None."""
+    chave = _chave_assinatura(user_id)
+    registro = cache.get(chave)
+    if registro is None:
+        registro = (
+            AssinaturaUsuario.objects.filter(usuario_id=user_id, status="ativa")
+            .order_by("-data_inicio")
+            .values_list("pk", "data_fim")
+            .first()
+        ) or _NENHUMA
+        cache.set(chave, registro, CACHE_TIMEOUT_ASSINATURA)
+    return None if registro == _NENHUMA else tuple(registro)
+
+
+def invalidar_status_assinatura(user_id):
+    """Descarta o status em cache do usuário."""
+    if user_id:
+        cache.delete(_chave_assinatura(user_id))
+
+
+def calcular_status_assinatura(user):
+    """
+    Retorna "ativa", "expirada" ou "sem_assinatura".
+
+    Uma assinatura ainda marcada como ativa mas com data_fim no passado já é
+    tratada como expirada; a gravação do novo status fica com o sweeper.
+    """
+    registro = assinatura_ativa_recente(user.pk)
+    if registro is None:
+        return STATUS_SEM_ASSINATURA
+
+    _, data_fim = registro
+    if data_fim < timezone.now():
+        return STATUS_EXPIRADA
+
+    return STATUS_ATIVA
+
+
+def status_assinatura(request):
+    """Status de assinatura do usuário da requisição, calculado uma vez só."""
+    status = getattr(request, "_status_assinatura", None)
+    if status is None:
+        status = calcular_status_assinatura(request.user)
+        request._status_assinatura = status
+    return status
+
+
+def expirar_assinaturas_vencidas(agora=None):
+    """
+    Marca como expiradas todas as assinaturas ativas com data_fim vencida,
+    com um único UPDATE (índice em status, data_fim).
+
+    Retorna (linhas atualizadas, {usuario_id: quantidade}) e emite
+    ``assinatura_expirada`` para cada usuário afetado.
+    """
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        vencidas = (
+            AssinaturaUsuario.objects.select_for_update()
+            .filter(status="ativa", data_fim__lt=agora)
+            .order_by()
+        )
+        por_usuario = {}
+        for usuario_id in vencidas.values_list("usuario_id", flat=True):
+            por_usuario[usuario_id] = por_usuario.get(usuario_id, 0) + 1
+        if not por_usuario:
+            return 0, {}
+
+        atualizadas = AssinaturaUsuario.objects.filter(
+            status="ativa", data_fim__lt=agora
+        ).update(status="expirada", atualizado_em=agora)
+
+    for usuario_id, quantidade in por_usuario.items():
+        assinatura_expirada.send(
+            sender=AssinaturaUsuario, usuario_id=usuario_id, quantidade=quantidade
+        )
+    return atualizadas, por_usuario
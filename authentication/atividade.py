@@ -0,0 +1,240 @@
+"""
+Registro de atividade dos usuários com escrita adiada (write-behind).
+
+O UserActivityTrackingMiddleware apenas acumula contadores em memória, por
+usuário, sem tocar o banco. Os deltas agregados são gravados em lote:
+
+- ao fim de uma requisição (sinal ``request_finished``, depois de a resposta
+  ter sido entregue) quando há ``ACTIVITY_FLUSH_MAX_REQUESTS`` pendentes ou já
+  se passaram ``ACTIVITY_FLUSH_INTERVAL_SECONDS`` desde a última gravação;
+- no encerramento do processo (``atexit``), para não perder incrementos.
+
+Como os deltas são somados com F(), vários workers podem gravar ao mesmo tempo
+sem perder contagens; os campos "last_*" ficam com o valor mais recente.
+
+Junto com os contadores vitalícios, cada requisição entra na métrica horária
+(RequestMetricBucket) do usuário, rota e método, com a latência no histograma.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import RequestMetricBucket, UserActivityLog
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_POR_METODO = {
+    "GET": "total_get_requests",
+    "POST": "total_post_requests",
+    "PUT": "total_put_requests",
+    "DELETE": "total_delete_requests",
+}
+
+
+ROTA_NAO_RESOLVIDA = "(não resolvida)"
+
+
+def nome_da_rota(request):
+    """Nome da URL resolvida (ex.: "financeiro:pix_qr_view"), não o path bruto."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return ROTA_NAO_RESOLVIDA
+    return match.view_name or ROTA_NAO_RESOLVIDA
+
+
+def _novo_item():
+    return {"contadores": {}, "ultimos": {}, "metricas": {}}
+
+
+def _nova_metrica():
+    return {"count": 0, "total_latency_ms": 0.0, "max_latency_ms": 0.0, "faixas": {}}
+
+
+def _somar_metrica(destino, origem):
+    destino["count"] += origem["count"]
+    destino["total_latency_ms"] += origem["total_latency_ms"]
+    destino["max_latency_ms"] = max(destino["max_latency_ms"], origem["max_latency_ms"])
+    for faixa, quantidade in origem["faixas"].items():
+        destino["faixas"][faixa] = destino["faixas"].get(faixa, 0) + quantidade
+
+
+class BufferAtividade:
+    """Acumula contadores por usuário e grava os deltas em lote."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pendentes = {}
+        self._requisicoes_pendentes = 0
+        self._ultimo_flush = time.monotonic()
+
+    @property
+    def intervalo(self):
+        return getattr(settings, "ACTIVITY_FLUSH_INTERVAL_SECONDS", 5)
+
+    @property
+    def limite_requisicoes(self):
+        return getattr(settings, "ACTIVITY_FLUSH_MAX_REQUESTS", 200)
+
+    def registrar(
+        self, user_id, method, path=None, user_agent=None, ip=None, route=None, latency_ms=None
+    ):
+        """Contabiliza uma requisição do usuário (sem acessar o banco)."""
+        campo_metodo = CAMPOS_POR_METODO.get((method or "").upper())
+        with self._lock:
+            item = self._pendentes.setdefault(user_id, _novo_item())
+            contadores = item["contadores"]
+            contadores["total_requests"] = contadores.get("total_requests", 0) + 1
+            if campo_metodo:
+                contadores[campo_metodo] = contadores.get(campo_metodo, 0) + 1
+
+            ultimos = item["ultimos"]
+            ultimos["last_activity"] = timezone.now()
+            if path:
+                ultimos["last_request_path"] = path[:512]
+            if user_agent:
+                ultimos["last_user_agent"] = user_agent[:512]
+            if ip:
+                ultimos["last_login_ip"] = ip
+
+            if latency_ms is not None:
+                chave = (
+                    ultimos["last_activity"].replace(minute=0, second=0, microsecond=0),
+                    (route or "")[:200],
+                    (method or "").upper()[:10],
+                )
+                metrica = item["metricas"].setdefault(chave, _nova_metrica())
+                metrica["count"] += 1
+                metrica["total_latency_ms"] += latency_ms
+                metrica["max_latency_ms"] = max(metrica["max_latency_ms"], latency_ms)
+                faixa = RequestMetricBucket.bucket_for(latency_ms)
+                metrica["faixas"][faixa] = metrica["faixas"].get(faixa, 0) + 1
+            self._requisicoes_pendentes += 1
+
+    def precisa_gravar(self):
+        return self._requisicoes_pendentes > 0 and (
+            self._requisicoes_pendentes >= self.limite_requisicoes
+            or time.monotonic() - self._ultimo_flush >= self.intervalo
+        )
+
+    def _retirar(self):
+        with self._lock:
+            pendentes = self._pendentes
+            self._pendentes = {}
+            self._requisicoes_pendentes = 0
+            self._ultimo_flush = time.monotonic()
+        return pendentes
+
+    def _devolver(self, pendentes):
+        """Reincorpora deltas que não puderam ser gravados."""
+        with self._lock:
+            for user_id, item in pendentes.items():
+                atual = self._pendentes.setdefault(user_id, _novo_item())
+                for campo, delta in item["contadores"].items():
+                    atual["contadores"][campo] = atual["contadores"].get(campo, 0) + delta
+                    if campo == "total_requests":
+                        self._requisicoes_pendentes += delta
+                for campo, valor in item["ultimos"].items():
+                    atual["ultimos"].setdefault(campo, valor)
+                for chave, metrica in item["metricas"].items():
+                    _somar_metrica(atual["metricas"].setdefault(chave, _nova_metrica()), metrica)
+
+    def gravar(self):
+        """Grava todos os deltas pendentes; retorna quantos usuários foram atualizados."""
+        with self._flush_lock:
+            pendentes = self._retirar()
+            if not pendentes:
+                return 0
+            try:
+                return self._gravar(pendentes)
+            except Exception:
+                logger.exception("Falha ao gravar atividade de usuários; tentando depois")
+                self._devolver(pendentes)
+                return 0
+
+    def _gravar(self, pendentes):
+        existentes = set(
+            get_user_model()
+            .objects.filter(pk__in=list(pendentes))
+            .values_list("pk", flat=True)
+        )
+        agora = timezone.now()
+        with transaction.atomic():
+            UserActivityLog.objects.bulk_create(
+                [UserActivityLog(user_id=user_id) for user_id in existentes],
+                ignore_conflicts=True,
+            )
+            for user_id in existentes:
+                item = pendentes[user_id]
+                updates = {
+                    campo: F(campo) + delta
+                    for campo, delta in item["contadores"].items()
+                }
+                updates.update(item["ultimos"])
+                updates["updated_at"] = agora
+                UserActivityLog.objects.filter(user_id=user_id).update(**updates)
+            self._gravar_metricas(pendentes, existentes)
+        return len(existentes)
+
+    def _gravar_metricas(self, pendentes, existentes):
+        """Upsert em lote: cria as janelas que faltam e soma os deltas com F()."""
+        metricas = [
+            (user_id, chave, metrica)
+            for user_id in existentes
+            for chave, metrica in pendentes[user_id]["metricas"].items()
+        ]
+        if not metricas:
+            return
+        RequestMetricBucket.objects.bulk_create(
+            [
+                RequestMetricBucket(
+                    user_id=user_id, bucket_start=hora, route=route, method=method
+                )
+                for user_id, (hora, route, method), _ in metricas
+            ],
+            ignore_conflicts=True,
+        )
+        for user_id, (hora, route, method), metrica in metricas:
+            updates = {
+                "count": F("count") + metrica["count"],
+                "total_latency_ms": F("total_latency_ms") + metrica["total_latency_ms"],
+                "max_latency_ms": Greatest(F("max_latency_ms"), Value(metrica["max_latency_ms"])),
+            }
+            for faixa, quantidade in metrica["faixas"].items():
+                updates[faixa] = F(faixa) + quantidade
+            RequestMetricBucket.objects.filter(
+                user_id=user_id,
+                bucket_start=hora,
+                granularity=RequestMetricBucket.GRANULARITY_HOUR,
+                route=route,
+                method=method,
+            ).update(**updates)
+
+    def gravar_se_necessario(self):
+        if self.precisa_gravar():
+            self.gravar()
+
+
+buffer_atividade = BufferAtividade()
+
+
+def gravar_atividade_pendente(**kwargs):
+    """Receptor de request_finished: grava o buffer quando atinge o limite."""
+    buffer_atividade.gravar_se_necessario()
+
+
+@atexit.register
+def _gravar_ao_encerrar():
+    try:
+        buffer_atividade.gravar()
+    except Exception:  # pragma: no cover - banco indisponível no encerramento
+        logger.exception("Falha ao gravar atividade pendente no encerramento")
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.armazenamento import atualizar_armazenamento
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede os bytes ocupados no banco por cada usuário (pg_column_size / "
+        "pg_total_relation_size no PostgreSQL, dbstat no SQLite) e grava em "
+        "UserActivityLog. Agende no cron uma vez por noite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Registros por UPDATE em lote (padrão: 500)",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        metodo, usuarios, total_bytes = atualizar_armazenamento(
+            batch_size=options["batch_size"]
+        )
+        decorrido_ms = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Armazenamento de {usuarios} usuário(s) medido ({metodo}): "
+                f"{total_bytes} bytes em {decorrido_ms:.1f} ms."
+            )
+        )
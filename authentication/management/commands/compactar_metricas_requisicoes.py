@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from authentication.metricas import compactar_metricas
+
+
+class Command(BaseCommand):
+    help = (
+        "Soma as métricas horárias antigas em janelas diárias e apaga as que "
+        "passaram do período de retenção. Agende no cron uma vez por dia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias-detalhe",
+            type=int,
+            default=None,
+            help="Dias mantidos com granularidade de hora (padrão: REQUEST_METRICS_HOURLY_DAYS)",
+        )
+        parser.add_argument(
+            "--dias-retencao",
+            type=int,
+            default=None,
+            help="Dias mantidos no total (padrão: REQUEST_METRICS_RETENTION_DAYS)",
+        )
+
+    def handle(self, *args, **options):
+        resultado = compactar_metricas(
+            dias_detalhe=options["dias_detalhe"], dias_retencao=options["dias_retencao"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{resultado['compactadas']} janela(s) horária(s) compactada(s) em "
+                f"{resultado['diarias']} diária(s); {resultado['removidas']} removida(s) "
+                f"pela retenção."
+            )
+        )
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from authentication.assinatura import expirar_assinaturas_vencidas
+from authentication.models import AssinaturaUsuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Marca como expiradas as assinaturas ativas com data de fim vencida "
+        "(um único UPDATE). Agende no cron, por exemplo a cada 5 minutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta as assinaturas vencidas, sem alterá-las",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        agora = timezone.now()
+
+        if options["dry_run"]:
+            vencidas = AssinaturaUsuario.objects.filter(status="ativa", data_fim__lt=agora)
+            total = vencidas.count()
+            usuarios = vencidas.values("usuario_id").distinct().count()
+            acao = "seriam expiradas"
+        else:
+            total, por_usuario = expirar_assinaturas_vencidas(agora)
+            usuarios = len(por_usuario)
+            acao = "expiradas"
+
+        decorrido_ms = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} assinatura(s) {acao} de {usuarios} usuário(s) "
+                f"em {decorrido_ms:.1f} ms."
+            )
+        )
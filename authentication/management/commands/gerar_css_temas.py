@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authentication.temas import MODOS, TEMAS, caminho_css_tema, gerar_css_tema
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera os arquivos static/css/temas/<tema>-<modo>.css com as variáveis "
+        "de cor de cada tema (rode após alterar as paletas em authentication.temas)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--destino",
+            default=settings.STATICFILES_DIRS[0] if settings.STATICFILES_DIRS else None,
+            help="Diretório estático de destino (padrão: primeiro STATICFILES_DIRS)",
+        )
+
+    def handle(self, *args, **options):
+        destino = options["destino"]
+        gerados = 0
+        for tema in TEMAS:
+            for modo in MODOS:
+                caminho = os.path.join(destino, caminho_css_tema(tema, modo))
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                with open(caminho, "w", encoding="utf-8") as arquivo:
+                    arquivo.write(gerar_css_tema(tema, modo))
+                gerados += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{gerados} arquivos de tema gerados em {destino}")
+        )
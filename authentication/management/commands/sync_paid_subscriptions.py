@@ -1,16 +1,20 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Iterable, Optional, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
+from authentication.assinatura import invalidar_status_assinatura
 from authentication.models import AssinaturaUsuario
 from financeiro.models import AsaasPayment
-from financeiro.services.asaas import AsaasAPIError, AsaasClient
+from financeiro.services.asaas import AsaasAPIError, get_asaas_client
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +26,16 @@ CONFIRMED_STATUSES_DEFAULT = {
     "PAYMENT_CONFIRMED",
 }
 
+SUBSCRIPTION_SYNC_FIELDS = [
+    "status",
+    "data_inicio",
+    "data_fim",
+    "valor_pago",
+    "metodo_pagamento",
+    "asaas_payment_id",
+    "atualizado_em",
+]
+
 
 class Command(BaseCommand):
     help = (
@@ -51,10 +65,24 @@ class Command(BaseCommand):
                 "Por padrão utiliza: RECEIVED, RECEIVED_IN_CASH, CONFIRMED, PAYMENT_CONFIRMED."
             ),
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Quantidade de páginas buscadas em paralelo no Asaas (padrão: 4; 1 = sequencial).",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=100,
+            help="Pagamentos por página em list_payments (padrão: 100, máximo da API).",
+        )
 
     def handle(self, *args, **options):
         days = options["days"]
         dry_run = options["dry_run"]
+        workers = max(1, options["workers"])
+        limit = options["page_size"]
         statuses = self._resolve_statuses(options.get("statuses"))
 
         window_end = timezone.now()
@@ -63,207 +91,271 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.MIGRATE_HEADING(
                 f"Iniciando sincronização de assinaturas pagas (janela: {window_start.date()} → {window_end.date()}, "
-                f"status considerados: {', '.join(sorted(statuses))})"
+                f"status considerados: {', '.join(sorted(statuses))}, workers: {workers})"
             )
         )
 
         try:
-            client = AsaasClient()
+            client = get_asaas_client()
         except RuntimeError as exc:
             self.stderr.write(self.style.ERROR(f"Falha ao inicializar AsaasClient: {exc}"))
             return
 
-        payments_processed = 0
-        payments_confirmed = 0
-        assinaturas_ativadas = 0
-        assinaturas_atualizadas = 0
-        payments_without_subscription = 0
-
-        limit = 100
-        offset = 0
+        totals = {
+            "payments_processed": 0,
+            "payments_confirmed": 0,
+            "assinaturas_atualizadas": 0,
+            "assinaturas_ativadas": 0,
+            "payments_without_subscription": 0,
+        }
 
         extra_params = {
             "paymentDate[ge]": window_start.date().isoformat(),
             "paymentDate[le]": window_end.date().isoformat(),
         }
 
-        while True:
-            try:
-                response = client.list_payments(
-                    limit=limit,
-                    offset=offset,
-                    extra_params=extra_params,
-                )
-            except AsaasAPIError as exc:
-                self.stderr.write(
-                    self.style.ERROR(
-                        f"Erro ao buscar pagamentos no Asaas (offset={offset}): {exc.message}"
-                    )
-                )
-                break
-
-            data = response.get("data", [])
-            if not data:
-                break
-
-            for payment in data:
-                payments_processed += 1
-                status = (payment.get("status") or "").upper()
-
-                if status not in statuses:
-                    continue
-
-                payments_confirmed += 1
-                updated, activated = self._process_payment(
-                    payment,
-                    window_start,
-                    window_end,
-                    dry_run=dry_run,
-                )
-
-                assinaturas_atualizadas += updated
-                assinaturas_ativadas += activated
-
-                if updated == 0:
-                    payments_without_subscription += 1
-
-            if len(data) < limit:
-                break
-
-            offset += limit
+        inicio = time.perf_counter()
+        for data in self._fetch_pages(client, extra_params, limit, workers):
+            totals["payments_processed"] += len(data)
+            page_totals = self._process_page(
+                data, statuses, window_start, window_end, dry_run=dry_run
+            )
+            for key, value in page_totals.items():
+                totals[key] += value
+        elapsed = time.perf_counter() - inicio
 
         self.stdout.write("")
         self.stdout.write(self.style.HTTP_INFO("Resumo da execução"))
-        self.stdout.write(f"Pagamentos recuperados: {payments_processed}")
-        self.stdout.write(f"Pagamentos confirmados considerados: {payments_confirmed}")
+        self.stdout.write(f"Pagamentos recuperados: {totals['payments_processed']}")
+        self.stdout.write(f"Pagamentos confirmados considerados: {totals['payments_confirmed']}")
         self.stdout.write(
-            f"Assinaturas atualizadas: {assinaturas_atualizadas} (ativadas: {assinaturas_ativadas})"
+            f"Assinaturas atualizadas: {totals['assinaturas_atualizadas']} "
+            f"(ativadas: {totals['assinaturas_ativadas']})"
         )
-        if payments_without_subscription:
+        if totals["payments_without_subscription"]:
             self.stdout.write(
-                f"Pagamentos sem assinatura correspondente: {payments_without_subscription}"
+                f"Pagamentos sem assinatura correspondente: {totals['payments_without_subscription']}"
             )
+        throughput = totals["payments_processed"] / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            f"Tempo total: {elapsed:.2f}s ({throughput:.1f} pagamentos/s)"
+        )
         if dry_run:
             self.stdout.write(self.style.WARNING("Execução em modo dry-run: nenhuma alteração persistida."))
 
+    def _fetch_pages(self, client, extra_params, limit: int, workers: int) -> Iterator[List[dict]]:
+        """
+        Busca as páginas de ``list_payments`` em lotes de ``workers`` páginas
+        simultâneas (threads; o AsaasClient compartilha o pool de conexões) e as
+        entrega em ordem de offset. O banco só é acessado pela thread principal.
+        """
+
+        def fetch(offset):
+            return client.list_payments(limit=limit, offset=offset, extra_params=extra_params)
+
+        offset = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                offsets = [offset + i * limit for i in range(workers)]
+                futures = [executor.submit(fetch, page_offset) for page_offset in offsets]
+                for page_offset, future in zip(offsets, futures):
+                    try:
+                        response = future.result()
+                    except AsaasAPIError as exc:
+                        self.stderr.write(
+                            self.style.ERROR(
+                                f"Erro ao buscar pagamentos no Asaas (offset={page_offset}): {exc.message}"
+                            )
+                        )
+                        return
+
+                    data = response.get("data", [])
+                    if data:
+                        yield data
+                    if len(data) < limit or not response.get("hasMore", True):
+                        return
+                offset += workers * limit
+
     def _resolve_statuses(self, statuses: Optional[Iterable[str]]) -> Set[str]:
         base = set(CONFIRMED_STATUSES_DEFAULT)
         if statuses:
             base.update(s.upper() for s in statuses if s)
         return base
 
-    def _process_payment(self, payment: dict, window_start, window_end, dry_run: bool) -> Tuple[int, int]:
+    def _process_page(self, data: List[dict], statuses: Set[str], window_start, window_end, dry_run: bool) -> Dict[str, int]:
         """
-        Retorna uma tupla (assinaturas_atualizadas, assinaturas_ativadas).
+        Processa uma página de pagamentos com consultas em lote: uma para os
+        AsaasPayment, uma para as assinaturas (por asaas_payment_id ou
+        externalReference) e bulk_create/bulk_update numa única transação.
         """
-        payment_id = payment.get("id")
-        if not payment_id:
-            logger.warning("Pagamento ignorado: não possui ID.")
-            return (0, 0)
-
-        payment_date = self._parse_payment_datetime(payment)
-        if payment_date and not (window_start <= payment_date <= window_end):
-            logger.debug(
-                "Pagamento %s fora da janela (%s). Ignorando.",
-                payment_id,
-                payment_date.isoformat(),
-            )
-            return (0, 0)
-
-        amount = self._safe_decimal(payment.get("value"))
-        billing_type = payment.get("billingType") or ""
-        customer = payment.get("customer") or ""
-        external_reference = payment.get("externalReference") or ""
-        updated_assinaturas = 0
-        activated_assinaturas = 0
-
-        amount_for_default = amount if amount is not None else Decimal("0")
-
-        payment_obj, _ = AsaasPayment.objects.get_or_create(
-            asaas_id=payment_id,
-            defaults={
-                "customer_id": customer,
-                "amount": amount_for_default,
-                "billing_type": billing_type,
-                "status": payment.get("status", ""),
-            },
-        )
+        totals = {
+            "payments_confirmed": 0,
+            "assinaturas_atualizadas": 0,
+            "assinaturas_ativadas": 0,
+            "payments_without_subscription": 0,
+        }
 
-        fields_to_update = []
-        if payment_obj.customer_id != customer and customer:
-            payment_obj.customer_id = customer
-            fields_to_update.append("customer_id")
-        if payment_obj.amount != amount and amount is not None:
-            payment_obj.amount = amount
-            fields_to_update.append("amount")
-        if billing_type and payment_obj.billing_type != billing_type:
-            payment_obj.billing_type = billing_type
-            fields_to_update.append("billing_type")
-
-        status = payment.get("status")
-        if status and payment_obj.status != status:
-            payment_obj.status = status
-            fields_to_update.append("status")
-
-        if payment_date and payment_obj.paid_at != payment_date:
-            payment_obj.paid_at = payment_date
-            fields_to_update.append("paid_at")
-
-        invoice_url = payment.get("invoiceUrl")
-        if invoice_url and payment_obj.invoice_url != invoice_url:
-            payment_obj.invoice_url = invoice_url
-            fields_to_update.append("invoice_url")
-
-        if fields_to_update and not dry_run:
-            payment_obj.save(update_fields=fields_to_update + ["updated_at"])
-
-        assinaturas = AssinaturaUsuario.objects.filter(asaas_payment_id=payment_id)
-
-        if not assinaturas.exists() and external_reference.startswith("assinatura_"):
-            try:
-                assinatura_id = int(external_reference.replace("assinatura_", ""))
-            except ValueError:
-                assinatura_id = None
-
-            if assinatura_id:
-                assinaturas = AssinaturaUsuario.objects.filter(id=assinatura_id)
-                if assinaturas.exists() and not dry_run:
-                    assinaturas.update(asaas_payment_id=payment_id)
-
-        if not assinaturas.exists():
-            logger.info(
-                "Pagamento %s confirmado, mas nenhuma assinatura correspondente foi encontrada.",
-                payment_id,
-            )
-            return (0, 0)
-
-        for assinatura in assinaturas:
-            atualizada, ativada = self._activate_subscription_if_needed(
-                assinatura,
-                payment_obj,
-                payment_date,
-                amount,
-                billing_type,
-                dry_run=dry_run,
-            )
-            if atualizada:
-                updated_assinaturas += 1
+        payments = {}
+        for payment in data:
+            if (payment.get("status") or "").upper() not in statuses:
+                continue
+            totals["payments_confirmed"] += 1
+
+            payment_id = payment.get("id")
+            if not payment_id:
+                logger.warning("Pagamento ignorado: não possui ID.")
+                totals["payments_without_subscription"] += 1
+                continue
+
+            payment_date = self._parse_payment_datetime(payment)
+            if payment_date and not (window_start <= payment_date <= window_end):
+                logger.debug(
+                    "Pagamento %s fora da janela (%s). Ignorando.",
+                    payment_id,
+                    payment_date.isoformat(),
+                )
+                totals["payments_without_subscription"] += 1
+                continue
+            payments[payment_id] = (payment, payment_date)
+
+        if not payments:
+            return totals
+
+        payment_objs, payment_fields = self._sync_payment_records(payments)
+
+        referencias = {}
+        for payment_id, (payment, _) in payments.items():
+            external_reference = payment.get("externalReference") or ""
+            if external_reference.startswith("assinatura_"):
+                try:
+                    referencias[int(external_reference.replace("assinatura_", ""))] = payment_id
+                except ValueError:
+                    pass
+
+        por_pagamento = {}
+        por_referencia = {}
+        for assinatura in AssinaturaUsuario.objects.select_related("plano").filter(
+            Q(asaas_payment_id__in=list(payments)) | Q(id__in=list(referencias))
+        ):
+            if assinatura.asaas_payment_id in payments:
+                por_pagamento.setdefault(assinatura.asaas_payment_id, []).append(assinatura)
+            if assinatura.id in referencias:
+                por_referencia.setdefault(referencias[assinatura.id], []).append(assinatura)
+
+        alteradas = []
+        for payment_id, (payment, payment_date) in payments.items():
+            # Fallback para externalReference só quando nenhuma assinatura tem o payment_id
+            assinaturas = por_pagamento.get(payment_id) or por_referencia.get(payment_id, [])
+            if not assinaturas:
+                logger.info(
+                    "Pagamento %s confirmado, mas nenhuma assinatura correspondente foi encontrada.",
+                    payment_id,
+                )
+                totals["payments_without_subscription"] += 1
+                continue
+
+            updated = 0
+            for assinatura in assinaturas:
+                vinculada = assinatura.asaas_payment_id != payment_id
+                assinatura.asaas_payment_id = payment_id
+                ativada = self._activate_subscription_if_needed(
+                    assinatura,
+                    payment_id,
+                    payment_date,
+                    self._safe_decimal(payment.get("value")),
+                    payment.get("billingType") or "",
+                )
+                if ativada or vinculada:
+                    alteradas.append(assinatura)
                 if ativada:
-                    activated_assinaturas += 1
+                    updated += 1
+            totals["assinaturas_atualizadas"] += updated
+            totals["assinaturas_ativadas"] += updated
+            if updated == 0:
+                totals["payments_without_subscription"] += 1
+
+        if not dry_run:
+            agora = timezone.now()
+            novos = [obj for obj in payment_objs if obj.pk is None]
+            existentes = [obj for obj in payment_objs if obj.pk is not None and obj.asaas_id in payment_fields]
+            for assinatura in alteradas:
+                assinatura.atualizado_em = agora
+            with transaction.atomic():
+                AsaasPayment.objects.bulk_create(novos)
+                if existentes:
+                    for obj in existentes:
+                        obj.updated_at = agora
+                    campos = set().union(*(payment_fields[obj.asaas_id] for obj in existentes))
+                    AsaasPayment.objects.bulk_update(existentes, sorted(campos) + ["updated_at"])
+                if alteradas:
+                    AssinaturaUsuario.objects.bulk_update(alteradas, SUBSCRIPTION_SYNC_FIELDS)
+            # bulk_update não dispara post_save: descartar o status em cache
+            for usuario_id in {assinatura.usuario_id for assinatura in alteradas}:
+                invalidar_status_assinatura(usuario_id)
+
+        return totals
+
+    def _sync_payment_records(self, payments) -> Tuple[List[AsaasPayment], Dict[str, List[str]]]:
+        """
+        Atualiza em memória os AsaasPayment da página (uma consulta) e cria os
+        que faltam (sem salvar). Retorna (objetos, {asaas_id: campos alterados}).
+        """
+        existentes = AsaasPayment.objects.in_bulk(list(payments), field_name="asaas_id")
+        objs = []
+        changed = {}
+        for payment_id, (payment, payment_date) in payments.items():
+            amount = self._safe_decimal(payment.get("value"))
+            billing_type = payment.get("billingType") or ""
+            customer = payment.get("customer") or ""
+            status = payment.get("status")
+            invoice_url = payment.get("invoiceUrl")
+
+            payment_obj = existentes.get(payment_id)
+            if payment_obj is None:
+                payment_obj = AsaasPayment(
+                    asaas_id=payment_id,
+                    customer_id=customer,
+                    amount=amount if amount is not None else Decimal("0"),
+                    billing_type=billing_type,
+                    status=payment.get("status", ""),
+                )
 
-        return (updated_assinaturas, activated_assinaturas)
+            fields_to_update = []
+            if payment_obj.customer_id != customer and customer:
+                payment_obj.customer_id = customer
+                fields_to_update.append("customer_id")
+            if payment_obj.amount != amount and amount is not None:
+                payment_obj.amount = amount
+                fields_to_update.append("amount")
+            if billing_type and payment_obj.billing_type != billing_type:
+                payment_obj.billing_type = billing_type
+                fields_to_update.append("billing_type")
+            if status and payment_obj.status != status:
+                payment_obj.status = status
+                fields_to_update.append("status")
+            if payment_date and payment_obj.paid_at != payment_date:
+                payment_obj.paid_at = payment_date
+                fields_to_update.append("paid_at")
+            if invoice_url and payment_obj.invoice_url != invoice_url:
+                payment_obj.invoice_url = invoice_url
+                fields_to_update.append("invoice_url")
+
+            objs.append(payment_obj)
+            if fields_to_update:
+                changed[payment_id] = fields_to_update
+        return objs, changed
 
     def _activate_subscription_if_needed(
         self,
         assinatura: AssinaturaUsuario,
-        payment_obj: AsaasPayment,
+        payment_id: str,
         payment_date,
         amount: Optional[Decimal],
         billing_type: str,
-        dry_run: bool,
-    ) -> Tuple[bool, bool]:
+    ) -> bool:
         """
-        Retorna (assinatura_atualizada, assinatura_ativada).
+        Ativa a assinatura em memória (a gravação é feita em lote).
+        Retorna True se a assinatura foi ativada.
         """
         if assinatura.status != "aguardando_pagamento":
             logger.debug(
@@ -271,17 +363,12 @@ class Command(BaseCommand):
                 assinatura.id,
                 assinatura.status,
             )
-            return (0, 0)
-
-        ativada = False
-        assinatura_atualizada = False
+            return False
 
         nova_data_inicio = payment_date or timezone.now()
         nova_data_fim = nova_data_inicio + timedelta(days=assinatura.plano.duracao_dias)
 
         assinatura.status = "ativa"
-        assinatura_atualizada = True
-        ativada = True
 
         if assinatura.data_inicio is None or assinatura.data_inicio < nova_data_inicio:
             assinatura.data_inicio = nova_data_inicio
@@ -293,21 +380,15 @@ class Command(BaseCommand):
         if billing_type:
             assinatura.metodo_pagamento = billing_type
 
-        assinatura.asaas_payment_id = payment_obj.asaas_id
-
-        if not dry_run:
-            with transaction.atomic():
-                assinatura.save()
-
         logger.info(
             "Assinatura %s atualizada para 'ativa' com pagamento %s (valor=%s, método=%s).",
             assinatura.id,
-            payment_obj.asaas_id,
+            payment_id,
             amount if amount is not None else "n/d",
             billing_type or "n/d",
         )
 
-        return (assinatura_atualizada, ativada)
+        return True
 
     def _safe_decimal(self, value) -> Optional[Decimal]:
         if value in (None, ""):
@@ -0,0 +1,139 @@
+"""
+Métricas de requisições por hora (RequestMetricBucket).
+
+As janelas horárias são gravadas pelo BufferAtividade (authentication.atividade).
+Este módulo cuida do ciclo de vida e das consultas do painel:
+
+- ``compactar_metricas``: janelas horárias com mais de
+  ``REQUEST_METRICS_HOURLY_DAYS`` dias são somadas em janelas diárias e
+  tudo que passa de ``REQUEST_METRICS_RETENTION_DAYS`` dias é apagado;
+- ``carga_por_hora`` e ``rotas_mais_acessadas``: agregados para o painel.
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from .models import RequestMetricBucket, estimate_percentile
+
+CAMPOS_FAIXAS = [campo for campo, _ in RequestMetricBucket.LATENCY_BUCKETS]
+CAMPOS_SOMADOS = ["count", "total_latency_ms"] + CAMPOS_FAIXAS
+SOMAS = {f"soma_{campo}": Sum(campo) for campo in CAMPOS_SOMADOS}
+
+
+def _inicio_do_dia(momento):
+    return momento.astimezone(dt_timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def compactar_metricas(agora=None, dias_detalhe=None, dias_retencao=None, batch_size=500):
+    """
+    Compacta janelas horárias antigas em diárias e aplica a retenção.
+    Retorna {"compactadas": n, "diarias": n, "removidas": n}.
+    """
+    agora = agora or timezone.now()
+    if dias_detalhe is None:
+        dias_detalhe = getattr(settings, "REQUEST_METRICS_HOURLY_DAYS", 7)
+    if dias_retencao is None:
+        dias_retencao = getattr(settings, "REQUEST_METRICS_RETENTION_DAYS", 90)
+
+    # Apenas dias completos são compactados
+    corte = _inicio_do_dia(agora - timedelta(days=dias_detalhe))
+    horarias = RequestMetricBucket.objects.filter(
+        granularity=RequestMetricBucket.GRANULARITY_HOUR, bucket_start__lt=corte
+    )
+
+    with transaction.atomic():
+        grupos = list(
+            horarias.annotate(dia=TruncDay("bucket_start", tzinfo=dt_timezone.utc))
+            .order_by()
+            .values("user_id", "dia", "route", "method")
+            .annotate(**SOMAS, max_latency=Max("max_latency_ms"))
+        )
+
+        # Janelas diárias que já existem (compactações anteriores ou
+        # gravações atrasadas) são somadas em vez de duplicadas
+        dias = {grupo["dia"] for grupo in grupos}
+        existentes = {
+            (d.user_id, d.bucket_start, d.route, d.method): d
+            for d in RequestMetricBucket.objects.filter(
+                granularity=RequestMetricBucket.GRANULARITY_DAY, bucket_start__in=dias
+            )
+        }
+        novas, alteradas = [], []
+        for grupo in grupos:
+            chave = (grupo["user_id"], grupo["dia"], grupo["route"], grupo["method"])
+            diaria = existentes.get(chave)
+            if diaria is None:
+                diaria = RequestMetricBucket(
+                    user_id=grupo["user_id"],
+                    bucket_start=grupo["dia"],
+                    granularity=RequestMetricBucket.GRANULARITY_DAY,
+                    route=grupo["route"],
+                    method=grupo["method"],
+                )
+                novas.append(diaria)
+            else:
+                alteradas.append(diaria)
+            for campo in CAMPOS_SOMADOS:
+                setattr(diaria, campo, getattr(diaria, campo) + (grupo[f"soma_{campo}"] or 0))
+            diaria.max_latency_ms = max(diaria.max_latency_ms, grupo["max_latency"] or 0)
+
+        RequestMetricBucket.objects.bulk_create(novas, batch_size=batch_size)
+        RequestMetricBucket.objects.bulk_update(
+            alteradas, CAMPOS_SOMADOS + ["max_latency_ms"], batch_size=batch_size
+        )
+        compactadas, _ = horarias.delete()
+        removidas, _ = RequestMetricBucket.objects.filter(
+            bucket_start__lt=agora - timedelta(days=dias_retencao)
+        ).delete()
+
+    return {"compactadas": compactadas, "diarias": len(grupos), "removidas": removidas}
+
+
+def carga_por_hora(horas=24, agora=None):
+    """Requisições e latência de todos os usuários nas últimas ``horas`` horas."""
+    agora = agora or timezone.now()
+    inicio = agora.replace(minute=0, second=0, microsecond=0) - timedelta(hours=horas - 1)
+    linhas = (
+        RequestMetricBucket.objects.filter(
+            granularity=RequestMetricBucket.GRANULARITY_HOUR, bucket_start__gte=inicio
+        )
+        .order_by("bucket_start")
+        .values("bucket_start")
+        .annotate(**SOMAS, max_latency=Max("max_latency_ms"))
+    )
+    return [_resumo(linha, hora=linha["bucket_start"]) for linha in linhas]
+
+
+def rotas_mais_acessadas(horas=24, limite=10, agora=None):
+    """Rotas com mais requisições nas últimas ``horas`` horas, com p95."""
+    agora = agora or timezone.now()
+    inicio = agora.replace(minute=0, second=0, microsecond=0) - timedelta(hours=horas - 1)
+    linhas = (
+        RequestMetricBucket.objects.filter(
+            granularity=RequestMetricBucket.GRANULARITY_HOUR, bucket_start__gte=inicio
+        )
+        .order_by()
+        .values("route", "method")
+        .annotate(**SOMAS, max_latency=Max("max_latency_ms"))
+        .order_by("-soma_count", "route")[:limite]
+    )
+    return [_resumo(linha, route=linha["route"], method=linha["method"]) for linha in linhas]
+
+
+def _resumo(linha, **extra):
+    total = linha["soma_count"] or 0
+    return {
+        **extra,
+        "count": total,
+        "avg_latency_ms": (linha["soma_total_latency_ms"] or 0) / total if total else 0,
+        "p95_latency_ms": estimate_percentile(
+            [linha[f"soma_{campo}"] or 0 for campo in CAMPOS_FAIXAS], linha["max_latency"] or 0
+        ),
+    }
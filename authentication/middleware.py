@@ -1,11 +1,12 @@
 import logging
+import time
 
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse
-from django.utils import timezone
 
-from .models import AssinaturaUsuario, UserActivityLog
+from .assinatura import STATUS_EXPIRADA, status_assinatura
+from .atividade import buffer_atividade, nome_da_rota
 
 try:
     from .utils import get_client_ip, get_user_agent
@@ -101,34 +102,16 @@ class SubscriptionExpirationMiddleware:
             )
             return redirect("authentication:plan_selection")
 
-        # Verificar se a assinatura expirou
+        # Verificar se a assinatura expirou (status memorizado no request e
+        # reaproveitado pelos mixins das views)
         try:
-            # Buscar assinatura ativa mais recente
-            assinatura = (
-                AssinaturaUsuario.objects.filter(usuario=request.user, status="ativa")
-                .order_by("-data_inicio")
-                .first()
-            )
-
-            if not assinatura:
-                # Usuário não tem assinatura ativa - permitir apenas visualização
-                # Não redirecionar aqui, deixar as views decidirem
-                pass
-
-            # Verificar se a assinatura expirou (apenas se existir)
-            if assinatura:
-                agora = timezone.now()
-                if assinatura.data_fim < agora:
-                    # Marcar como expirada e redirecionar
-                    assinatura.status = "expirada"
-                    assinatura.save()
-
-                    safe_add_message(
-                        request,
-                        messages.WARNING,
-                        "Seu período gratuito expirou. Selecione um plano para continuar usando o sistema.",
-                    )
-                    return redirect("authentication:plan_selection")
+            if status_assinatura(request) == STATUS_EXPIRADA:
+                safe_add_message(
+                    request,
+                    messages.WARNING,
+                    "Seu período gratuito expirou. Selecione um plano para continuar usando o sistema.",
+                )
+                return redirect("authentication:plan_selection")
 
         except Exception as e:
             logging.error(
@@ -151,6 +134,7 @@ class UserActivityTrackingMiddleware:
     """
     Middleware para registrar métricas básicas de uso dos usuários.
     Executa após a view para capturar status final da requisição.
+    Os contadores são gravados em lote pelo BufferAtividade.
     """
 
     def __init__(self, get_response):
@@ -158,7 +142,9 @@ class UserActivityTrackingMiddleware:
         self.logger = logging.getLogger(__name__)
 
     def __call__(self, request):
+        inicio = time.perf_counter()
         response = self.get_response(request)
+        latencia_ms = (time.perf_counter() - inicio) * 1000
 
         try:
             user = getattr(request, "user", None)
@@ -170,12 +156,16 @@ class UserActivityTrackingMiddleware:
                 if request.path.startswith(("/static/", "/media/")):
                     return response
 
-                activity, _ = UserActivityLog.objects.get_or_create(user=user)
-                activity.increment_request(
+                # Apenas acumula em memória; a gravação é feita em lote
+                # (ver authentication.atividade).
+                buffer_atividade.registrar(
+                    user.pk,
                     method=request.method,
                     path=request.path,
                     user_agent=get_user_agent(request),
                     ip=get_client_ip(request),
+                    route=nome_da_rota(request),
+                    latency_ms=latencia_ms,
                 )
         except Exception as exc:
             self.logger.exception("Falha ao registrar atividade do usuário: %s", exc)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_alter_legaldocument_document_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assinaturausuario',
+            index=models.Index(fields=['status', 'data_fim'], name='assinatura_status_fim_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_indice_expiracao_assinatura'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestMetricBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('granularity', models.CharField(choices=[('hour', 'Hora'), ('day', 'Dia')], default='hour', max_length=4)),
+                ('route', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('total_latency_ms', models.FloatField(default=0)),
+                ('max_latency_ms', models.FloatField(default=0)),
+                ('le_10ms', models.PositiveBigIntegerField(default=0)),
+                ('le_25ms', models.PositiveBigIntegerField(default=0)),
+                ('le_50ms', models.PositiveBigIntegerField(default=0)),
+                ('le_100ms', models.PositiveBigIntegerField(default=0)),
+                ('le_250ms', models.PositiveBigIntegerField(default=0)),
+                ('le_500ms', models.PositiveBigIntegerField(default=0)),
+                ('le_1s', models.PositiveBigIntegerField(default=0)),
+                ('le_2500ms', models.PositiveBigIntegerField(default=0)),
+                ('le_5s', models.PositiveBigIntegerField(default=0)),
+                ('gt_5s', models.PositiveBigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='request_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Métrica de Requisições',
+                'verbose_name_plural': 'Métricas de Requisições',
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='request_metric_periodo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'bucket_start', 'granularity', 'route', 'method'), name='request_metric_bucket_unique')],
+            },
+        ),
+    ]
@@ -1,9 +1,7 @@
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
-from django.utils import timezone
-from datetime import timedelta
-from .models import AssinaturaUsuario
+from .assinatura import status_assinatura
 
 
 class SubscriptionRequiredMixin:
@@ -49,28 +47,9 @@ class SubscriptionRequiredMixin:
         return super().dispatch(request, *args, **kwargs)
 
     def get_assinatura_status(self, user):
-        """Determina o status da assinatura do usuário"""
+        """Determina o status da assinatura do usuário (uma vez por requisição)"""
         try:
-            # Buscar assinatura ativa mais recente
-            assinatura = (
-                AssinaturaUsuario.objects.filter(usuario=user, status="ativa")
-                .order_by("-data_inicio")
-                .first()
-            )
-
-            if not assinatura:
-                return "sem_assinatura"
-
-            # Verificar se a assinatura expirou
-            agora = timezone.now()
-            if assinatura.data_fim < agora:
-                # Marcar como expirada
-                assinatura.status = "expirada"
-                assinatura.save()
-                return "expirada"
-
-            return "ativa"
-
+            return status_assinatura(self.request)
         except Exception:
             return "sem_assinatura"
 
@@ -127,28 +106,9 @@ class ReadOnlyForExpiredMixin:
         return super().dispatch(request, *args, **kwargs)
 
     def get_assinatura_status(self, user):
-        """Determina o status da assinatura do usuário"""
+        """Determina o status da assinatura do usuário (uma vez por requisição)"""
         try:
-            # Buscar assinatura ativa mais recente
-            assinatura = (
-                AssinaturaUsuario.objects.filter(usuario=user, status="ativa")
-                .order_by("-data_inicio")
-                .first()
-            )
-
-            if not assinatura:
-                return "sem_assinatura"
-
-            # Verificar se a assinatura expirou
-            agora = timezone.now()
-            if assinatura.data_fim < agora:
-                # Marcar como expirada
-                assinatura.status = "expirada"
-                assinatura.save()
-                return "expirada"
-
-            return "ativa"
-
+            return status_assinatura(self.request)
         except Exception:
             return "sem_assinatura"
 
@@ -134,6 +134,9 @@ class AssinaturaUsuario(models.Model):
         verbose_name = "Assinatura do Usuário"
         verbose_name_plural = "Assinaturas dos Usuários"
         ordering = ["-data_inicio"]
+        indexes = [
+            models.Index(fields=["status", "data_fim"], name="assinatura_status_fim_idx"),
+        ]
 
     def __str__(self):
         return f"{self.usuario.username} - {self.plano.nome} ({self.status})"
@@ -264,6 +267,110 @@ class UserActivityLog(models.Model):
         return int(self.total_requests / days_active)
 
 
+class RequestMetricBucket(models.Model):
+    """
+    Requisições agregadas por usuário, rota (nome da URL) e método HTTP em
+    janelas de uma hora. As latências ficam num histograma de faixas fixas,
+    de onde se estima o p95. Janelas antigas são compactadas por dia pelo
+    comando ``compactar_metricas_requisicoes``.
+    """
+
+    GRANULARITY_HOUR = "hour"
+    GRANULARITY_DAY = "day"
+    GRANULARITY_CHOICES = [
+        (GRANULARITY_HOUR, "Hora"),
+        (GRANULARITY_DAY, "Dia"),
+    ]
+
+    # (campo, limite superior da faixa em ms); a última faixa não tem limite
+    LATENCY_BUCKETS = [
+        ("le_10ms", 10),
+        ("le_25ms", 25),
+        ("le_50ms", 50),
+        ("le_100ms", 100),
+        ("le_250ms", 250),
+        ("le_500ms", 500),
+        ("le_1s", 1000),
+        ("le_2500ms", 2500),
+        ("le_5s", 5000),
+        ("gt_5s", None),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="request_metrics"
+    )
+    bucket_start = models.DateTimeField()
+    granularity = models.CharField(
+        max_length=4, choices=GRANULARITY_CHOICES, default=GRANULARITY_HOUR
+    )
+    route = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    count = models.PositiveBigIntegerField(default=0)
+    total_latency_ms = models.FloatField(default=0)
+    max_latency_ms = models.FloatField(default=0)
+    le_10ms = models.PositiveBigIntegerField(default=0)
+    le_25ms = models.PositiveBigIntegerField(default=0)
+    le_50ms = models.PositiveBigIntegerField(default=0)
+    le_100ms = models.PositiveBigIntegerField(default=0)
+    le_250ms = models.PositiveBigIntegerField(default=0)
+    le_500ms = models.PositiveBigIntegerField(default=0)
+    le_1s = models.PositiveBigIntegerField(default=0)
+    le_2500ms = models.PositiveBigIntegerField(default=0)
+    le_5s = models.PositiveBigIntegerField(default=0)
+    gt_5s = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Métrica de Requisições"
+        verbose_name_plural = "Métricas de Requisições"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "bucket_start", "granularity", "route", "method"],
+                name="request_metric_bucket_unique",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["granularity", "bucket_start"], name="request_metric_periodo_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.method} {self.route} @ {self.bucket_start:%Y-%m-%d %H:00}"
+
+    @classmethod
+    def bucket_for(cls, latency_ms):
+        """Campo do histograma em que a latência se encaixa."""
+        for field, limit in cls.LATENCY_BUCKETS:
+            if limit is None or latency_ms <= limit:
+                return field
+
+    @property
+    def avg_latency_ms(self):
+        return self.total_latency_ms / self.count if self.count else 0
+
+    @property
+    def p95_latency_ms(self):
+        """Estimativa do p95: limite superior da faixa que contém o percentil."""
+        return estimate_percentile(
+            [getattr(self, field) for field, _ in self.LATENCY_BUCKETS],
+            self.max_latency_ms,
+        )
+
+
+def estimate_percentile(bucket_counts, max_latency_ms, percentile=0.95):
+    """Percentil aproximado a partir das contagens de LATENCY_BUCKETS."""
+    total = sum(bucket_counts)
+    if not total:
+        return 0
+    target = total * percentile
+    acumulado = 0
+    for (field, limit), quantidade in zip(RequestMetricBucket.LATENCY_BUCKETS, bucket_counts):
+        acumulado += quantidade
+        if acumulado >= target:
+            return min(limit, max_latency_ms) if limit is not None else max_latency_ms
+    return max_latency_ms
+
+
 class LegalDocument(models.Model):
     """Armazena versões de documentos legais (termos, políticas, contratos)."""
 
@@ -6,11 +6,14 @@ from django.contrib.auth.signals import (
     user_logged_out,
     user_login_failed,
 )
-from django.db.models.signals import post_save
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import UserActivityLog
+from .assinatura import assinatura_expirada, invalidar_status_assinatura
+from .atividade import gravar_atividade_pendente
+from .models import AssinaturaUsuario, UserActivityLog
 from .utils import get_client_ip, get_user_agent
 
 
@@ -21,6 +24,24 @@ def ensure_activity_log_exists(sender, instance, created, **kwargs):
         UserActivityLog.objects.get_or_create(user=instance)
 
 
+request_finished.connect(
+    gravar_atividade_pendente, dispatch_uid="authentication.gravar_atividade_pendente"
+)
+
+
+@receiver(post_save, sender=AssinaturaUsuario)
+@receiver(post_delete, sender=AssinaturaUsuario)
+def assinatura_alterada(sender, instance, **kwargs):
+    """Checkout, webhook ou expiração: descarta o status em cache."""
+    invalidar_status_assinatura(instance.usuario_id)
+
+
+@receiver(assinatura_expirada)
+def assinatura_expirada_em_lote(sender, usuario_id, **kwargs):
+    """O sweeper usa UPDATE em lote (sem post_save): descarta o cache aqui."""
+    invalidar_status_assinatura(usuario_id)
+
+
 @receiver(user_logged_in)
 def handle_user_logged_in(sender, request, user, **kwargs):
     if not user or not user.is_authenticated:
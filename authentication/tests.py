@@ -7,3 +7,660 @@ class AuthTestCase(TestCase):
     def test_placeholder(self):
         """Placeholder test that always passes."""
         self.assertTrue(True)
+
+
+class StatusAssinaturaTestCase(TestCase):
+    """Testes do resolvedor de status de assinatura por requisição"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from django.utils import timezone
+        from .models import AssinaturaUsuario, Plano
+
+        cache.clear()
+        self.user = User.objects.create_user(username="assinante", password="senha-123")
+        self.plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        self.assinatura = AssinaturaUsuario.objects.create(
+            usuario=self.user,
+            plano=self.plano,
+            status="ativa",
+            data_fim=timezone.now() + timedelta(days=10),
+        )
+        self.client.login(username="assinante", password="senha-123")
+
+    def consultas_de_assinatura(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        total = sum(
+            "authentication_assinaturausuario" in query["sql"] for query in queries
+        )
+        return response, total
+
+    def test_uma_consulta_por_requisicao_e_cache_entre_requisicoes(self):
+        from django.urls import reverse
+
+        url = reverse("agendamentos:cliente_list")
+        response, consultas = self.consultas_de_assinatura(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, 1)
+
+        response, consultas = self.consultas_de_assinatura(url)
+        self.assertEqual(consultas, 0)
+        self.assertFalse(response.context["read_only_mode"])
+
+    def test_expiracao_detectada_mesmo_com_cache(self):
+        from datetime import timedelta
+        from unittest import mock
+        from django.urls import reverse
+        from django.utils import timezone
+        from .assinatura import assinatura_ativa_recente
+
+        assinatura_ativa_recente(self.user.pk)  # aquece o cache
+        depois_do_fim = timezone.now() + timedelta(days=11)
+        with mock.patch("authentication.assinatura.timezone") as relogio:
+            relogio.now.return_value = depois_do_fim
+            response = self.client.get(reverse("agendamentos:cliente_list"))
+        self.assertRedirects(
+            response, reverse("authentication:plan_selection"), fetch_redirect_response=False
+        )
+        # A requisição só lê; quem grava o novo status é o sweeper
+        self.assinatura.refresh_from_db()
+        self.assertEqual(self.assinatura.status, "ativa")
+
+    def test_gravacao_invalida_o_cache(self):
+        from .assinatura import STATUS_SEM_ASSINATURA, assinatura_ativa_recente, calcular_status_assinatura
+
+        self.assertIsNotNone(assinatura_ativa_recente(self.user.pk))
+        self.assinatura.status = "cancelada"
+        self.assinatura.save()
+        self.assertEqual(calcular_status_assinatura(self.user), STATUS_SEM_ASSINATURA)
+
+
+class ExpirarAssinaturasTestCase(TestCase):
+    """Testes do sweeper de assinaturas vencidas"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from django.utils import timezone
+        from .models import AssinaturaUsuario, Plano
+
+        cache.clear()
+        plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        agora = timezone.now()
+        self.vencido = User.objects.create_user(username="vencido", password="senha-123")
+        self.em_dia = User.objects.create_user(username="em_dia", password="senha-123")
+        for data_fim in (agora - timedelta(days=2), agora - timedelta(days=1)):
+            AssinaturaUsuario.objects.create(
+                usuario=self.vencido, plano=plano, status="ativa", data_fim=data_fim
+            )
+        self.assinatura_em_dia = AssinaturaUsuario.objects.create(
+            usuario=self.em_dia, plano=plano, status="ativa", data_fim=agora + timedelta(days=5)
+        )
+
+    def test_expira_em_lote_e_emite_evento_por_usuario(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .assinatura import assinatura_ativa_recente, assinatura_expirada, expirar_assinaturas_vencidas
+        from .models import AssinaturaUsuario
+
+        assinatura_ativa_recente(self.vencido.pk)  # aquece o cache
+        eventos = []
+
+        def receptor(sender, usuario_id, quantidade, **kwargs):
+            eventos.append((usuario_id, quantidade))
+
+        assinatura_expirada.connect(receptor)
+        self.addCleanup(assinatura_expirada.disconnect, receptor)
+
+        with CaptureQueriesContext(connection) as queries:
+            total, por_usuario = expirar_assinaturas_vencidas()
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(total, 2)
+        self.assertEqual(por_usuario, {self.vencido.pk: 2})
+        self.assertEqual(eventos, [(self.vencido.pk, 2)])
+        self.assertEqual(
+            AssinaturaUsuario.objects.filter(usuario=self.vencido, status="expirada").count(), 2
+        )
+        self.assinatura_em_dia.refresh_from_db()
+        self.assertEqual(self.assinatura_em_dia.status, "ativa")
+        # O receptor padrão invalidou o cache do usuário
+        self.assertIsNone(assinatura_ativa_recente(self.vencido.pk))
+
+    def test_comando_reporta_linhas_e_tempo(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import AssinaturaUsuario
+
+        saida = StringIO()
+        call_command("expirar_assinaturas", "--dry-run", stdout=saida)
+        self.assertIn("2 assinatura(s) seriam expiradas de 1 usuário(s)", saida.getvalue())
+        self.assertEqual(AssinaturaUsuario.objects.filter(status="expirada").count(), 0)
+
+        saida = StringIO()
+        call_command("expirar_assinaturas", stdout=saida)
+        self.assertIn("2 assinatura(s) expiradas de 1 usuário(s)", saida.getvalue())
+        self.assertIn(" ms.", saida.getvalue())
+
+        saida = StringIO()
+        call_command("expirar_assinaturas", stdout=saida)
+        self.assertIn("0 assinatura(s) expiradas de 0 usuário(s)", saida.getvalue())
+
+
+class AtividadeBufferTestCase(TestCase):
+    """Testes do registro de atividade com gravação em lote"""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from .atividade import buffer_atividade
+
+        buffer_atividade._retirar()
+        self.buffer = buffer_atividade
+        self.user = User.objects.create_user(username="ativo", password="senha-123")
+        self.addCleanup(buffer_atividade._retirar)
+
+    def test_middleware_nao_grava_por_requisicao(self):
+        from django.db import connection
+        from django.test import override_settings
+        from django.test.utils import CaptureQueriesContext
+        from .models import UserActivityLog
+
+        self.client.login(username="ativo", password="senha-123")
+        with override_settings(
+            ACTIVITY_FLUSH_INTERVAL_SECONDS=3600, ACTIVITY_FLUSH_MAX_REQUESTS=1000
+        ):
+            self.buffer._retirar()
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(3):
+                    self.client.get("/")
+            self.assertFalse(
+                any("authentication_useractivitylog" in q["sql"] for q in queries)
+            )
+
+        self.assertEqual(self.buffer.gravar(), 1)
+        log = UserActivityLog.objects.get(user=self.user)
+        self.assertEqual(log.total_requests, 3)
+        self.assertEqual(log.total_get_requests, 3)
+        self.assertEqual(log.last_request_path, "/")
+
+    def test_deltas_agregados_e_limite_de_requisicoes(self):
+        from django.core.signals import request_finished
+        from django.test import override_settings
+        from .models import UserActivityLog
+
+        with override_settings(
+            ACTIVITY_FLUSH_INTERVAL_SECONDS=3600, ACTIVITY_FLUSH_MAX_REQUESTS=3
+        ):
+            self.buffer.registrar(self.user.pk, "GET", "/a/")
+            self.buffer.registrar(self.user.pk, "POST", "/b/", ip="10.0.0.1")
+            request_finished.send(sender=None)
+            self.assertEqual(UserActivityLog.objects.get(user=self.user).total_requests, 0)
+
+            self.buffer.registrar(self.user.pk, "DELETE", "/c/")
+            request_finished.send(sender=None)
+
+        log = UserActivityLog.objects.get(user=self.user)
+        self.assertEqual(log.total_requests, 3)
+        self.assertEqual(log.total_get_requests, 1)
+        self.assertEqual(log.total_post_requests, 1)
+        self.assertEqual(log.total_delete_requests, 1)
+        self.assertEqual(log.last_request_path, "/c/")
+        self.assertEqual(log.last_login_ip, "10.0.0.1")
+        self.assertFalse(self.buffer.precisa_gravar())
+
+    def test_falha_na_gravacao_preserva_deltas(self):
+        from unittest import mock
+        from .models import UserActivityLog
+
+        self.buffer.registrar(self.user.pk, "GET", "/a/")
+        with mock.patch.object(self.buffer, "_gravar", side_effect=RuntimeError):
+            self.assertEqual(self.buffer.gravar(), 0)
+
+        self.buffer.registrar(self.user.pk, "GET", "/b/")
+        self.buffer.gravar()
+        log = UserActivityLog.objects.get(user=self.user)
+        self.assertEqual(log.total_requests, 2)
+        self.assertEqual(log.last_request_path, "/b/")
+
+
+class TemasTestCase(TestCase):
+    """Testes dos temas pré-gerados e do tema em sessão"""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from .models import PreferenciasUsuario
+
+        self.user = User.objects.create_user(username="temas", password="senha-123")
+        PreferenciasUsuario.objects.create(usuario=self.user, tema="ocean", modo="light")
+        self.client.login(username="temas", password="senha-123")
+
+    def test_arquivos_css_estao_atualizados(self):
+        from django.contrib.staticfiles import finders
+        from .temas import MODOS, TEMAS, caminho_css_tema, gerar_css_tema
+
+        for tema in TEMAS:
+            for modo in MODOS:
+                caminho = finders.find(caminho_css_tema(tema, modo))
+                self.assertIsNotNone(caminho, f"Rode manage.py gerar_css_temas ({tema}-{modo})")
+                with open(caminho, encoding="utf-8") as arquivo:
+                    self.assertEqual(arquivo.read(), gerar_css_tema(tema, modo))
+
+    def test_tema_lido_da_sessao_sem_consultas(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+
+        url = reverse("agendamentos:cliente_list")
+        response = self.client.get(url)
+        self.assertContains(response, "css/temas/ocean-light.css")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(
+            any("authentication_preferenciasusuario" in q["sql"] for q in queries)
+        )
+
+    def test_alterar_modo_atualiza_sessao(self):
+        from django.urls import reverse
+
+        response = self.client.post(reverse("authentication:alterar_modo"), {"modo": "dark"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse("agendamentos:cliente_list"))
+        self.assertContains(response, "css/temas/ocean-dark.css")
+        self.assertTrue(response.context["is_dark_mode"])
+
+
+class SyncPaidSubscriptionsTestCase(TestCase):
+    """Testes da sincronização concorrente de pagamentos confirmados"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from .models import AssinaturaUsuario, Plano
+
+        plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        self.assinaturas = []
+        for indice in range(3):
+            usuario = User.objects.create_user(username=f"pagante{indice}", password="senha-123")
+            self.assinaturas.append(
+                AssinaturaUsuario.objects.create(
+                    usuario=usuario,
+                    plano=plano,
+                    status="aguardando_pagamento",
+                    data_fim=timezone.now() + timedelta(days=1),
+                    asaas_payment_id=f"pay_{indice}" if indice < 2 else None,
+                )
+            )
+        hoje = timezone.now().date().isoformat()
+        self.pagamentos = [
+            {"id": "pay_0", "status": "RECEIVED", "value": 9, "billingType": "PIX", "paymentDate": hoje},
+            {"id": "pay_x", "status": "PENDING", "value": 9},
+            {"id": "pay_1", "status": "CONFIRMED", "value": 10, "billingType": "CREDIT_CARD", "paymentDate": hoje},
+            {
+                "id": "pay_2",
+                "status": "RECEIVED",
+                "value": 9,
+                "billingType": "PIX",
+                "paymentDate": hoje,
+                "externalReference": f"assinatura_{self.assinaturas[2].pk}",
+            },
+            {"id": "pay_sem", "status": "RECEIVED", "value": 9, "paymentDate": hoje},
+        ]
+
+    def test_paginas_em_paralelo_com_escrita_em_lote(self):
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+        from financeiro.models import AsaasPayment
+
+        cliente = mock.Mock()
+
+        def list_payments(limit, offset, extra_params):
+            data = self.pagamentos[offset:offset + limit]
+            return {"data": data, "hasMore": offset + limit < len(self.pagamentos)}
+
+        cliente.list_payments.side_effect = list_payments
+        saida = StringIO()
+        with mock.patch(
+            "authentication.management.commands.sync_paid_subscriptions.get_asaas_client",
+            return_value=cliente,
+        ):
+            call_command(
+                "sync_paid_subscriptions", "--workers", "3", "--page-size", "2", stdout=saida
+            )
+
+        for assinatura in self.assinaturas:
+            assinatura.refresh_from_db()
+            self.assertEqual(assinatura.status, "ativa")
+        self.assertEqual(self.assinaturas[2].asaas_payment_id, "pay_2")
+        self.assertEqual(AsaasPayment.objects.count(), 4)
+        self.assertEqual(cliente.list_payments.call_count, 3)
+
+        texto = saida.getvalue()
+        self.assertIn("Pagamentos recuperados: 5", texto)
+        self.assertIn("Assinaturas atualizadas: 3 (ativadas: 3)", texto)
+        self.assertIn("Pagamentos sem assinatura correspondente: 1", texto)
+        self.assertIn("pagamentos/s", texto)
+
+
+class PainelUsuariosTestCase(TestCase):
+    """Testes do painel de atividade agregado no banco"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        from agendamentos.models import Agendamento, Cliente, TipoServico
+
+        User = get_user_model()
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin_painel", "admin@x.com", "senha123")
+        self.users = []
+        for indice in range(3):
+            user = User.objects.create_user(f"tenant{indice}", f"t{indice}@x.com", "senha123")
+            self.users.append(user)
+            servico = TipoServico.objects.create(
+                nome=f"Serviço {indice}", duracao=timedelta(minutes=30), preco=10, criado_por=user
+            )
+            for c in range(indice + 1):
+                cliente = Cliente.objects.create(
+                    nome=f"Cliente {indice}-{c}", telefone="(11) 99999-9999", criado_por=user
+                )
+                Agendamento.objects.create(
+                    cliente=cliente,
+                    servico=servico,
+                    data_agendamento=date.today() + timedelta(days=1),
+                    hora_inicio=f"1{c}:00",
+                    hora_fim=f"1{c}:30",
+                    valor_cobrado=10,
+                    observacoes="x" * 100 * (indice + 1),
+                    criado_por=user,
+                )
+
+    def test_contagens_calculadas_no_banco(self):
+        from core.painel_usuarios import usuarios_anotados
+
+        with self.assertNumQueries(1):
+            usuarios = {u.username: u for u in usuarios_anotados()}
+
+        self.assertEqual(usuarios["tenant2"].total_clientes, 3)
+        self.assertEqual(usuarios["tenant2"].total_agendamentos, 3)
+        self.assertEqual(usuarios["tenant2"].total_agendamentos_abertos, 3)
+        self.assertEqual(usuarios["tenant1"].total_servicos, 1)
+        self.assertEqual(usuarios["admin_painel"].total_agendamentos, 0)
+
+    def test_armazenamento_medido_por_usuario(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .armazenamento import METODO_ESTIMATIVA, medir_armazenamento, tamanho_banco
+        from .models import UserActivityLog
+
+        metodo, por_usuario, por_tabela = medir_armazenamento()
+        bytes_de = {user.username: por_usuario.get(user.pk, 0) for user in self.users}
+        self.assertGreater(bytes_de["tenant2"], bytes_de["tenant1"])
+        self.assertGreater(bytes_de["tenant1"], bytes_de["tenant0"])
+        self.assertGreater(bytes_de["tenant1"] - bytes_de["tenant0"], 300)
+        self.assertIn("agendamentos_agendamento", por_tabela)
+        if metodo != METODO_ESTIMATIVA:
+            self.assertLessEqual(sum(por_usuario.values()), tamanho_banco())
+
+        saida = StringIO()
+        call_command("calcular_armazenamento_usuarios", stdout=saida)
+        self.assertIn("4 usuário(s)", saida.getvalue())
+        log = UserActivityLog.objects.get(user=self.users[2])
+        self.assertEqual(log.estimated_data_volume_bytes, bytes_de["tenant2"])
+        self.assertIsNotNone(log.last_data_volume_calculated)
+
+    def test_painel_ordenado_paginado_e_snapshot_em_cache(self):
+        from io import StringIO
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.test import override_settings
+        from django.urls import reverse
+        from core.painel_usuarios import CHAVE_SNAPSHOT
+
+        call_command("calcular_armazenamento_usuarios", stdout=StringIO())
+        self.client.force_login(self.admin)
+        url = reverse("admin_user_activity")
+        with mock.patch("core.admin_views.USUARIOS_POR_PAGINA", 2):
+            response = self.client.get(url, {"ordem": "-volume"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [row["username"] for row in response.context["user_rows"]],
+                ["tenant2", "tenant1"],
+            )
+            self.assertEqual(response.context["page_obj"].paginator.num_pages, 2)
+            self.assertEqual(response.context["total_users"], 4)
+
+            segunda = self.client.get(url, {"ordem": "-volume", "pagina": 2})
+            self.assertEqual(
+                [row["username"] for row in segunda.context["user_rows"]],
+                ["tenant0", "admin_painel"],
+            )
+            invalida = self.client.get(url, {"ordem": "senha"})
+            self.assertEqual(invalida.context["ordem"], "-requisicoes")
+
+        self.assertIsNotNone(cache.get(CHAVE_SNAPSHOT))
+        get_user_model().objects.create_user("novo_tenant")
+        self.assertEqual(self.client.get(url).context["total_users"], 4)  # snapshot em cache
+        call_command("atualizar_painel_usuarios", stdout=StringIO())
+        self.assertEqual(self.client.get(url).context["total_users"], 5)
+
+        saida = StringIO()
+        with override_settings(CACHE_SHARED_ACROSS_WORKERS=False):
+            call_command("atualizar_painel_usuarios", stdout=saida)
+        self.assertIn("nada a fazer", saida.getvalue())
+
+
+class MetricasRequisicoesTestCase(TestCase):
+    """Testes das métricas de requisições por hora"""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from .atividade import buffer_atividade
+
+        buffer_atividade._retirar()
+        self.buffer = buffer_atividade
+        self.user = User.objects.create_user(username="metricas", password="senha-123")
+        self.addCleanup(buffer_atividade._retirar)
+
+    def test_buffer_grava_janelas_horarias_com_histograma(self):
+        from .models import RequestMetricBucket
+
+        self.buffer.registrar(self.user.pk, "GET", "/a/", route="rota_a", latency_ms=8)
+        self.buffer.registrar(self.user.pk, "GET", "/a/", route="rota_a", latency_ms=120)
+        self.buffer.registrar(self.user.pk, "POST", "/b/", route="rota_b", latency_ms=30)
+        self.buffer.gravar()
+        self.buffer.registrar(self.user.pk, "GET", "/a/", route="rota_a", latency_ms=40)
+        self.buffer.gravar()
+
+        self.assertEqual(RequestMetricBucket.objects.count(), 2)
+        metrica = RequestMetricBucket.objects.get(route="rota_a", method="GET")
+        self.assertEqual(metrica.count, 3)
+        self.assertEqual(metrica.total_latency_ms, 168)
+        self.assertEqual(metrica.max_latency_ms, 120)
+        self.assertEqual((metrica.le_10ms, metrica.le_50ms, metrica.le_250ms), (1, 1, 1))
+        self.assertEqual(metrica.p95_latency_ms, 120)
+        self.assertEqual(metrica.bucket_start.minute, 0)
+
+    def test_middleware_registra_rota_resolvida(self):
+        from .models import RequestMetricBucket
+
+        self.client.login(username="metricas", password="senha-123")
+        self.buffer._retirar()
+        self.client.get("/")
+        self.client.get("/rota-que-nao-existe/")
+        self.buffer.gravar()
+
+        rotas = set(RequestMetricBucket.objects.values_list("route", flat=True))
+        self.assertIn("(não resolvida)", rotas)
+        self.assertTrue(any(rota not in ("", "(não resolvida)") for rota in rotas))
+
+    def test_compactacao_diaria_e_retencao(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import RequestMetricBucket
+
+        agora = timezone.now().replace(minute=0, second=0, microsecond=0)
+        antigo = (agora - timedelta(days=10)).replace(hour=10)
+
+        def criar(inicio, count):
+            RequestMetricBucket.objects.create(
+                user=self.user, bucket_start=inicio, route="rota_a", method="GET",
+                count=count, total_latency_ms=count * 10, max_latency_ms=count, le_10ms=count,
+            )
+
+        criar(antigo, 2)
+        criar(antigo + timedelta(hours=3), 5)
+        criar(agora - timedelta(days=120), 1)
+        criar(agora, 4)
+
+        call_command("compactar_metricas_requisicoes", stdout=StringIO())
+
+        horarias = RequestMetricBucket.objects.filter(granularity="hour")
+        self.assertEqual(list(horarias.values_list("count", flat=True)), [4])
+        diaria = RequestMetricBucket.objects.get(granularity="day")
+        self.assertEqual((diaria.count, diaria.le_10ms, diaria.max_latency_ms), (7, 7, 5))
+        self.assertEqual(diaria.bucket_start, antigo.replace(hour=0))
+
+        # Uma gravação atrasada do mesmo dia é somada à janela diária existente
+        criar(antigo + timedelta(hours=5), 1)
+        call_command("compactar_metricas_requisicoes", stdout=StringIO())
+        diaria.refresh_from_db()
+        self.assertEqual(diaria.count, 8)
+        self.assertEqual(RequestMetricBucket.objects.count(), 2)
+
+
+class MetricasPrometheusTestCase(TestCase):
+    """Testes do registro de métricas (core.metricas) e do endpoint /metrics/"""
+
+    def setUp(self):
+        from core.metricas import registro
+
+        registro.limpar()
+        self.addCleanup(registro.limpar)
+
+    def test_requisicao_registra_latencia_e_consultas(self):
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+
+        self.client.get(reverse("health_check"))
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        texto = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", texto)
+        self.assertIn(
+            'http_request_duration_seconds_count{view="health_check",method="GET",status="200"} 1',
+            texto,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="health_check",method="GET",status="200",le="+Inf"} 1',
+            texto,
+        )
+        self.assertIn('http_request_db_queries_bucket{view="health_check",le="1"} 1', texto)
+
+    def test_token_obrigatorio_quando_configurado(self):
+        from django.test import override_settings
+        from django.urls import reverse
+
+        with override_settings(METRICS_TOKEN="segredo"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer segredo")
+        self.assertEqual(response.status_code, 200)
+
+    def test_sem_token_apenas_equipe(self):
+        from django.contrib.auth.models import User
+        from django.test import override_settings
+        from django.urls import reverse
+
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            self.client.force_login(User.objects.create_user("cliente"))
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            self.client.force_login(User.objects.create_user("ops", is_staff=True))
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+    def test_diretorio_compartilhado_soma_os_processos(self):
+        import json
+        import os
+        import tempfile
+        from django.test import override_settings
+        from core.metricas import asaas_request_errors, registro, webhook_processing_duration
+
+        with tempfile.TemporaryDirectory() as diretorio, override_settings(METRICS_DIR=diretorio):
+            # Arquivo gravado por outro worker
+            with open(os.path.join(diretorio, "999-outro.json"), "w") as arquivo:
+                json.dump(
+                    {
+                        "asaas_request_errors_total": [[["payments/:id", "503"], 2]],
+                        "webhook_processing_duration_seconds": [
+                            [["PAYMENT_RECEIVED", "processed"], [1] + [0] * 11 + [0.004]]
+                        ],
+                        "metrica_removida": [[[], 1]],
+                    },
+                    arquivo,
+                )
+            asaas_request_errors.inc(endpoint="payments/:id", status=503)
+            webhook_processing_duration.observe(0.2, event="PAYMENT_RECEIVED", status="processed")
+
+            texto = registro.exportar_texto()
+            self.assertEqual(len([n for n in os.listdir(diretorio) if n.endswith(".json")]), 2)
+
+        self.assertIn('asaas_request_errors_total{endpoint="payments/:id",status="503"} 3', texto)
+        rotulos = 'event="PAYMENT_RECEIVED",status="processed"'
+        self.assertIn(f'webhook_processing_duration_seconds_bucket{{{rotulos},le="0.005"}} 1', texto)
+        self.assertIn(f'webhook_processing_duration_seconds_bucket{{{rotulos},le="0.25"}} 2', texto)
+        self.assertIn(f"webhook_processing_duration_seconds_count{{{rotulos}}} 2", texto)
+        self.assertNotIn("metrica_removida", texto)
+
+    def test_processos_encerrados_viram_um_agregado(self):
+        import json
+        import os
+        import tempfile
+        from unittest import mock
+        from django.test import override_settings
+        from core import metricas
+        from core.metricas import ARQUIVO_AGREGADO, asaas_request_errors, registro
+
+        if metricas.fcntl is None:
+            self.skipTest("Compactação exige fcntl")
+
+        with tempfile.TemporaryDirectory() as diretorio, override_settings(METRICS_DIR=diretorio):
+            registro.gravar()
+            self.assertEqual(os.listdir(diretorio), [])  # sem métricas, sem arquivo
+
+            for pid in (4000001, 4000002):
+                with open(os.path.join(diretorio, f"{pid}-abcd1234.json"), "w") as arquivo:
+                    json.dump({"asaas_request_errors_total": [[["payments", "500"], 1]]}, arquivo)
+            asaas_request_errors.inc(endpoint="payments", status=500)
+
+            serie = 'asaas_request_errors_total{endpoint="payments",status="500"} 3'
+            with mock.patch("core.metricas._processo_ativo", lambda pid: pid == os.getpid()):
+                self.assertIn(serie, registro.exportar_texto())
+                arquivos = [nome for nome in os.listdir(diretorio) if nome.endswith(".json")]
+                self.assertEqual(len(arquivos), 2)
+                self.assertIn(ARQUIVO_AGREGADO, arquivos)
+                # O agregado não é somado de novo nas coletas seguintes
+                self.assertIn(serie, registro.exportar_texto())
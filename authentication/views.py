@@ -26,6 +26,8 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from .models import PreferenciasUsuario, Plano, AssinaturaUsuario
+from .assinatura import STATUS_EXPIRADA, calcular_status_assinatura
+from .temas import TEMAS, guardar_tema_na_sessao
 from django.views.decorators.csrf import csrf_protect
 from django.utils import timezone
 from datetime import timedelta, datetime
@@ -65,12 +67,12 @@ def traduzir_status_asaas(status_en: str) -> str:
 
 # Importação condicional do AsaasClient
 try:
-    from financeiro.services.asaas import AsaasClient
+    from financeiro.services.asaas import get_asaas_client
 
     ASAAS_AVAILABLE = True
 except RuntimeError as e:
     # Asaas não configurado - continuar sem ele
-    AsaasClient = None
+    get_asaas_client = None
     ASAAS_AVAILABLE = False
     print(f"Asaas não disponível: {e}")
 from django.conf import settings
@@ -96,37 +98,9 @@ def verificar_assinatura_expirada(user):
         return False
 
     try:
-        # Verificar se o modelo existe e está acessível
-        from django.db import connection
         from django.db.utils import DatabaseError
 
-        # Testar conexão com banco
-        cursor = connection.cursor()
-        cursor.execute("SELECT 1")
-
-        # Buscar assinatura ativa mais recente
-        assinatura = (
-            AssinaturaUsuario.objects.filter(usuario=user, status="ativa")
-            .order_by("-data_inicio")
-            .first()
-        )
-
-        if not assinatura:
-            # Usuário não tem assinatura ativa - permitir acesso
-            return False
-
-        # Verificar se a assinatura expirou
-        agora = timezone.now()
-        if assinatura.data_fim < agora:
-            # Marcar como expirada
-            try:
-                assinatura.status = "expirada"
-                assinatura.save()
-            except Exception as save_error:
-                logging.error(f"Erro ao salvar assinatura expirada: {save_error}")
-            return True
-
-        return False
+        return calcular_status_assinatura(user) == STATUS_EXPIRADA
 
     except DatabaseError as e:
         logging.error(f"Erro de banco ao verificar assinatura: {e}")
@@ -492,12 +466,13 @@ def alterar_tema(request):
     """AJAX para alterar tema do usuário"""
     tema = request.POST.get("tema")
 
-    if tema not in ["default", "emerald", "sunset", "ocean", "purple"]:
+    if tema not in TEMAS:
         return JsonResponse({"error": "Tema inválido"}, status=400)
 
     preferencias = PreferenciasUsuario.get_or_create_for_user(request.user)
     preferencias.tema = tema
     preferencias.save()
+    guardar_tema_na_sessao(request, preferencias.tema, preferencias.modo)
 
     return JsonResponse(
         {
@@ -531,6 +506,7 @@ def alterar_modo(request):
         modo_anterior = preferencias.modo
         preferencias.modo = modo
         preferencias.save()
+        guardar_tema_na_sessao(request, preferencias.tema, preferencias.modo)
 
         # CORRIGIDO: Mostrar mensagem baseada no novo modo
         modo_nome = "Escuro" if modo == "dark" else "Claro"
@@ -696,7 +672,7 @@ class PlanSelectionView(LoginRequiredMixin, TemplateView):
         assinaturas_atualizadas = []
         
         try:
-            from financeiro.services.asaas import AsaasClient, AsaasAPIError
+            from financeiro.services.asaas import AsaasAPIError, get_asaas_client
             from financeiro.models import AsaasPayment
             
             # Verificar se Asaas está configurado (tem API key)
@@ -707,7 +683,7 @@ class PlanSelectionView(LoginRequiredMixin, TemplateView):
                 return assinaturas_atualizadas
             
             logging.info(f"🔍 Iniciando verificação de {assinaturas.count()} assinatura(s) pendente(s)")
-            asaas_client = AsaasClient()
+            asaas_client = get_asaas_client()
             
             for assinatura in assinaturas:
                 logging.info(f"🔍 Verificando assinatura ID {assinatura.id}, status atual: {assinatura.status}")
@@ -1255,6 +1231,10 @@ class PaymentPixView(LoginRequiredMixin, TemplateView):
                 billing_data,
                 assinatura,
             )
+            if pix_data.get("qr_code"):
+                # Imagem servida por URL (cacheável) em vez de base64 no HTML
+                from financeiro.utils import qr_code_url
+                pix_data["qr_code_url"] = qr_code_url(pix_data["qr_code"]) or ""
             context["pix_data"] = pix_data
         except Exception as e:
             # Se houver erro ao gerar QR Code, mostrar mensagem
@@ -1299,84 +1279,54 @@ class PaymentPixView(LoginRequiredMixin, TemplateView):
             if ASAAS_AVAILABLE:
                 try:
                     # Buscar dados atualizados do pagamento
-                    asaas_client = AsaasClient()
+                    asaas_client = get_asaas_client()
                     payment_data = asaas_client.get_payment(assinatura.asaas_payment_id)
-                    pix_data = asaas_client.get_pix_qr(assinatura.asaas_payment_id)
                     
-                    # Verificar múltiplos campos possíveis para o payload
-                    payload = (
-                        pix_data.get("payload") or 
-                        pix_data.get("copyPaste") or 
-                        pix_data.get("pixCopiaECola") or
-                        ""
-                    )
+                    # O QR Code é buscado em segundo plano (financeiro.pix); se o
+                    # worker já o gravou, não é preciso consultar o Asaas de novo
+                    from financeiro.pix import extract_pix_payload, register_pending_qr, store_pix_qr
+                    from financeiro.services.asaas import AsaasAPIError
                     
-                    # Verificar múltiplos campos possíveis para a imagem do QR code
-                    qr_code_image = (
-                        pix_data.get("qrCode") or 
-                        pix_data.get("encodedImage") or 
-                        pix_data.get("qrCodeBase64") or
-                        ""
-                    )
+                    payment_db = register_pending_qr(payment_data)
+                    payload = payment_db.copy_paste_payload or ""
+                    if not payload:
+                        # Uma única consulta, sem espera
+                        try:
+                            pix_data = asaas_client.get_pix_qr(assinatura.asaas_payment_id)
+                        except AsaasAPIError as e:
+                            if e.status_code != 404:
+                                raise
+                            pix_data = {}
+                        if store_pix_qr(payment_db, pix_data):
+                            payload = payment_db.copy_paste_payload
+                        else:
+                            payload = extract_pix_payload(pix_data)
+                    qr_code_image = payment_db.qr_code_base64 or ""
                     
                     # Validar que o payload é válido (deve começar com 000201)
                     if payload:
                         if not payload.startswith("000201") or len(payload) < 50:
                             logging.error(f"❌ Payload inválido recebido do Asaas para pagamento existente: {payload[:100]}...")
                             raise Exception("Payload PIX inválido do Asaas")
-                        
-                        # SEMPRE gerar QR Code a partir do payload se disponível
-                        try:
-                            from financeiro.utils import generate_qr_code_from_payload
-                            qr_code_gerado = generate_qr_code_from_payload(payload)
-                            if qr_code_gerado:
-                                qr_code_image = qr_code_gerado
-                                logging.info(f"✅ QR Code regenerado a partir do payload REAL do Asaas")
-                            else:
-                                logging.warning("Função generate_qr_code_from_payload retornou None para payment_id existente")
-                        except ImportError as e:
-                            logging.error(f"Biblioteca qrcode não instalada: {e}")
-                        except Exception as e:
-                            logging.error(f"Erro ao gerar QR Code do payload existente: {e}", exc_info=True)
+                        # A imagem é gerada (uma vez) a partir do payload e servida
+                        # por URL em get_context_data; não é preciso base64 aqui
                     else:
-                        # Se não tem payload, tentar obter novamente (pode ter ficado disponível)
-                        from financeiro.services.asaas import AsaasAPIError
-                        import time
-                        
-                        logging.info("Payload não disponível, tentando obter novamente...")
-                        # Quando já existe payment_id, tentar mais vezes (pode ter ficado disponível)
-                        for retry in range(6):  # Aumentado de 3 para 6 tentativas
-                            try:
-                                time.sleep(3)  # Aguardar 3 segundos entre tentativas
-                                pix_data_retry = asaas_client.get_pix_qr(assinatura.asaas_payment_id)
-                                payload = pix_data_retry.get("payload", "")
-                                if payload:
-                                    logging.info(f"✅ Payload obtido na tentativa {retry + 1}")
-                                    break
-                            except AsaasAPIError as e:
-                                if e.status_code == 404:
-                                    logging.info(f"QR Code ainda não disponível (tentativa {retry + 1}/6)")
-                                    continue
-                                else:
-                                    raise
-                        
-                        if not payload:
-                            # Não bloquear - permitir que página seja exibida com mensagem de aguardo
-                            logging.warning(f"QR Code ainda não disponível após recarregar. Payment ID: {assinatura.asaas_payment_id}")
-                            return {
-                                "payment_id": assinatura.asaas_payment_id,
-                                "qr_code": "",
-                                "qr_code_image": "",
-                                "chave_pix": "",
-                                "valor": float(valor),
-                                "descricao": f"Pagamento - {plano.nome}",
-                                "vencimento": payment_data.get("dueDate", ""),
-                                "status": traduzir_status_asaas(payment_data.get("status", "PENDING")),
-                                "pix_copia_cola": "",  # Vazio porque ainda não está disponível
-                                "qr_code_aguardando": True,
-                                "payment_id_asaas": assinatura.asaas_payment_id,
-                                "payment_info": f"ID do Pagamento: {assinatura.asaas_payment_id}",  # Para mostrar ao usuário
-                            }
+                        # Não bloquear: a página acompanha o worker pelo endpoint de status
+                        logging.info(f"QR Code ainda não disponível. Payment ID: {assinatura.asaas_payment_id}")
+                        return {
+                            "payment_id": assinatura.asaas_payment_id,
+                            "qr_code": "",
+                            "qr_code_image": "",
+                            "chave_pix": "",
+                            "valor": float(valor),
+                            "descricao": f"Pagamento - {plano.nome}",
+                            "vencimento": payment_data.get("dueDate", ""),
+                            "status": traduzir_status_asaas(payment_data.get("status", "PENDING")),
+                            "pix_copia_cola": "",  # Vazio porque ainda não está disponível
+                            "qr_code_aguardando": True,
+                            "payment_id_asaas": assinatura.asaas_payment_id,
+                            "payment_info": f"ID do Pagamento: {assinatura.asaas_payment_id}",  # Para mostrar ao usuário
+                        }
                     
                     # Extrair data de vencimento do pagamento
                     due_date = payment_data.get("dueDate", "")
@@ -1436,7 +1386,7 @@ class PaymentPixView(LoginRequiredMixin, TemplateView):
 
         try:
             # Inicializar cliente Asaas
-            asaas_client = AsaasClient()
+            asaas_client = get_asaas_client()
 
             # Limpar e validar CPF antes de enviar ao Asaas
             cpf_limpo = billing_data.get("cpf", "").replace(".", "").replace("-", "").replace("/", "").strip()
@@ -1516,95 +1466,29 @@ class PaymentPixView(LoginRequiredMixin, TemplateView):
                 # Re-raise para ser capturado pelo except externo
                 raise
 
-            # Aguardar um pouco antes de começar a buscar o QR Code (pode levar alguns segundos)
-            import time
-            logging.info("Aguardando 1 segundo antes de começar a buscar QR Code...")
-            time.sleep(1)  # Reduzido de 2s para 1s
-            
-            # Obter QR Code PIX - pode levar alguns segundos para ficar disponível
-            # TIMEOUT OTIMIZADO: Tentar 5 vezes com intervalo de 3 segundos (total: ~15 segundos)
-            # Se não conseguir em 15s, retornar página para usuário recarregar (QR code pode ainda estar sendo gerado)
+            # Obter QR Code PIX - pode levar alguns segundos para ficar disponível.
+            # Uma única tentativa, sem espera: se ainda não estiver publicado, o
+            # worker fetch_pix_qr_codes busca em segundo plano e a página
+            # acompanha pelo endpoint financeiro:pix_qr_status
+            from financeiro.pix import extract_pix_payload, register_pending_qr
             from financeiro.services.asaas import AsaasAPIError
             
-            pix_data = None
-            payload = ""
-            max_tentativas = 5  # Aumentado para 5 tentativas (melhor chance de obter QR code)
-            max_wait_seconds = 15  # Timeout aumentado para 15 segundos
-            tentativa = 0
-            start_time = time.time()
-            
-            logging.info(f"Aguardando QR Code PIX ficar disponível para pagamento {payment_data['id']}...")
-            logging.info(f"Configuração: até {max_tentativas} tentativas, máximo {max_wait_seconds}s")
-            
-            while (tentativa < max_tentativas) and (time.time() - start_time < max_wait_seconds) and not payload:
-                tentativa += 1
-                elapsed = time.time() - start_time
-                
-                # Log de progresso a cada tentativa
-                logging.info(f"Tentativa {tentativa}/{max_tentativas} - Tempo decorrido: {elapsed:.1f}s/{max_wait_seconds}s")
-                
-                try:
-                    pix_data = asaas_client.get_pix_qr(payment_data["id"])
-                    logging.info(f"✅ Tentativa {tentativa}: Dados retornados do Asaas get_pix_qr: {list(pix_data.keys())}")
-                    
-                    # Verificar múltiplos campos possíveis para o payload
-                    payload = (
-                        pix_data.get("payload") or 
-                        pix_data.get("copyPaste") or 
-                        pix_data.get("pixCopiaECola") or
-                        ""
-                    )
-                    
-                    if payload:
-                        logging.info(f"✅ Payload obtido com sucesso na tentativa {tentativa} (após {elapsed:.1f}s)")
-                        logging.info(f"   Tamanho do payload: {len(payload)} caracteres")
-                        break
-                    else:
-                        logging.warning(f"⚠️ Payload vazio na tentativa {tentativa}, aguardando... (elapsed: {elapsed:.1f}s)")
-                        logging.warning(f"   Chaves disponíveis no pix_data: {list(pix_data.keys())}")
-                        if tentativa < max_tentativas and (time.time() - start_time < max_wait_seconds):
-                            time.sleep(3)  # Aguardar 3 segundos antes de tentar novamente
-                            
-                except AsaasAPIError as e:
-                    # Se for erro 404, o QR Code ainda não está disponível - continuar tentando
-                    if e.status_code == 404:
-                        logging.info(f"⚠️ Tentativa {tentativa}: QR Code ainda não disponível (404) - aguardando... (elapsed: {elapsed:.1f}s)")
-                        if tentativa < max_tentativas and (time.time() - start_time < max_wait_seconds):
-                            time.sleep(3)  # Aguardar 3 segundos antes de tentar novamente
-                            continue
-                        else:
-                            # Timeout atingido - não bloquear, permitir que usuário recarregue a página
-                            elapsed = time.time() - start_time
-                            logging.warning(
-                                f"⚠️ QR Code não ficou disponível após {elapsed:.1f}s ({tentativa} tentativas). "
-                                f"Pagamento criado: {payment_data['id']}. Permitindo acesso à página para recarregar."
-                            )
-                            # Não levantar exceção - permitir que a página seja exibida
-                            break
-                    else:
-                        # Outro erro (não é 404) - relançar
-                        logging.error(f"❌ Erro ao obter QR Code na tentativa {tentativa}: {e.message} (status: {e.status_code})")
-                        raise
-                        
-                except Exception as e:
-                    logging.warning(f"Erro inesperado ao obter QR Code na tentativa {tentativa}: {e}")
-                    if tentativa < max_tentativas and (time.time() - start_time < max_wait_seconds):
-                        time.sleep(3)  # Aguardar 3 segundos antes de tentar novamente
-                    else:
-                        raise Exception(
-                            f"Erro ao obter QR Code PIX após {elapsed:.1f} segundos: {str(e)}. "
-                            f"O pagamento foi criado com sucesso (ID: {payment_data['id']}). "
-                            f"Tente recarregar a página em alguns instantes."
-                        )
+            register_pending_qr(payment_data, customer_id=customer_data["id"])
+            try:
+                pix_data = asaas_client.get_pix_qr(payment_data["id"])
+            except AsaasAPIError as e:
+                if e.status_code != 404:
+                    logging.error(f"❌ Erro ao obter QR Code: {e.message} (status: {e.status_code})")
+                    raise
+                logging.info(f"QR Code ainda não disponível (404) para pagamento {payment_data['id']}")
+                pix_data = {}
+            payload = extract_pix_payload(pix_data)
             
             # Se não conseguiu obter QR Code, permitir que a página seja exibida mesmo assim
-            # O usuário pode recarregar a página para tentar novamente
             if not pix_data or not payload:
-                elapsed = time.time() - start_time
-                logging.warning(
-                    f"⚠️ QR Code não disponível após {elapsed:.1f}s. "
-                    f"Pagamento criado: {payment_data['id']}. "
-                    f"Retornando dados vazios para permitir recarregamento da página."
+                logging.info(
+                    f"QR Code ainda não disponível. Pagamento criado: {payment_data['id']}. "
+                    f"Será obtido em segundo plano."
                 )
                 
                 # Salvar payment_id na assinatura para que possa tentar novamente ao recarregar
@@ -1612,9 +1496,8 @@ class PaymentPixView(LoginRequiredMixin, TemplateView):
                 assinatura.save()
                 logging.info(f"✅ Payment ID salvo na assinatura: {payment_data['id']}")
                 
-                # Retornar dados com payment_id para que possa tentar novamente
-                # IMPORTANTE: Se não conseguiu o payload em 10s, ainda pode estar sendo gerado
-                # O usuário pode recarregar a página para tentar novamente
+                # Retornar dados com payment_id; a página consulta o status e
+                # recarrega quando o worker gravar o QR Code
                 return {
                     "payment_id": payment_data["id"],
                     "qr_code": "",
@@ -1628,7 +1511,7 @@ class PaymentPixView(LoginRequiredMixin, TemplateView):
                     "qr_code_aguardando": True,  # Flag para indicar que está aguardando
                     "payment_id_asaas": payment_data["id"],  # Para tentar novamente
                     "payment_info": f"ID do Pagamento: {payment_data['id']}",  # Para mostrar ao usuário
-                    "mensagem_aguardo": "O código PIX está sendo gerado. Aguarde alguns segundos e recarregue a página.",
+                    "mensagem_aguardo": "O código PIX está sendo gerado. A página será atualizada automaticamente em alguns segundos.",
                 }
             
             # Verificar múltiplos campos possíveis para a imagem do QR code
@@ -1869,7 +1752,8 @@ def delete_assinatura(request, assinatura_id):
 def asaas_webhook(request):
     """
     Webhook para receber notificações de pagamento do Asaas.
-    Atualiza o status da assinatura quando o pagamento é confirmado.
+    O evento é enfileirado; o worker atualiza a assinatura quando o pagamento
+    é confirmado.
     """
     try:
         import json
@@ -1895,40 +1779,24 @@ def asaas_webhook(request):
                 {"status": "ignored", "message": f"Evento {event_type} ignorado"}
             )
 
-        # Buscar assinatura pelo ID do pagamento Asaas
+        # Validar o ID do pagamento Asaas
         payment_id = payment_data.get("id")
         if not payment_id:
             return JsonResponse(
                 {"status": "error", "message": "ID do pagamento não encontrado"}
             )
 
-        # Buscar assinatura correspondente
-        assinatura = AssinaturaUsuario.objects.filter(
-            asaas_payment_id=payment_id
-        ).first()
+        # Registrar na caixa de entrada; a ativação da assinatura é feita pelo
+        # worker (manage.py process_asaas_webhooks), fora da requisição
+        from financeiro.webhooks import enqueue_event
 
-        if not assinatura:
-            logging.warning(f"Assinatura não encontrada para payment_id: {payment_id}")
+        if not enqueue_event(data):
             return JsonResponse(
-                {"status": "error", "message": "Assinatura não encontrada"}
+                {"status": "duplicate", "message": "Evento já recebido"}
             )
 
-        # Atualizar status da assinatura baseado no evento
-        if event_type in ["PAYMENT_CONFIRMED", "PAYMENT_RECEIVED"]:
-            # Pagamento confirmado - ativar assinatura
-            assinatura.status = "ativa"
-            assinatura.save()
-            logging.info(f"Assinatura {assinatura.id} ativada - Pagamento confirmado")
-
-            # Notificar usuário (opcional)
-            # Aqui você pode enviar email, notificação push, etc.
-
-        elif event_type == "PAYMENT_OVERDUE":
-            # Pagamento vencido - manter como aguardando_pagamento
-            logging.warning(f"Assinatura {assinatura.id} - Pagamento vencido")
-
         return JsonResponse(
-            {"status": "success", "message": "Webhook processado com sucesso"}
+            {"status": "success", "message": "Webhook recebido"}
         )
 
     except json.JSONDecodeError:
@@ -1968,7 +1836,7 @@ def check_payment_status(request, assinatura_id):
         # Se tem payment_id, verificar status no Asaas
         if assinatura.asaas_payment_id:
             try:
-                from financeiro.services.asaas import AsaasClient, AsaasAPIError
+                from financeiro.services.asaas import AsaasAPIError, get_asaas_client
                 from financeiro.models import AsaasPayment
                 
                 # Primeiro tentar buscar no banco local
@@ -1998,7 +1866,7 @@ def check_payment_status(request, assinatura_id):
                 except AsaasPayment.DoesNotExist:
                     # Se não existe no banco, buscar na API
                     try:
-                        client = AsaasClient()
+                        client = get_asaas_client()
                         payment_data = client.get_payment(assinatura.asaas_payment_id)
                         payment_status = payment_data.get("status", "UNKNOWN")
                         
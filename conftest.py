@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def descartar_atividade_pendente():
+    """
+    As requisições dos testes acumulam atividade no buffer em memória; o
+    banco de teste já foi removido quando o atexit tentaria gravá-la.
+    """
+    yield
+    from authentication.atividade import buffer_atividade
+
+    buffer_atividade._retirar()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def orcamento_de_consultas():
+    """
+    Liga o perfil de consultas (core.perfil_consultas) nos testes: uma view
+    acima do seu orçamento em QUERY_BUDGETS faz o teste falhar.
+    """
+    from django.conf import settings
+
+    anteriores = settings.QUERY_PROFILER_ENABLED, settings.QUERY_BUDGET_RAISE
+    settings.QUERY_PROFILER_ENABLED = True
+    settings.QUERY_BUDGET_RAISE = True
+    yield
+    settings.QUERY_PROFILER_ENABLED, settings.QUERY_BUDGET_RAISE = anteriores
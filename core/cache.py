@@ -0,0 +1,16 @@
+"""
+Utilitários de cache compartilhados entre os apps.
+
+Caches invalidados por sinais (ocupação da agenda, contador de pendentes) só
+ficam corretos quando todos os processos enxergam o mesmo cache. Com o
+LocMemCache de produção (sem REDIS_URL) cada worker do gunicorn tem a sua
+cópia e a invalidação chega apenas ao worker que gravou a linha; nesse caso
+esses caches são ignorados e os valores vêm direto do banco.
+"""
+
+from django.conf import settings
+
+
+def cache_compartilhado():
+    """True se o cache padrão é o mesmo para todos os processos da aplicação."""
+    return getattr(settings, "CACHE_SHARED_ACROSS_WORKERS", False)
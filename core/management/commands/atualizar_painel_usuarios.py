@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.cache import cache_compartilhado
+from core.painel_usuarios import atualizar_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os totais do painel de atividade de usuários e grava em cache. "
+        "Agende no cron com intervalo menor que PAINEL_USUARIOS_CACHE_TIMEOUT."
+    )
+
+    def handle(self, *args, **options):
+        if not cache_compartilhado():
+            # Com cache por processo o snapshot gravado aqui não chega aos
+            # workers do gunicorn; cada um calcula o seu na primeira leitura.
+            self.stdout.write(
+                self.style.WARNING("Cache não compartilhado entre processos; nada a fazer.")
+            )
+            return
+        inicio = time.perf_counter()
+        snapshot = atualizar_snapshot()
+        decorrido_ms = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Painel atualizado: {snapshot['total_users']} usuário(s) "
+                f"em {decorrido_ms:.1f} ms."
+            )
+        )
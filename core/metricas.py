@@ -0,0 +1,444 @@
+"""
+Métricas no formato de exposição do Prometheus (GET /metrics/).
+
+Contadores e histogramas ficam em memória em cada processo. Com
+``METRICS_DIR`` configurado, cada processo grava periodicamente (no máximo a
+cada ``METRICS_FLUSH_INTERVAL_SECONDS``, e ao encerrar) um arquivo JSON com os
+seus valores nesse diretório; a view soma os arquivos de todos os processos,
+então qualquer worker do gunicorn responde com o total, incluindo os workers
+em segundo plano (process_asaas_webhooks, fetch_pix_qr_codes). Sem
+``METRICS_DIR``, cada processo expõe apenas as próprias métricas.
+
+Como no modo multiprocesso do prometheus_client, o diretório deve ser
+esvaziado ao (re)iniciar o serviço (os scripts de deploy fazem isso).
+Processos sem métricas não gravam arquivo, e os arquivos de processos
+encerrados são somados em ``agregado.json`` e removidos na coleta seguinte:
+os contadores continuam monotônicos sem deixar um arquivo por processo.
+
+Métricas registradas:
+
+- ``http_request_duration_seconds{view,method,status}``
+- ``http_request_db_queries{view}`` (consultas por requisição)
+- ``http_request_db_duration_seconds{view}`` (tempo no banco por requisição)
+- ``asaas_request_duration_seconds{endpoint,method}``
+- ``asaas_request_errors_total{endpoint,status}``
+- ``webhook_processing_duration_seconds{event,status}``
+"""
+
+import abc
+import atexit
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava, os arquivos não são compactados
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+ARQUIVO_AGREGADO = "agregado.json"
+ARQUIVO_TRAVA = ".trava"
+_ARQUIVO_PROCESSO = re.compile(r"^(\d+)-[0-9a-f]+\.json$")
+
+
+def _formatar_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _processo_ativo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # existe, mas pertence a outro usuário
+    return True
+
+
+def _rotulos_texto(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+class _Metrica(abc.ABC):
+    tipo = None
+
+    def __init__(self, registro, nome, descricao, rotulos):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._registro = registro
+        self._valores = {}
+
+    def _chave(self, rotulos):
+        return tuple(str(rotulos.get(nome, "")) for nome in self.rotulos)
+
+    @abc.abstractmethod
+    def _somar(self, valores, chave, valor):
+        """Soma ``valor`` (lido de um processo) à série ``chave`` de ``valores``."""
+
+    @abc.abstractmethod
+    def _linhas(self, valores):
+        """Linhas de texto do Prometheus das séries em ``valores``."""
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._registro._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+        self._registro.gravar_se_necessario()
+
+    def _somar(self, valores, chave, valor):
+        valores[chave] = valores.get(chave, 0) + valor
+
+    def _linhas(self, valores):
+        for chave, valor in sorted(valores.items()):
+            yield f"{self.nome}{_rotulos_texto(self.rotulos, chave)} {_formatar_numero(valor)}"
+
+
+class Histograma(_Metrica):
+    """Histograma cumulativo; cada série guarda [contagens das faixas..., +Inf, soma]."""
+
+    tipo = "histogram"
+
+    def __init__(self, registro, nome, descricao, rotulos, buckets):
+        super().__init__(registro, nome, descricao, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        faixa = len(self.buckets)
+        for indice, limite in enumerate(self.buckets):
+            if valor <= limite:
+                faixa = indice
+                break
+        with self._registro._lock:
+            serie = self._valores.get(chave)
+            if serie is None:
+                serie = self._valores[chave] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[faixa] += 1
+            serie[-1] += valor
+        self._registro.gravar_se_necessario()
+
+    def _somar(self, valores, chave, valor):
+        if len(valor) != len(self.buckets) + 2:
+            return  # faixas diferentes (arquivo de uma versão anterior)
+        serie = valores.setdefault(chave, [0] * (len(self.buckets) + 1) + [0.0])
+        for indice, parcela in enumerate(valor):
+            serie[indice] += parcela
+
+    def _linhas(self, valores):
+        limites = self.buckets + (float("inf"),)
+        for chave, serie in sorted(valores.items()):
+            acumulado = 0
+            for limite, quantidade in zip(limites, serie):
+                acumulado += quantidade
+                rotulos = _rotulos_texto(self.rotulos, chave, ("le", _formatar_numero(limite)))
+                yield f"{self.nome}_bucket{rotulos} {acumulado}"
+            rotulos = _rotulos_texto(self.rotulos, chave)
+            yield f"{self.nome}_sum{rotulos} {_formatar_numero(serie[-1])}"
+            yield f"{self.nome}_count{rotulos} {acumulado}"
+
+
+class RegistroMetricas:
+    """Métricas do processo e sua gravação/leitura no diretório compartilhado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas = {}
+        self._ultima_gravacao = time.monotonic()
+        self._arquivo = None  # (pid, nome) - recriado após fork
+
+    def contador(self, nome, descricao, rotulos=()):
+        return self._registrar(Contador(self, nome, descricao, rotulos))
+
+    def histograma(self, nome, descricao, rotulos=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma(self, nome, descricao, rotulos, buckets))
+
+    def _registrar(self, metrica):
+        if metrica.nome in self._metricas:
+            raise ValueError(f"Métrica já registrada: {metrica.nome}")
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    @property
+    def diretorio(self):
+        return getattr(settings, "METRICS_DIR", None)
+
+    @property
+    def intervalo(self):
+        return getattr(settings, "METRICS_FLUSH_INTERVAL_SECONDS", 5)
+
+    def snapshot(self):
+        """Valores deste processo: {métrica: [[rótulos, valor], ...]}."""
+        with self._lock:
+            return {
+                nome: [
+                    [list(chave), list(valor) if isinstance(valor, list) else valor]
+                    for chave, valor in metrica._valores.items()
+                ]
+                for nome, metrica in self._metricas.items()
+                if metrica._valores
+            }
+
+    def _caminho_arquivo(self):
+        pid = os.getpid()
+        if self._arquivo is None or self._arquivo[0] != pid:
+            # O sufixo aleatório evita sobrescrever o arquivo de um processo
+            # encerrado cujo pid foi reaproveitado
+            self._arquivo = (pid, f"{pid}-{uuid.uuid4().hex[:8]}.json")
+        return os.path.join(self.diretorio, self._arquivo[1])
+
+    def gravar(self):
+        """Grava os valores deste processo no ``METRICS_DIR`` (troca atômica)."""
+        self._ultima_gravacao = time.monotonic()
+        if not self.diretorio:
+            return
+        dados = self.snapshot()
+        caminho = self._caminho_arquivo()
+        if not dados and not os.path.exists(caminho):
+            return  # processo sem métricas (ex.: comandos do cron) não deixa arquivo
+        self._gravar_json(caminho, dados)
+
+    def _gravar_json(self, caminho, dados):
+        os.makedirs(self.diretorio, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as arquivo:
+                json.dump(dados, arquivo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    def gravar_se_necessario(self):
+        if not self.diretorio or time.monotonic() - self._ultima_gravacao < self.intervalo:
+            return
+        try:
+            self.gravar()
+        except OSError:
+            logger.warning("Falha ao gravar métricas em %s", self.diretorio, exc_info=True)
+
+    def _ler(self, nome):
+        try:
+            with open(os.path.join(self.diretorio, nome)) as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return None  # removido por outro processo (ou agregado ainda inexistente)
+        except (OSError, ValueError):
+            logger.warning("Arquivo de métricas ilegível: %s", nome, exc_info=True)
+            return None
+
+    @contextmanager
+    def _travar_diretorio(self):
+        """Trava exclusiva do diretório durante a coleta (False sem fcntl)."""
+        if fcntl is None:
+            yield False
+            return
+        with open(os.path.join(self.diretorio, ARQUIVO_TRAVA), "a") as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                yield True
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _incorporar_encerrados(self):
+        """Soma em ``agregado.json`` os arquivos de processos encerrados e os remove."""
+        encerrados = []
+        for nome in os.listdir(self.diretorio):
+            casamento = _ARQUIVO_PROCESSO.match(nome)
+            if casamento and not _processo_ativo(int(casamento.group(1))):
+                encerrados.append(nome)
+        if not encerrados:
+            return
+        coletado = self._somar(
+            self._ler(nome) for nome in [ARQUIVO_AGREGADO, *encerrados]
+        )
+        agregado = {
+            nome: [[list(chave), valor] for chave, valor in series.items()]
+            for nome, series in coletado.items()
+            if series
+        }
+        self._gravar_json(os.path.join(self.diretorio, ARQUIVO_AGREGADO), agregado)
+        for nome in encerrados:
+            try:
+                os.unlink(os.path.join(self.diretorio, nome))
+            except FileNotFoundError:
+                pass
+
+    def _snapshots(self):
+        if not self.diretorio:
+            return [self.snapshot()]
+        self.gravar()
+        os.makedirs(self.diretorio, exist_ok=True)
+        with self._travar_diretorio() as travado:
+            if travado:
+                self._incorporar_encerrados()
+            return [
+                self._ler(nome)
+                for nome in sorted(os.listdir(self.diretorio))
+                if nome.endswith(".json")
+            ]
+
+    def coletar(self):
+        """Valores somados de todos os processos: {métrica: {rótulos: valor}}."""
+        return self._somar(self._snapshots())
+
+    def _somar(self, snapshots):
+        coletado = {nome: {} for nome in self._metricas}
+        for snapshot in snapshots:
+            if not snapshot:
+                continue
+            for nome, series in snapshot.items():
+                metrica = self._metricas.get(nome)
+                if metrica is None:
+                    continue  # métrica removida do código
+                for chave, valor in series:
+                    chave = tuple(chave)
+                    if len(chave) == len(metrica.rotulos):
+                        metrica._somar(coletado[nome], chave, valor)
+        return coletado
+
+    def exportar_texto(self):
+        """Todas as métricas no formato de texto do Prometheus (0.0.4)."""
+        coletado = self.coletar()
+        linhas = []
+        for nome, metrica in self._metricas.items():
+            linhas.append(f"# HELP {nome} {metrica.descricao}")
+            linhas.append(f"# TYPE {nome} {metrica.tipo}")
+            linhas.extend(metrica._linhas(coletado[nome]))
+        return "\n".join(linhas) + "\n"
+
+    def limpar(self):
+        """Zera os valores deste processo (usado nos testes)."""
+        with self._lock:
+            for metrica in self._metricas.values():
+                metrica._valores.clear()
+
+
+registro = RegistroMetricas()
+
+http_request_duration = registro.histograma(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por view (nome da URL), método e status.",
+    ("view", "method", "status"),
+)
+http_request_db_queries = registro.histograma(
+    "http_request_db_queries",
+    "Consultas ao banco por requisição HTTP.",
+    ("view",),
+    buckets=BUCKETS_CONSULTAS,
+)
+http_request_db_duration = registro.histograma(
+    "http_request_db_duration_seconds",
+    "Tempo total no banco por requisição HTTP.",
+    ("view",),
+)
+asaas_request_duration = registro.histograma(
+    "asaas_request_duration_seconds",
+    "Latência das chamadas à API do Asaas por endpoint e método.",
+    ("endpoint", "method"),
+)
+asaas_request_errors = registro.contador(
+    "asaas_request_errors_total",
+    "Chamadas à API do Asaas com erro (status HTTP, timeout ou conexão).",
+    ("endpoint", "status"),
+)
+webhook_processing_duration = registro.histograma(
+    "webhook_processing_duration_seconds",
+    "Tempo de processamento dos webhooks do Asaas por evento e resultado.",
+    ("event", "status"),
+)
+
+_SEGMENTO_ID = re.compile(r"^(?:[a-z]+_[A-Za-z0-9]+|\d+)$")
+
+
+def endpoint_asaas(endpoint):
+    """Endpoint sem IDs, para não criar uma série por cobrança (payments/:id/pix)."""
+    caminho = endpoint.split("?", 1)[0].strip("/")
+    return "/".join(
+        ":id" if _SEGMENTO_ID.match(segmento) else segmento for segmento in caminho.split("/")
+    )
+
+
+class _MedidorConsultas:
+    """execute_wrapper que conta as consultas e soma o tempo no banco."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+class MetricasMiddleware:
+    """Mede latência, consultas e tempo de banco de cada requisição."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Import tardio: authentication.atividade depende dos modelos
+        from authentication.atividade import nome_da_rota
+
+        medidor = _MedidorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(medidor))
+            response = self.get_response(request)
+        duracao = time.perf_counter() - inicio
+
+        view = nome_da_rota(request)
+        http_request_duration.observe(
+            duracao, view=view, method=request.method, status=response.status_code
+        )
+        http_request_db_queries.observe(medidor.consultas, view=view)
+        http_request_db_duration.observe(medidor.segundos, view=view)
+        return response
+
+
+@atexit.register
+def _gravar_ao_encerrar():
+    try:
+        if registro.diretorio:
+            registro.gravar()
+    except Exception:  # pragma: no cover - diretório indisponível no encerramento
+        logger.exception("Falha ao gravar métricas no encerramento")
@@ -0,0 +1,233 @@
+"""
+Consultas do painel de atividade de usuários (admin/user-activity/).
+
+Tudo é agregado no banco: as contagens por usuário são subconsultas
+correlacionadas (COUNT) e o volume de dados vem dos bytes medidos pelo comando
+``calcular_armazenamento_usuarios`` (authentication.armazenamento), então a
+tabela é ordenada e paginada em SQL sem carregar clientes, serviços ou
+agendamentos em memória.
+
+Os totais do topo da página (distribuições, rankings, gráficos) formam um
+"snapshot" guardado em cache por ``PAINEL_USUARIOS_CACHE_TIMEOUT`` segundos e
+recalculado em segundo plano pelo comando ``atualizar_painel_usuarios``. Sem
+cache compartilhado entre os processos (LocMemCache de produção) o comando não
+faz nada: cada worker calcula o próprio snapshot na primeira leitura.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    F,
+    IntegerField,
+    Max,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from agendamentos.models import Agendamento, Cliente, TipoServico
+from authentication.armazenamento import tamanho_banco
+from authentication.metricas import carga_por_hora, rotas_mais_acessadas
+from authentication.models import AssinaturaUsuario, UserActivityLog
+
+CHAVE_SNAPSHOT = "admin:painel_usuarios:snapshot"
+USUARIOS_POR_PAGINA = 50
+USUARIOS_NOS_GRAFICOS = 20
+
+# Ordenações aceitas na querystring (?ordem=-volume): nome -> expressão
+ORDENACOES = {
+    "usuario": "username",
+    "requisicoes": "total_requests",
+    "clientes": "total_clientes",
+    "servicos": "total_servicos",
+    "agendamentos": "total_agendamentos",
+    "abertos": "total_agendamentos_abertos",
+    "volume": "estimated_data_volume",
+    "ultimo_acesso": "last_login",
+}
+ORDEM_PADRAO = "-requisicoes"
+
+
+def _por_usuario(model, campo_usuario, agregado, **filtros):
+    """Subconsulta correlacionada com um agregado do ``model`` por usuário."""
+    subconsulta = (
+        model.objects.filter(**{campo_usuario: OuterRef("pk")}, **filtros)
+        .order_by()
+        .values(campo_usuario)
+        .annotate(valor=agregado)
+        .values("valor")
+    )
+    return Coalesce(
+        Subquery(subconsulta, output_field=BigIntegerField()),
+        Value(0),
+        output_field=BigIntegerField(),
+    )
+
+
+def usuarios_anotados():
+    """Usuários com contagens (calculadas no banco) e volume de dados medido."""
+    hoje = timezone.localdate()
+    return get_user_model().objects.annotate(
+        total_requests=Coalesce(
+            F("activity_log__total_requests"), Value(0), output_field=BigIntegerField()
+        ),
+        total_clientes=_por_usuario(Cliente, "criado_por", Count("id")),
+        total_servicos=_por_usuario(TipoServico, "criado_por", Count("id")),
+        total_agendamentos=_por_usuario(Agendamento, "criado_por", Count("id")),
+        total_agendamentos_abertos=_por_usuario(
+            Agendamento, "criado_por", Count("id"), data_agendamento__gte=hoje
+        ),
+        # Bytes medidos pelo comando calcular_armazenamento_usuarios
+        estimated_data_volume=Coalesce(
+            F("activity_log__estimated_data_volume_bytes"),
+            Value(0),
+            output_field=BigIntegerField(),
+        ),
+    )
+
+
+def ordenacao(parametro):
+    """Valida ``?ordem=`` e devolve (nome normalizado, campos do order_by)."""
+    parametro = parametro or ORDEM_PADRAO
+    nome = parametro.lstrip("-")
+    if nome not in ORDENACOES:
+        parametro, nome = ORDEM_PADRAO, ORDEM_PADRAO.lstrip("-")
+    prefixo = "-" if parametro.startswith("-") else ""
+    return parametro, [f"{prefixo}{ORDENACOES[nome]}", "username"]
+
+
+def linhas_da_pagina(usuarios):
+    """Converte a página de usuários anotados nas linhas da tabela."""
+    usuarios = (
+        usuarios.select_related("activity_log")
+        .prefetch_related(
+            Prefetch(
+                "assinaturas",
+                queryset=AssinaturaUsuario.objects.select_related("plano"),
+            )
+        )
+    )
+    linhas = []
+    for user in usuarios:
+        linhas.append(_linha(user, assinaturas=list(user.assinaturas.all())))
+    return linhas
+
+
+def _linha(user, assinaturas=None):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "full_name": user.get_full_name() or user.username,
+        "email": user.email,
+        "is_staff": user.is_staff,
+        "date_joined": user.date_joined,
+        "last_login": user.last_login,
+        "total_requests": user.total_requests,
+        "total_clientes": user.total_clientes,
+        "total_servicos": user.total_servicos,
+        "total_agendamentos": user.total_agendamentos,
+        "total_agendamentos_abertos": user.total_agendamentos_abertos,
+        "assinaturas": assinaturas or [],
+        "estimated_data_volume": user.estimated_data_volume,
+    }
+
+
+def calcular_snapshot():
+    """Totais e rankings do painel (poucas consultas agregadas)."""
+    usuarios = usuarios_anotados()
+    campos_linha = [
+        "id",
+        "username",
+        "first_name",
+        "last_name",
+        "email",
+        "is_staff",
+        "date_joined",
+        "last_login",
+    ]
+
+    atividade = UserActivityLog.objects.aggregate(
+        total_requests=Coalesce(Sum("total_requests"), Value(0), output_field=BigIntegerField()),
+        GET=Coalesce(Sum("total_get_requests"), Value(0), output_field=BigIntegerField()),
+        POST=Coalesce(Sum("total_post_requests"), Value(0), output_field=BigIntegerField()),
+        PUT=Coalesce(Sum("total_put_requests"), Value(0), output_field=BigIntegerField()),
+        DELETE=Coalesce(Sum("total_delete_requests"), Value(0), output_field=BigIntegerField()),
+        success=Coalesce(Sum("total_login_success"), Value(0), output_field=IntegerField()),
+        failed=Coalesce(Sum("total_login_failed"), Value(0), output_field=IntegerField()),
+    )
+
+    ativos = list(
+        usuarios.only(*campos_linha)
+        .annotate(
+            login_success=Coalesce(
+                F("activity_log__total_login_success"), Value(0), output_field=IntegerField()
+            ),
+            login_failed=Coalesce(
+                F("activity_log__total_login_failed"), Value(0), output_field=IntegerField()
+            ),
+        )
+        .order_by("-total_requests", "username")[:USUARIOS_NOS_GRAFICOS]
+    )
+    mais_ativos = [_linha(user) for user in ativos]
+    maior_volume = [
+        _linha(user)
+        for user in usuarios.only(*campos_linha).order_by("-estimated_data_volume", "username")[:5]
+    ]
+
+    charts_payload = {
+        "labels": [user.username for user in ativos],
+        "requests": [user.total_requests for user in ativos],
+        "memory": [user.estimated_data_volume for user in ativos],
+        "loginSuccess": [user.login_success for user in ativos],
+        "loginFailed": [user.login_failed for user in ativos],
+    }
+
+    return {
+        "gerado_em": timezone.now(),
+        "total_users": usuarios.count(),
+        "total_requests": atividade["total_requests"],
+        "total_estimated_volume": usuarios.aggregate(
+            total=Coalesce(Sum("estimated_data_volume"), Value(0), output_field=BigIntegerField())
+        )["total"],
+        "db_size_bytes": tamanho_banco(),
+        "armazenamento_calculado_em": UserActivityLog.objects.aggregate(
+            ultimo=Max("last_data_volume_calculated")
+        )["ultimo"],
+        "method_distribution": {
+            metodo: atividade[metodo] for metodo in ("GET", "POST", "PUT", "DELETE")
+        },
+        "login_distribution": {
+            "success": atividade["success"],
+            "failed": atividade["failed"],
+        },
+        "agendamentos_por_status": list(
+            Agendamento.objects.order_by("status").values("status").annotate(total=Count("id"))
+        ),
+        "carga_por_hora": carga_por_hora(horas=24),
+        "rotas_mais_acessadas": rotas_mais_acessadas(horas=24),
+        "top_active_users": mais_ativos[:5],
+        "top_memory_users": maior_volume,
+        "charts_payload": charts_payload,
+    }
+
+
+def atualizar_snapshot():
+    """Recalcula e grava o snapshot em cache (usado pelo comando agendado)."""
+    snapshot = calcular_snapshot()
+    cache.set(CHAVE_SNAPSHOT, snapshot, getattr(settings, "PAINEL_USUARIOS_CACHE_TIMEOUT", 900))
+    return snapshot
+
+
+def obter_snapshot():
+    """Snapshot em cache; calcula na hora apenas se ainda não existir."""
+    snapshot = cache.get(CHAVE_SNAPSHOT)
+    if snapshot is None:
+        snapshot = atualizar_snapshot()
+    return snapshot
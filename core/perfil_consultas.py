@@ -0,0 +1,162 @@
+"""
+Perfil de consultas por requisição e detecção de N+1 (opt-in).
+
+Com ``QUERY_PROFILER_ENABLED``, o ``PerfilConsultasMiddleware`` conta as
+consultas de cada requisição, soma o tempo no banco e agrupa o SQL pela
+"impressão digital" (SQL com literais e listas ``IN (...)`` normalizados):
+
+- a mesma impressão repetida ``QUERY_PROFILER_REPEAT_THRESHOLD`` vezes ou mais
+  é o sinal típico de N+1 (uma consulta por linha de uma listagem);
+- consultas idênticas (mesmo SQL e mesmos parâmetros) são resultados que
+  deveriam ter sido reaproveitados.
+
+O resumo vai no cabeçalho ``X-DB-Queries`` e numa linha de log (WARNING quando
+há repetições ou o orçamento foi excedido).
+
+Orçamento de consultas: ``QUERY_BUDGETS = {"nome_da_url": máximo}`` (e
+``QUERY_BUDGET_DEFAULT`` para as demais views). Acima do orçamento a
+requisição é registrada em log; com ``QUERY_BUDGET_RAISE`` (ligado nos testes
+pelo conftest.py) levanta ``ConsultasAcimaDoOrcamento`` e o teste falha. Em
+testes, ``orcamento_de_consultas(maximo)`` faz a mesma verificação num bloco.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CABECALHO = "X-DB-Queries"
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTA_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_ESPACOS = re.compile(r"\s+")
+
+
+def impressao_digital(sql):
+    """SQL sem valores: consultas que só mudam os parâmetros ficam iguais."""
+    sql = _LITERAIS.sub("?", sql).replace("%s", "?")
+    sql = _LISTA_IN.sub("IN (...)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+class PerfilConsultas:
+    """execute_wrapper que registra as consultas executadas num trecho."""
+
+    def __init__(self):
+        self.total = 0
+        self.segundos = 0.0
+        self.impressoes = Counter()
+        self.identicas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.total += 1
+            self.impressoes[impressao_digital(sql)] += 1
+            self.identicas[(sql, repr(params))] += 1
+
+    @contextmanager
+    def medir(self):
+        """Registra as consultas de todas as conexões dentro do bloco."""
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(self))
+            yield self
+
+    def repetidas(self, minimo=None):
+        """[(impressão, vezes)] executadas ``minimo`` vezes ou mais (N+1)."""
+        if minimo is None:
+            minimo = getattr(settings, "QUERY_PROFILER_REPEAT_THRESHOLD", 3)
+        return [
+            (impressao, vezes)
+            for impressao, vezes in self.impressoes.most_common()
+            if vezes >= minimo
+        ]
+
+    @property
+    def duplicadas(self):
+        """Execuções que repetiram uma consulta idêntica já feita."""
+        return sum(vezes - 1 for vezes in self.identicas.values())
+
+    def resumo(self, orcamento=None):
+        partes = [
+            f"count={self.total}",
+            f"time_ms={self.segundos * 1000:.1f}",
+            f"duplicates={self.duplicadas}",
+            f"repeated={len(self.repetidas())}",
+        ]
+        if orcamento is not None:
+            partes.append(f"budget={orcamento}")
+        return "; ".join(partes)
+
+
+class ConsultasAcimaDoOrcamento(AssertionError):
+    """Uma view (ou bloco) fez mais consultas que o orçamento permite."""
+
+    def __init__(self, rotulo, perfil, orcamento):
+        linhas = [f"{rotulo}: {perfil.total} consultas (orçamento: {orcamento})"]
+        for impressao, vezes in perfil.repetidas(minimo=2):
+            linhas.append(f"  {vezes}x {impressao[:300]}")
+        super().__init__("\n".join(linhas))
+        self.rotulo = rotulo
+        self.perfil = perfil
+        self.orcamento = orcamento
+
+
+def orcamento_da_view(view):
+    """Máximo de consultas da view (nome da URL) ou None se não houver."""
+    orcamentos = getattr(settings, "QUERY_BUDGETS", {}) or {}
+    return orcamentos.get(view, getattr(settings, "QUERY_BUDGET_DEFAULT", None))
+
+
+@contextmanager
+def orcamento_de_consultas(maximo, rotulo="bloco"):
+    """Falha com ConsultasAcimaDoOrcamento se o bloco passar de ``maximo`` consultas."""
+    perfil = PerfilConsultas()
+    with perfil.medir():
+        yield perfil
+    if perfil.total > maximo:
+        raise ConsultasAcimaDoOrcamento(rotulo, perfil, maximo)
+
+
+class PerfilConsultasMiddleware:
+    """Perfil de consultas de cada requisição (apenas com QUERY_PROFILER_ENABLED)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_PROFILER_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Import tardio: authentication.atividade depende dos modelos
+        from authentication.atividade import nome_da_rota
+
+        perfil = PerfilConsultas()
+        with perfil.medir():
+            response = self.get_response(request)
+
+        view = nome_da_rota(request)
+        orcamento = orcamento_da_view(view)
+        acima = orcamento is not None and perfil.total > orcamento
+        repetidas = perfil.repetidas()
+        resumo = perfil.resumo(orcamento)
+        response[CABECALHO] = resumo
+
+        nivel = logging.WARNING if acima or repetidas else logging.INFO
+        logger.log(nivel, "%s %s [%s] %s", request.method, request.path, view, resumo)
+        for impressao, vezes in repetidas:
+            logger.warning("  %dx %s", vezes, impressao[:300])
+
+        if acima and getattr(settings, "QUERY_BUDGET_RAISE", False):
+            raise ConsultasAcimaDoOrcamento(view, perfil, orcamento)
+        return response
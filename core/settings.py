@@ -69,6 +69,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     # Apps locais
+    "core",
     "agendamentos",
     "authentication",
     "info",
@@ -77,6 +78,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.metricas.MetricasMiddleware",
+    "core.perfil_consultas.PerfilConsultasMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -252,3 +255,55 @@ USE_L10N = True
 ADMIN_SITE_HEADER = "Sistema de Agendamentos - Administração"
 ADMIN_SITE_TITLE = "Agendamentos Admin"
 ADMIN_INDEX_TITLE = "Painel Administrativo"
+
+# Configurações da Agenda (busca de horários livres)
+AGENDA_HORARIO_ABERTURA = os.environ.get("AGENDA_HORARIO_ABERTURA", "08:00")
+AGENDA_HORARIO_FECHAMENTO = os.environ.get("AGENDA_HORARIO_FECHAMENTO", "18:00")
+AGENDA_DIAS_FUNCIONAMENTO = [0, 1, 2, 3, 4, 5]  # 0=segunda ... 6=domingo
+AGENDA_INTERVALO_SLOTS_MINUTOS = 15
+
+# Cache padrão compartilhado entre os processos? Em desenvolvimento e nos
+# testes há um único processo, então o LocMemCache conta como compartilhado; os
+# settings de produção só o consideram compartilhado com REDIS_URL (core.cache)
+CACHE_SHARED_ACROSS_WORKERS = True
+
+# Atividade de usuários: contadores acumulados em memória e gravados em lote
+# ao atingir o limite de requisições ou o intervalo (authentication.atividade)
+ACTIVITY_FLUSH_INTERVAL_SECONDS = int(os.environ.get("ACTIVITY_FLUSH_INTERVAL_SECONDS", "5"))
+ACTIVITY_FLUSH_MAX_REQUESTS = int(os.environ.get("ACTIVITY_FLUSH_MAX_REQUESTS", "200"))
+# Métricas de requisições por hora: dias com detalhe horário antes de serem
+# compactadas por dia, e retenção total (authentication.metricas)
+REQUEST_METRICS_HOURLY_DAYS = int(os.environ.get("REQUEST_METRICS_HOURLY_DAYS", "7"))
+REQUEST_METRICS_RETENTION_DAYS = int(os.environ.get("REQUEST_METRICS_RETENTION_DAYS", "90"))
+
+# QR Codes PIX: LRU em memória + armazenamento em disco endereçado pelo
+# conteúdo (financeiro.utils)
+QR_CODE_CACHE_DIR = os.environ.get("QR_CODE_CACHE_DIR") or os.path.join(MEDIA_ROOT, "qrcodes")
+QR_CODE_CACHE_MAX_ITEMS = int(os.environ.get("QR_CODE_CACHE_MAX_ITEMS", "256"))
+# Dias sem uso antes de o PNG ser removido do disco (comando purge_qr_codes)
+QR_CODE_CACHE_MAX_AGE_DAYS = int(os.environ.get("QR_CODE_CACHE_MAX_AGE_DAYS", "30"))
+
+# Painel de atividade de usuários: validade do snapshot em cache, recalculado
+# pelo comando atualizar_painel_usuarios (core.painel_usuarios)
+PAINEL_USUARIOS_CACHE_TIMEOUT = int(os.environ.get("PAINEL_USUARIOS_CACHE_TIMEOUT", "900"))
+
+# Métricas do Prometheus (core.metricas, GET /metrics/): com vários workers do
+# gunicorn, METRICS_DIR deve apontar para um diretório compartilhado, esvaziado
+# a cada (re)início do serviço. O endpoint responde a usuários da equipe logados
+# ou, com METRICS_TOKEN, a "Authorization: Bearer <token>" (coletor).
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL_SECONDS = int(os.environ.get("METRICS_FLUSH_INTERVAL_SECONDS", "5"))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+
+# Perfil de consultas por requisição e detecção de N+1 (core.perfil_consultas).
+# Desligado por padrão; nos testes o conftest.py liga o perfil e faz o
+# orçamento de consultas (QUERY_BUDGETS, por nome de URL) falhar o teste.
+QUERY_PROFILER_ENABLED = os.environ.get("QUERY_PROFILER_ENABLED", "False").lower() == "true"
+QUERY_PROFILER_REPEAT_THRESHOLD = int(os.environ.get("QUERY_PROFILER_REPEAT_THRESHOLD", "3"))
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGETS = {
+    "agendamentos:dashboard": 12,
+    "agendamentos:cliente_detail": 12,
+    "admin:agendamentos_agendamento_changelist": 15,
+}
@@ -151,13 +151,28 @@ LOGGING = {
     },
 }
 
-# Cache (usar memória para instância única)
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+# Cache - Redis compartilhado entre workers quando REDIS_URL estiver definido
+# (contadores de invalidação dos relatórios e ocupação da agenda dependem dele
+# para ficarem consistentes entre processos); senão, memória de instância única
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
     }
-}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "unique-snowflake",
+        }
+    }
+# Sem Redis cada worker tem o próprio cache: caches invalidados por sinais são
+# ignorados (core.cache.cache_compartilhado)
+CACHE_SHARED_ACROSS_WORKERS = bool(REDIS_URL)
 
 # WhiteNoise para arquivos estáticos (se disponível)
 try:
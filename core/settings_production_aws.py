@@ -102,13 +102,28 @@ LOGGING = {
     },
 }
 
-# Cache - Redis (se disponível)
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+# Cache - Redis compartilhado entre workers quando REDIS_URL estiver definido
+# (contadores de invalidação dos relatórios e ocupação da agenda dependem dele
+# para ficarem consistentes entre processos); senão, memória de instância única
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
     }
-}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "unique-snowflake",
+        }
+    }
+# Sem Redis cada worker tem o próprio cache: caches invalidados por sinais são
+# ignorados (core.cache.cache_compartilhado)
+CACHE_SHARED_ACROSS_WORKERS = bool(REDIS_URL)
 
 # Email (configurar conforme necessário)
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -1,11 +1,14 @@
+import hmac
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import include, path
 from django.views.decorators.csrf import csrf_exempt
 
+from . import metricas
 from .admin_views import (
     CustomAdminLoginView,
     custom_admin_dashboard,
@@ -21,8 +24,27 @@ def health_check(request):
     )
 
 
+def _metrics_autorizado(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        recebido = request.headers.get("Authorization", "")
+        if hmac.compare_digest(recebido.encode(), f"Bearer {token}".encode()):
+            return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def metrics(request):
+    """Métricas no formato de texto do Prometheus (somadas entre os workers)"""
+    if not _metrics_autorizado(request):
+        return HttpResponse(status=401)
+    response = HttpResponse(metricas.registro.exportar_texto(), content_type=metricas.CONTENT_TYPE)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
 urlpatterns = [
     path("health/", health_check, name="health_check"),  # Health check endpoint
+    path("metrics/", metrics, name="metrics"),  # Métricas do Prometheus
     path("admin/login/", CustomAdminLoginView.as_view(), name="admin_login"),  # Login personalizado
     path(
         "admin/dashboard/",
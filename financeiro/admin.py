@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AsaasPayment
+from .models import AsaasPayment, AsaasWebhookEvent
 
 
 @admin.register(AsaasPayment)
@@ -56,3 +56,33 @@ class AsaasPaymentAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Não permitir deletar - dados críticos de pagamento
         return False
+
+
+@admin.register(AsaasWebhookEvent)
+class AsaasWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ["event_id", "event_type", "status", "attempts", "received_at", "processed_at"]
+    list_filter = ["status", "event_type", "received_at"]
+    search_fields = ["event_id"]
+    readonly_fields = [
+        "event_id",
+        "event_type",
+        "payload",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+        "received_at",
+        "processed_at",
+    ]
+    ordering = ["-received_at"]
+    actions = ["reprocessar"]
+
+    @admin.action(description="Reenfileirar eventos selecionados")
+    def reprocessar(self, request, queryset):
+        total = queryset.exclude(status=AsaasWebhookEvent.STATUS_PROCESSED).update(
+            status=AsaasWebhookEvent.STATUS_PENDING, attempts=0, next_attempt_at=None
+        )
+        self.message_user(request, f"{total} evento(s) reenfileirado(s).")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,57 @@
+"""
+Worker que busca o QR Code PIX das cobranças recém-criadas.
+
+Uso:
+    python manage.py fetch_pix_qr_codes            # uma passada e sai (cron)
+    python manage.py fetch_pix_qr_codes --loop     # fica consultando
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from financeiro.pix import BATCH_SIZE, fetch_pending_qr_codes
+
+
+class Command(BaseCommand):
+    help = "Busca no Asaas o QR Code PIX das cobranças que ainda aguardam o código"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Cobranças consultadas por passada (padrão: {BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua em execução, consultando periodicamente",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Segundos entre passadas (com --loop)",
+        )
+
+    def handle(self, *args, **options):
+        totals = {"fetched": 0, "waiting": 0, "failed": 0}
+
+        try:
+            while True:
+                batch = fetch_pending_qr_codes(batch_size=options["batch_size"])
+                for key, value in batch.items():
+                    totals[key] += value
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"QR Codes obtidos: {totals['fetched']}, "
+                f"ainda aguardando: {totals['waiting']}, falhas: {totals['failed']}"
+            )
+        )
@@ -0,0 +1,69 @@
+"""
+Worker da caixa de entrada de webhooks do Asaas.
+
+Uso:
+    python manage.py process_asaas_webhooks            # drena a fila e sai (cron)
+    python manage.py process_asaas_webhooks --loop     # fica consultando a fila
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from financeiro.webhooks import BATCH_SIZE, MAX_ATTEMPTS, process_pending
+
+
+class Command(BaseCommand):
+    help = "Processa os webhooks do Asaas pendentes na caixa de entrada (com novas tentativas e dead letter)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Eventos por lote (padrão: {BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=MAX_ATTEMPTS,
+            help=f"Tentativas antes de mover o evento para dead letter (padrão: {MAX_ATTEMPTS})",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua em execução, consultando a fila periodicamente",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Segundos entre consultas quando a fila está vazia (com --loop)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        max_attempts = options["max_attempts"]
+        totals = {"processed": 0, "retry": 0, "dead": 0}
+
+        try:
+            while True:
+                batch = process_pending(batch_size=batch_size, max_attempts=max_attempts)
+                for key, value in batch.items():
+                    totals[key] += value
+
+                lote_cheio = sum(batch.values()) >= batch_size
+                if lote_cheio:
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Webhooks processados: {totals['processed']}, "
+                f"reagendados: {totals['retry']}, dead letter: {totals['dead']}"
+            )
+        )
@@ -0,0 +1,32 @@
+"""
+Remove do disco os QR Codes PIX que não são usados há muito tempo.
+
+Uso:
+    python manage.py purge_qr_codes             # usa QR_CODE_CACHE_MAX_AGE_DAYS
+    python manage.py purge_qr_codes --days 7
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from financeiro.utils import qr_code_cache
+
+
+class Command(BaseCommand):
+    help = "Remove do cache em disco os QR Codes sem uso há mais de N dias"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "QR_CODE_CACHE_MAX_AGE_DAYS", 30),
+            help="Dias sem uso antes da remoção (padrão: QR_CODE_CACHE_MAX_AGE_DAYS)",
+        )
+
+    def handle(self, *args, **options):
+        removidos = qr_code_cache.purge(options["days"] * 24 * 60 * 60)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"QR Codes removidos de {qr_code_cache.directory}: {removidos}"
+            )
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsaasWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=200, unique=True)),
+                ('event_type', models.CharField(blank=True, max_length=64)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processed', 'Processado'), ('retry', 'Aguardando nova tentativa'), ('dead', 'Falhou (dead letter)')], default='pending', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='webhook_fila_idx')],
+            },
+        ),
+    ]
@@ -19,3 +19,42 @@ class AsaasPayment(models.Model):
 
     def __str__(self):
         return f"AsaasPayment({self.asaas_id}) - {self.status} - {self.amount}"
+
+
+class AsaasWebhookEvent(models.Model):
+    """
+    Caixa de entrada dos webhooks do Asaas.
+
+    As views apenas gravam o evento bruto e respondem 200; o comando
+    ``process_asaas_webhooks`` processa a fila com novas tentativas. O índice
+    único em ``event_id`` descarta reentregas do mesmo evento.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSED = "processed"
+    STATUS_RETRY = "retry"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pendente"),
+        (STATUS_PROCESSED, "Processado"),
+        (STATUS_RETRY, "Aguardando nova tentativa"),
+        (STATUS_DEAD, "Falhou (dead letter)"),
+    ]
+
+    event_id = models.CharField(max_length=200, unique=True)
+    event_type = models.CharField(max_length=64, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="webhook_fila_idx"),
+        ]
+
+    def __str__(self):
+        return f"AsaasWebhookEvent({self.event_id}) - {self.event_type} - {self.status}"
@@ -0,0 +1,122 @@
+# Busca em segundo plano do QR Code PIX das cobranças recém-criadas.
+#
+# O Asaas leva alguns segundos para publicar o QR Code de uma cobrança nova.
+# Em vez de a view esperar com time.sleep(), ela registra a cobrança em
+# AsaasPayment sem payload e responde na hora; o comando fetch_pix_qr_codes
+# consulta o Asaas (uma requisição por cobrança, sem espera) e grava
+# copy_paste_payload/qr_code_base64. A página acompanha pelo endpoint
+# financeiro:pix_qr_status e recarrega quando o QR Code fica pronto.
+
+import logging
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AsaasPayment
+from .services.asaas import AsaasAPIError, get_asaas_client
+from .utils import generate_qr_code_from_payload
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+# Cobranças mais antigas que isso sem QR Code deixam de ser consultadas
+FETCH_WINDOW = timedelta(hours=1)
+WAITING_STATUSES = ("PENDING", "AWAITING_RISK_ANALYSIS")
+
+
+def extract_pix_payload(pix_data):
+    """Payload "copia e cola" da resposta do Asaas (os nomes do campo variam)."""
+    return (
+        pix_data.get("payload")
+        or pix_data.get("copyPaste")
+        or pix_data.get("pixCopiaECola")
+        or ""
+    )
+
+
+def is_valid_pix_payload(payload):
+    """Payload PIX (BR Code) sempre começa com 000201."""
+    return bool(payload) and payload.startswith("000201") and len(payload) >= 50
+
+
+def register_pending_qr(payment_data, customer_id=None):
+    """Registra a cobrança recém-criada para o worker buscar o QR Code."""
+    payment, _ = AsaasPayment.objects.get_or_create(
+        asaas_id=payment_data["id"],
+        defaults={
+            "customer_id": customer_id or payment_data.get("customer"),
+            "amount": payment_data.get("value") or 0,
+            "billing_type": "PIX",
+            "status": payment_data.get("status", "PENDING"),
+        },
+    )
+    return payment
+
+
+def store_pix_qr(payment, pix_data):
+    """
+    Grava payload e imagem a partir da resposta de get_pix_qr.
+    Retorna False se o payload ainda não está disponível ou é inválido.
+    """
+    payload = extract_pix_payload(pix_data)
+    if not is_valid_pix_payload(payload):
+        if payload:
+            logger.error(f"Payload PIX inválido para {payment.asaas_id}: {payload[:100]}...")
+        return False
+
+    qr_code_image = (
+        generate_qr_code_from_payload(payload)
+        or pix_data.get("encodedImage")
+        or pix_data.get("qrCode")
+        or pix_data.get("qrCodeBase64")
+        or ""
+    )
+    payment.copy_paste_payload = payload
+    payment.qr_code_base64 = qr_code_image
+    payment.save(update_fields=["copy_paste_payload", "qr_code_base64", "updated_at"])
+    return True
+
+
+def fetch_qr_code(payment, client=None):
+    """Uma única consulta ao Asaas (sem espera). Retorna True se o QR Code foi gravado."""
+    client = client or get_asaas_client()
+    try:
+        pix_data = client.get_pix_qr(payment.asaas_id)
+    except AsaasAPIError as e:
+        if e.status_code == 404:
+            return False  # ainda não publicado; tenta de novo no próximo ciclo
+        raise
+    return store_pix_qr(payment, pix_data)
+
+
+def pending_qr_payments(now=None):
+    now = now or timezone.now()
+    return AsaasPayment.objects.filter(
+        Q(copy_paste_payload__isnull=True) | Q(copy_paste_payload=""),
+        billing_type="PIX",
+        status__in=WAITING_STATUSES,
+        created_at__gte=now - FETCH_WINDOW,
+    ).order_by("created_at")
+
+
+def fetch_pending_qr_codes(batch_size=BATCH_SIZE, client=None):
+    """
+    Consulta o Asaas para as cobranças aguardando QR Code.
+    Retorna {"fetched": n, "waiting": n, "failed": n}.
+    """
+    totals = {"fetched": 0, "waiting": 0, "failed": 0}
+    payments = list(pending_qr_payments()[:batch_size])
+    if not payments:
+        return totals
+
+    client = client or get_asaas_client()
+    for payment in payments:
+        try:
+            fetched = fetch_qr_code(payment, client)
+        except Exception as e:
+            logger.warning(f"Erro ao buscar QR Code PIX de {payment.asaas_id}: {e}")
+            totals["failed"] += 1
+            continue
+        totals["fetched" if fetched else "waiting"] += 1
+    return totals
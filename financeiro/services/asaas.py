@@ -1,11 +1,19 @@
 # Serviço para encapsular chamadas à API Asaas
 
+import functools
 import logging
 import os
+import socket
+import threading
+import time
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
-from typing import Optional, Dict, Any, List
+from urllib3.util.retry import Retry
+from typing import Optional, Dict, Any, List, Tuple
+
+from core.metricas import asaas_request_duration, asaas_request_errors, endpoint_asaas
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +22,25 @@ ASAAS_BASE = {
     "production": "https://www.asaas.com/api/v3/",
 }
 
+# Timeouts (conexão, leitura) em segundos por recurso da API. O recurso é o
+# último segmento conhecido do endpoint ("payments/<id>/pixQrCode" ->
+# "pixQrCode"). Sobrescreva com settings.ASAAS_TIMEOUTS.
+ASAAS_TIMEOUTS = {
+    "default": (5, 15),
+    "pay": (5, 30),
+    "pixQrCode": (5, 10),
+    "pix": (5, 10),
+}
+
+# Pool de conexões e retentativas (apenas GET é retentado em erro de leitura
+# ou status transitório; erros de conexão são retentados para qualquer método,
+# pois a requisição não chegou a ser enviada).
+ASAAS_POOL_MAXSIZE = 10
+ASAAS_RETRY_TOTAL = 3
+ASAAS_RETRY_BACKOFF = 0.5  # 0.5s, 1s, 2s...
+ASAAS_RETRY_JITTER = 0.3  # até 0.3s aleatórios somados a cada espera
+ASAAS_RETRY_STATUS = (429, 500, 502, 503, 504)
+
 
 class AsaasAPIError(Exception):
     """Exceção personalizada para erros da API Asaas"""
@@ -25,166 +52,176 @@ class AsaasAPIError(Exception):
         super().__init__(self.message)
 
 
+@functools.lru_cache(maxsize=1)
+def detectar_ambiente() -> str:
+    """
+    Detecta o ambiente Asaas ("production" ou "sandbox") uma única vez por
+    processo. Critérios de produção (qualquer um basta):
+
+    1. DEBUG=False (mais confiável)
+    2. Settings module contém "production"
+    3. ASAAS_ENV="production" no settings
+    4. Hostname de AWS/EC2 ou domínio fourmindstech (hostname ou ALLOWED_HOSTS)
+
+    Se nada indicar produção, respeita ASAAS_ENV (desenvolvimento/local) ou
+    usa sandbox.
+    """
+    debug_value = getattr(settings, "DEBUG", True)
+    settings_module = os.environ.get("DJANGO_SETTINGS_MODULE", "")
+    is_production_settings = "production" in settings_module.lower() if settings_module else False
+    asaas_env_value = getattr(settings, "ASAAS_ENV", "").lower()
+    is_production_env = asaas_env_value == "production"
+
+    # Verificar se não é ambiente local (produção geralmente não roda em localhost)
+    hostname = socket.gethostname()
+    is_not_localhost = hostname not in ["localhost", "127.0.0.1", "::1"] and "localhost" not in hostname.lower()
+
+    # Produção geralmente tem hostname de AWS ou domínio específico
+    is_production_hostname = (
+        is_not_localhost and
+        ("ip-" in hostname or "ec2" in hostname.lower() or "aws" in hostname.lower() or "fourmindstech" in hostname.lower())
+    )
+
+    # Se o domínio em ALLOWED_HOSTS contém "fourmindstech", é produção
+    try:
+        allowed_hosts = getattr(settings, 'ALLOWED_HOSTS', [])
+        for host in allowed_hosts:
+            if host and host not in ['localhost', '127.0.0.1', '0.0.0.0'] and 'fourmindstech' in host.lower():
+                is_production_hostname = True
+                logger.debug(f"Detectado domínio de produção em ALLOWED_HOSTS: {host}")
+                break
+    except Exception as e:
+        logger.debug(f"Erro ao verificar ALLOWED_HOSTS: {e}")
+
+    # IMPORTANTE: Se QUALQUER critério indicar produção, forçar produção,
+    # mesmo se ASAAS_ENV estiver definido como "sandbox"
+    if not debug_value or is_production_settings or is_production_env or is_production_hostname:
+        logger.info(
+            f"AsaasClient - FORÇANDO produção (detecção automática): "
+            f"DEBUG={debug_value}, "
+            f"SETTINGS_MODULE={settings_module}, "
+            f"ASAAS_ENV={asaas_env_value}, "
+            f"hostname={hostname}, "
+            f"is_production_hostname={is_production_hostname}, "
+            f"is_production_settings={is_production_settings}"
+        )
+        return "production"
+
+    if asaas_env_value:
+        return asaas_env_value
+    return "sandbox"
+
+
+def _carregar_api_key(env: str) -> str:
+    """Lê ASAAS_API_KEY do ambiente/settings; recarrega o .env como último recurso."""
+    api_key = os.environ.get("ASAAS_API_KEY") or getattr(settings, "ASAAS_API_KEY", None)
+    if api_key:
+        return api_key
+
+    # Verificar múltiplas fontes para diagnóstico
+    from pathlib import Path
+    base_dir = Path(__file__).resolve().parent.parent.parent
+    env_path = base_dir / '.env'
+    env_exists = env_path.exists()
+    env_key_in_os = bool(os.environ.get("ASAAS_API_KEY"))
+    env_key_in_settings = bool(getattr(settings, "ASAAS_API_KEY", None))
+
+    logger.error(
+        f"ASAAS_API_KEY não configurada! "
+        f"DEBUG={getattr(settings, 'DEBUG', True)}, "
+        f"SETTINGS_MODULE={os.environ.get('DJANGO_SETTINGS_MODULE', '')}, "
+        f"ASAAS_ENV={getattr(settings, 'ASAAS_ENV', '')}, "
+        f"env_display={env}, "
+        f"BASE_DIR={base_dir}, "
+        f".env existe={env_exists}, "
+        f".env path={env_path}, "
+        f"ASAAS_API_KEY em os.environ={'sim' if env_key_in_os else 'não'}, "
+        f"ASAAS_API_KEY em settings={'sim' if env_key_in_settings else 'não'}"
+    )
+
+    # Tentar recarregar o .env uma última vez
+    if env_exists and not env_key_in_os:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=str(env_path.absolute()), override=True)
+            api_key = os.environ.get("ASAAS_API_KEY") or getattr(settings, "ASAAS_API_KEY", None)
+            if api_key:
+                logger.info("✅ ASAAS_API_KEY carregada após tentativa de recarregamento")
+                return api_key
+        except Exception as reload_error:
+            logger.error(f"Erro ao tentar recarregar .env: {reload_error}")
+
+    raise RuntimeError(
+        f"ASAAS_API_KEY não configurada nas variáveis de ambiente. "
+        f"Configure ASAAS_API_KEY no arquivo .env. "
+        f"Ambiente atual: {env}"
+    )
+
+
+def _criar_retry() -> Retry:
+    opcoes = dict(
+        total=getattr(settings, "ASAAS_RETRY_TOTAL", ASAAS_RETRY_TOTAL),
+        backoff_factor=getattr(settings, "ASAAS_RETRY_BACKOFF", ASAAS_RETRY_BACKOFF),
+        status_forcelist=ASAAS_RETRY_STATUS,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(
+            backoff_jitter=getattr(settings, "ASAAS_RETRY_JITTER", ASAAS_RETRY_JITTER),
+            **opcoes,
+        )
+    except TypeError:
+        # urllib3 < 2 não tem backoff_jitter
+        return Retry(**opcoes)
+
+
+def _criar_sessao(api_key: str) -> requests.Session:
+    """Session com pool de conexões keep-alive e retentativas limitadas."""
+    session = requests.Session()
+    pool_maxsize = getattr(settings, "ASAAS_POOL_MAXSIZE", ASAAS_POOL_MAXSIZE)
+    adapter = HTTPAdapter(
+        pool_connections=2, pool_maxsize=pool_maxsize, max_retries=_criar_retry()
+    )
+    session.mount("https://", adapter)
+    # Asaas API usa 'access_token' no header, não Authorization
+    # A chave pode começar com '$' ou não, ambos são válidos
+    session.headers.update(
+        {"access_token": api_key.strip(), "Content-Type": "application/json"}
+    )
+    return session
+
+
 class AsaasClient:
     """
     Cliente para integração com a API do Asaas.
-    
+
+    Prefira ``get_asaas_client()``, que reaproveita um cliente (e o pool de
+    conexões) por processo em vez de abrir uma sessão a cada requisição.
+
     Documentação: https://docs.asaas.com/
     """
 
     def __init__(self, api_key=None, env=None):
-        # Detectar se está em produção usando MÚLTIPLOS critérios:
-        # 1. DEBUG=False indica produção (mais confiável)
-        # 2. Settings module contém "production"
-        # 3. ASAAS_ENV="production" no settings
-        # 4. env="production" passado explicitamente
-        # 5. Hostname não é localhost/127.0.0.1 (produção geralmente usa domínio)
-        debug_value = getattr(settings, "DEBUG", True)
-        settings_module = os.environ.get("DJANGO_SETTINGS_MODULE", "")
-        is_production_settings = "production" in settings_module.lower() if settings_module else False
-        asaas_env_value = getattr(settings, "ASAAS_ENV", "").lower()
-        is_production_env = asaas_env_value == "production"
-        
-        # Verificar se não é ambiente local (produção geralmente não roda em localhost)
-        import socket
-        hostname = socket.gethostname()
-        is_not_localhost = hostname not in ["localhost", "127.0.0.1", "::1"] and "localhost" not in hostname.lower()
-        
-        # Verificar se o domínio/hostname indica produção
-        # Produção geralmente tem hostname de AWS ou domínio específico
-        is_production_hostname = (
-            is_not_localhost and 
-            ("ip-" in hostname or "ec2" in hostname.lower() or "aws" in hostname.lower() or "fourmindstech" in hostname.lower())
-        )
-        
-        # Verificar também ALLOWED_HOSTS para detectar produção
-        # Se o domínio contém "fourmindstech", é produção
-        try:
-            allowed_hosts = getattr(settings, 'ALLOWED_HOSTS', [])
-            for host in allowed_hosts:
-                if host and host not in ['localhost', '127.0.0.1', '0.0.0.0'] and 'fourmindstech' in host.lower():
-                    is_production_hostname = True
-                    logger.debug(f"Detectado domínio de produção em ALLOWED_HOSTS: {host}")
-                    break
-        except Exception as e:
-            logger.debug(f"Erro ao verificar ALLOWED_HOSTS: {e}")
-            pass
-        
-        # Detectar produção por múltiplos critérios
-        # IMPORTANTE: Se QUALQUER critério indicar produção, forçar produção
-        # Prioridade: DEBUG=False é o mais confiável, mas também verificar hostname
-        # EXCEÇÃO: Se env explícito foi passado (mesmo que inválido), respeitar para testes de segurança
-        # EXCEÇÃO: Se ASAAS_ENV está explicitamente definido no settings, respeitar (para testes)
-        is_production = (
-            not debug_value or  # DEBUG=False (mais confiável)
-            is_production_settings or  # Settings module contém "production"
-            is_production_env or  # ASAAS_ENV="production"
-            env == "production" or  # Passado explicitamente como "production"
-            is_production_hostname  # Hostname indica produção (AWS/EC2)
-        )
-        
-        # Se um env explícito foi passado (mesmo que inválido), usar esse valor
-        # Isso permite testes de segurança validarem ambientes inválidos
-        if env is not None:
-            # Env explícito foi passado - usar esse valor (para testes de segurança)
-            self.env = env
-        elif is_production:
-            # IMPORTANTE: Se critérios indicam produção, SEMPRE forçar produção
-            # Mesmo se ASAAS_ENV estiver definido como "sandbox", em produção deve usar produção
-            self.env = "production"
-            # Log detalhado para debug (sempre logar em produção para ajudar diagnóstico)
-            logger.info(
-                f"AsaasClient - FORÇANDO produção (detecção automática): "
-                f"DEBUG={debug_value}, "
-                f"SETTINGS_MODULE={settings_module}, "
-                f"ASAAS_ENV={asaas_env_value}, "
-                f"hostname={hostname}, "
-                f"is_production_hostname={is_production_hostname}, "
-                f"is_production_settings={is_production_settings}, "
-                f"env_passado={env}"
-            )
-        elif asaas_env_value:
-            # ASAAS_ENV está explicitamente definido e não é produção - respeitar (para desenvolvimento/local)
-            self.env = asaas_env_value
-        else:
-            # Nenhum env explícito, ASAAS_ENV não definido e não é produção - usar sandbox como padrão
-            self.env = "sandbox"
-            # Log para debug
-            if not api_key:
-                logger.debug(
-                    f"AsaasClient init - DEBUG={debug_value}, "
-                    f"SETTINGS_MODULE={settings_module}, "
-                    f"env={env}, "
-                    f"is_production={is_production}"
-                )
-        
+        # Um env explícito (mesmo que inválido) é respeitado, o que permite aos
+        # testes de segurança validarem ambientes inválidos; caso contrário usa
+        # a detecção feita uma vez por processo.
+        self.env = env if env is not None else detectar_ambiente()
         self.base = ASAAS_BASE.get(self.env, ASAAS_BASE["sandbox"])
-        
-        # Carregar API key
-        if not api_key:
-            self.api_key = (
-                os.environ.get("ASAAS_API_KEY") or
-                getattr(settings, "ASAAS_API_KEY", None)
-            )
-        
-        if not self.api_key:
-            # SEMPRE usar self.env para mensagem de erro (já foi forçado para "production" se necessário)
-            env_display = self.env
-            
-            # Verificar múltiplas fontes para diagnóstico
-            from pathlib import Path
-            base_dir = Path(__file__).resolve().parent.parent.parent
-            env_path = base_dir / '.env'
-            env_exists = env_path.exists()
-            env_key_in_os = bool(os.environ.get("ASAAS_API_KEY"))
-            env_key_in_settings = bool(getattr(settings, "ASAAS_API_KEY", None))
-            
-            # Log detalhado para debug
-            logger.error(
-                f"ASAAS_API_KEY não configurada! "
-                f"DEBUG={debug_value}, "
-                f"SETTINGS_MODULE={settings_module}, "
-                f"ASAAS_ENV={asaas_env_value}, "
-                f"is_production={is_production}, "
-                f"env_display={env_display}, "
-                f"BASE_DIR={base_dir}, "
-                f".env existe={env_exists}, "
-                f".env path={env_path}, "
-                f"ASAAS_API_KEY em os.environ={'sim' if env_key_in_os else 'não'}, "
-                f"ASAAS_API_KEY em settings={'sim' if env_key_in_settings else 'não'}"
-            )
-            
-            # Tentar recarregar o .env uma última vez
-            if env_exists and not env_key_in_os:
-                try:
-                    from dotenv import load_dotenv
-                    load_dotenv(dotenv_path=str(env_path.absolute()), override=True)
-                    # Tentar novamente
-                    self.api_key = os.environ.get("ASAAS_API_KEY") or getattr(settings, "ASAAS_API_KEY", None)
-                    if self.api_key:
-                        logger.info("✅ ASAAS_API_KEY carregada após tentativa de recarregamento")
-                        return  # Sucesso, não precisa lançar erro
-                except Exception as reload_error:
-                    logger.error(f"Erro ao tentar recarregar .env: {reload_error}")
-            
-            # Mensagem de erro simplificada - sempre menciona apenas ASAAS_API_KEY
-            # O env_display já foi forçado para "production" se qualquer critério indicar produção
-            raise RuntimeError(
-                f"ASAAS_API_KEY não configurada nas variáveis de ambiente. "
-                f"Configure ASAAS_API_KEY no arquivo .env. "
-                f"Ambiente atual: {env_display}"
-            )
-        
-        self.session = requests.Session()
-        # Asaas API usa 'access_token' no header, não Authorization
-        # A chave pode começar com '$' ou não, ambos são válidos
-        api_key_clean = self.api_key.strip()
-        self.session.headers.update(
-            {"access_token": api_key_clean, "Content-Type": "application/json"}
-        )
-        
+        self.api_key = api_key or _carregar_api_key(self.env)
+        self.session = _criar_sessao(self.api_key)
+        self.timeouts = {**ASAAS_TIMEOUTS, **getattr(settings, "ASAAS_TIMEOUTS", {})}
+
         logger.info(f"AsaasClient inicializado - Ambiente: {self.env}")
 
+    def timeout_para(self, endpoint: str) -> Tuple[float, float]:
+        """Timeout (conexão, leitura) configurado para o recurso do endpoint."""
+        for segmento in reversed(endpoint.strip("/").split("/")):
+            if segmento in self.timeouts:
+                return self.timeouts[segmento]
+        return self.timeouts["default"]
+
     def _url(self, path: str) -> str:
         """Constrói a URL completa para um endpoint"""
         return urljoin(self.base, path)
@@ -198,7 +235,8 @@ class AsaasClient:
         Args:
             method: Método HTTP (GET, POST, PUT, DELETE)
             endpoint: Endpoint da API (sem a base URL)
-            **kwargs: Argumentos adicionais para requests (json, timeout, etc.)
+            **kwargs: Argumentos adicionais para requests (json, params, etc.).
+                Sem ``timeout`` explícito, usa o configurado para o endpoint.
         
         Returns:
             Response object
@@ -207,7 +245,9 @@ class AsaasClient:
             AsaasAPIError: Em caso de erro na requisição
         """
         url = self._url(endpoint)
-        timeout = kwargs.pop("timeout", 30)
+        timeout = kwargs.pop("timeout", None) or self.timeout_para(endpoint)
+        rotulo = endpoint_asaas(endpoint)
+        inicio = time.perf_counter()
         
         try:
             response = self.session.request(
@@ -215,6 +255,7 @@ class AsaasClient:
             )
             
             if not response.ok:
+                asaas_request_errors.inc(endpoint=rotulo, status=response.status_code)
                 error_data = {}
                 is_html_response = False
                 
@@ -263,12 +304,14 @@ class AsaasClient:
             return response
             
         except requests.exceptions.Timeout:
+            asaas_request_errors.inc(endpoint=rotulo, status="timeout")
             logger.error(f"Timeout na requisição para {endpoint}")
             raise AsaasAPIError(
                 message="Timeout na comunicação com a API Asaas",
                 status_code=None,
             )
         except requests.exceptions.ConnectionError as e:
+            asaas_request_errors.inc(endpoint=rotulo, status="connection")
             logger.error(f"Erro de conexão com a API Asaas: {e}")
             raise AsaasAPIError(
                 message="Erro de conexão com a API Asaas",
@@ -277,11 +320,16 @@ class AsaasClient:
         except AsaasAPIError:
             raise
         except Exception as e:
+            asaas_request_errors.inc(endpoint=rotulo, status="error")
             logger.error(f"Erro inesperado na requisição para {endpoint}: {e}")
             raise AsaasAPIError(
                 message=f"Erro inesperado: {str(e)}",
                 status_code=None,
             )
+        finally:
+            asaas_request_duration.observe(
+                time.perf_counter() - inicio, endpoint=rotulo, method=method.upper()
+            )
 
     def create_customer(
         self,
@@ -342,7 +390,7 @@ class AsaasClient:
         if state:
             payload["state"] = state
         
-        response = self._request("POST", "customers", json=payload, timeout=15)
+        response = self._request("POST", "customers", json=payload)
         logger.info(f"Cliente criado no Asaas: {response.json().get('id')}")
         return response.json()
 
@@ -356,7 +404,7 @@ class AsaasClient:
         Returns:
             Dict com dados do cliente
         """
-        response = self._request("GET", f"customers/{customer_id}", timeout=15)
+        response = self._request("GET", f"customers/{customer_id}")
         return response.json()
 
     def find_customer_by_cpf_cnpj(self, cpf_cnpj: str) -> Optional[Dict[str, Any]]:
@@ -371,7 +419,7 @@ class AsaasClient:
         """
         cpf_cnpj_clean = cpf_cnpj.replace(".", "").replace("-", "").replace("/", "")
         response = self._request(
-            "GET", "customers", params={"cpfCnpj": cpf_cnpj_clean}, timeout=15
+            "GET", "customers", params={"cpfCnpj": cpf_cnpj_clean}
         )
         data = response.json()
         customers = data.get("data", [])
@@ -393,7 +441,7 @@ class AsaasClient:
         if "cpf_cnpj" in kwargs:
             kwargs["cpfCnpj"] = kwargs.pop("cpf_cnpj").replace(".", "").replace("-", "").replace("/", "")
         
-        response = self._request("PUT", f"customers/{customer_id}", json=kwargs, timeout=15)
+        response = self._request("PUT", f"customers/{customer_id}", json=kwargs)
         logger.info(f"Cliente atualizado no Asaas: {customer_id}")
         return response.json()
 
@@ -439,7 +487,7 @@ class AsaasClient:
         if installment_value:
             payload["installmentValue"] = float(installment_value)
 
-        response = self._request("POST", "payments", json=payload, timeout=15)
+        response = self._request("POST", "payments", json=payload)
         payment_data = response.json()
         logger.info(f"Pagamento criado no Asaas: {payment_data.get('id')}")
         return payment_data
@@ -454,7 +502,7 @@ class AsaasClient:
         Returns:
             Dict com dados do pagamento
         """
-        response = self._request("GET", f"payments/{payment_id}", timeout=15)
+        response = self._request("GET", f"payments/{payment_id}")
         return response.json()
 
     def list_payments(
@@ -489,7 +537,7 @@ class AsaasClient:
         if extra_params:
             params.update(extra_params)
 
-        response = self._request("GET", "payments", params=params, timeout=15)
+        response = self._request("GET", "payments", params=params)
         return response.json()
 
     def delete_payment(self, payment_id: str) -> Dict[str, Any]:
@@ -502,7 +550,7 @@ class AsaasClient:
         Returns:
             Dict com resultado da operação
         """
-        response = self._request("DELETE", f"payments/{payment_id}", timeout=15)
+        response = self._request("DELETE", f"payments/{payment_id}")
         logger.info(f"Pagamento removido no Asaas: {payment_id}")
         return response.json()
 
@@ -525,7 +573,7 @@ class AsaasClient:
         # Tentar primeiro com o endpoint correto da documentação oficial
         # GET /v3/payments/{id}/pixQrCode
         try:
-            response = self._request("GET", f"payments/{payment_id}/pixQrCode", timeout=15)
+            response = self._request("GET", f"payments/{payment_id}/pixQrCode")
             data = response.json()
             
             # Validar que recebemos dados válidos
@@ -546,7 +594,7 @@ class AsaasClient:
             if e.status_code == 404:
                 logger.warning(f"Endpoint /pixQrCode retornou 404, tentando endpoint alternativo /pix...")
                 try:
-                    response = self._request("GET", f"payments/{payment_id}/pix", timeout=15)
+                    response = self._request("GET", f"payments/{payment_id}/pix")
                     data = response.json()
                     
                     if not isinstance(data, dict):
@@ -577,7 +625,7 @@ class AsaasClient:
         Returns:
             Dict com código de barras e outros dados do boleto
         """
-        response = self._request("GET", f"payments/{payment_id}/identificationField", timeout=15)
+        response = self._request("GET", f"payments/{payment_id}/identificationField")
         return response.json()
 
     def pay_with_credit_card(
@@ -605,7 +653,6 @@ class AsaasClient:
             "POST",
             f"payments/{payment_id}/pay",
             json={"creditCard": credit_card_payload},
-            timeout=30,
         )
         logger.info(f"Pagamento com cartão processado: {payment_id}")
         return response.json()
@@ -647,7 +694,7 @@ class AsaasClient:
         if external_reference:
             payload["externalReference"] = external_reference
 
-        response = self._request("POST", "subscriptions", json=payload, timeout=15)
+        response = self._request("POST", "subscriptions", json=payload)
         subscription_data = response.json()
         logger.info(f"Assinatura criada no Asaas: {subscription_data.get('id')}")
         return subscription_data
@@ -662,7 +709,7 @@ class AsaasClient:
         Returns:
             Dict com dados da assinatura
         """
-        response = self._request("GET", f"subscriptions/{subscription_id}", timeout=15)
+        response = self._request("GET", f"subscriptions/{subscription_id}")
         return response.json()
 
     def cancel_subscription(self, subscription_id: str) -> Dict[str, Any]:
@@ -675,6 +722,39 @@ class AsaasClient:
         Returns:
             Dict com resultado da operação
         """
-        response = self._request("DELETE", f"subscriptions/{subscription_id}", timeout=15)
+        response = self._request("DELETE", f"subscriptions/{subscription_id}")
         logger.info(f"Assinatura cancelada no Asaas: {subscription_id}")
         return response.json()
+
+
+_clientes: Dict[Tuple[Optional[str], Optional[str]], AsaasClient] = {}
+_clientes_lock = threading.Lock()
+
+
+def get_asaas_client(api_key=None, env=None) -> AsaasClient:
+    """
+    Retorna o AsaasClient compartilhado do processo para (api_key, env),
+    criando-o na primeira chamada. A Session e seu pool de conexões são
+    reaproveitados entre requisições e threads.
+
+    Raises:
+        RuntimeError: Se ASAAS_API_KEY não estiver configurada
+    """
+    chave = (api_key, env)
+    cliente = _clientes.get(chave)
+    if cliente is None:
+        with _clientes_lock:
+            cliente = _clientes.get(chave)
+            if cliente is None:
+                cliente = _clientes[chave] = AsaasClient(api_key=api_key, env=env)
+    return cliente
+
+
+def reset_asaas_clients():
+    """Descarta os clientes compartilhados (ex.: após trocar a chave ou em testes)."""
+    with _clientes_lock:
+        clientes = list(_clientes.values())
+        _clientes.clear()
+    for cliente in clientes:
+        cliente.session.close()
+    detectar_ambiente.cache_clear()
@@ -7,3 +7,331 @@ class FinanceiroTestCase(TestCase):
     def test_placeholder(self):
         """Placeholder test that always passes."""
         self.assertTrue(True)
+
+
+class AsaasClientCompartilhadoTestCase(TestCase):
+    """Testes da fábrica de AsaasClient com pool e retentativas"""
+
+    def setUp(self):
+        from .services.asaas import reset_asaas_clients
+
+        reset_asaas_clients()
+        self.addCleanup(reset_asaas_clients)
+
+    def test_cliente_reaproveitado_e_ambiente_detectado_uma_vez(self):
+        from unittest import mock
+        from django.test import override_settings
+        from .services.asaas import get_asaas_client
+
+        with override_settings(ASAAS_API_KEY="chave-teste"), mock.patch(
+            "financeiro.services.asaas.socket.gethostname", return_value="dev"
+        ) as hostname:
+            primeiro = get_asaas_client()
+            segundo = get_asaas_client()
+            get_asaas_client(env="sandbox")
+
+        self.assertIs(primeiro, segundo)
+        self.assertEqual(hostname.call_count, 1)
+        self.assertEqual(primeiro.session.headers["access_token"], "chave-teste")
+
+    def test_retentativas_apenas_em_get_e_timeouts_por_endpoint(self):
+        from django.test import override_settings
+        from .services.asaas import get_asaas_client
+
+        with override_settings(
+            ASAAS_API_KEY="chave-teste", ASAAS_TIMEOUTS={"customers": (2, 4)}
+        ):
+            cliente = get_asaas_client(env="sandbox")
+
+        adapter = cliente.session.get_adapter("https://api-sandbox.asaas.com/v3/")
+        retry = adapter.max_retries
+        self.assertEqual(retry.total, 3)
+        self.assertEqual(retry.allowed_methods, frozenset({"GET"}))
+        self.assertIn(503, retry.status_forcelist)
+
+        self.assertEqual(cliente.timeout_para("customers"), (2, 4))
+        self.assertEqual(cliente.timeout_para("payments/pay_123/pixQrCode"), (5, 10))
+        self.assertEqual(cliente.timeout_para("payments/pay_123/pay"), (5, 30))
+        self.assertEqual(cliente.timeout_para("payments/pay_123"), (5, 15))
+
+    def test_metricas_de_latencia_e_erros(self):
+        from unittest import mock
+        import requests
+        from django.test import override_settings
+        from core.metricas import registro
+        from .services.asaas import AsaasAPIError, get_asaas_client
+
+        registro.limpar()
+        self.addCleanup(registro.limpar)
+        with override_settings(ASAAS_API_KEY="chave-teste"):
+            cliente = get_asaas_client(env="sandbox")
+
+        resposta = mock.Mock(ok=False, status_code=503, headers={}, text="{}")
+        resposta.json.return_value = {"errors": [{"description": "indisponível"}]}
+        with mock.patch.object(cliente.session, "request", return_value=resposta):
+            with self.assertRaises(AsaasAPIError):
+                cliente._request("GET", "payments/pay_123/pixQrCode")
+        with mock.patch.object(
+            cliente.session, "request", side_effect=requests.exceptions.Timeout()
+        ):
+            with self.assertRaises(AsaasAPIError):
+                cliente._request("POST", "payments")
+
+        texto = registro.exportar_texto()
+        self.assertIn(
+            'asaas_request_errors_total{endpoint="payments/:id/pixQrCode",status="503"} 1', texto
+        )
+        self.assertIn('asaas_request_errors_total{endpoint="payments",status="timeout"} 1', texto)
+        self.assertIn(
+            'asaas_request_duration_seconds_count{endpoint="payments",method="POST"} 1', texto
+        )
+
+
+class WebhookInboxTestCase(TestCase):
+    """Testes da caixa de entrada de webhooks e do worker"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from authentication.models import AssinaturaUsuario, Plano
+
+        usuario = User.objects.create_user(username="webhook", password="senha-123")
+        plano = Plano.objects.create(
+            nome="Mensal", tipo="mensal", descricao="", preco_cartao=10, preco_pix=9, duracao_dias=30
+        )
+        self.assinatura = AssinaturaUsuario.objects.create(
+            usuario=usuario,
+            plano=plano,
+            status="aguardando_pagamento",
+            data_fim=timezone.now() + timedelta(days=1),
+            asaas_payment_id="pay_123",
+        )
+        self.payload = {
+            "id": "evt_1",
+            "event": "PAYMENT_RECEIVED",
+            "payment": {"id": "pay_123", "status": "RECEIVED", "value": 9, "billingType": "PIX"},
+        }
+
+    def enviar(self, payload):
+        import json
+        from django.test import override_settings
+
+        with override_settings(ASAAS_WEBHOOK_TOKEN="token-teste"):
+            return self.client.post(
+                "/financeiro/webhooks/asaas/",
+                data=json.dumps(payload),
+                content_type="application/json",
+                HTTP_ASAAS_ACCESS_TOKEN="token-teste",
+            )
+
+    def test_webhook_apenas_enfileira_e_ignora_reentrega(self):
+        from .models import AsaasWebhookEvent
+
+        self.assertEqual(self.enviar(self.payload).status_code, 200)
+        self.assertEqual(self.enviar(self.payload).status_code, 200)
+
+        self.assertEqual(AsaasWebhookEvent.objects.count(), 1)
+        self.assinatura.refresh_from_db()
+        self.assertEqual(self.assinatura.status, "aguardando_pagamento")
+
+    def test_worker_processa_fila(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import AsaasPayment, AsaasWebhookEvent
+        from .webhooks import process_pending
+
+        self.enviar(self.payload)
+        saida = StringIO()
+        call_command("process_asaas_webhooks", stdout=saida)
+
+        self.assertIn("Webhooks processados: 1", saida.getvalue())
+        evento = AsaasWebhookEvent.objects.get()
+        self.assertEqual(evento.status, AsaasWebhookEvent.STATUS_PROCESSED)
+        self.assertEqual(AsaasPayment.objects.get().webhook_event_id, "evt_1")
+        self.assinatura.refresh_from_db()
+        self.assertEqual(self.assinatura.status, "ativa")
+
+        # Reprocessar não repete o evento
+        self.assertEqual(
+            sum(process_pending().values()), 0
+        )
+
+    def test_falhas_reagendam_e_vao_para_dead_letter(self):
+        from unittest import mock
+        from django.utils import timezone
+        from .models import AsaasWebhookEvent
+        from .webhooks import enqueue_event, process_pending
+
+        enqueue_event(self.payload)
+        with mock.patch("financeiro.webhooks.process_event", side_effect=RuntimeError("falhou")):
+            self.assertEqual(process_pending(max_attempts=2), {"processed": 0, "retry": 1, "dead": 0})
+            evento = AsaasWebhookEvent.objects.get()
+            self.assertGreater(evento.next_attempt_at, timezone.now())
+            self.assertIn("falhou", evento.last_error)
+
+            # Ainda não venceu: nada a fazer
+            self.assertEqual(process_pending(max_attempts=2), {"processed": 0, "retry": 0, "dead": 0})
+
+            AsaasWebhookEvent.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(process_pending(max_attempts=2), {"processed": 0, "retry": 0, "dead": 1})
+
+        evento.refresh_from_db()
+        self.assertEqual((evento.status, evento.attempts), (AsaasWebhookEvent.STATUS_DEAD, 2))
+
+
+class QRCodeCacheTestCase(TestCase):
+    """Testes do cache de QR Codes endereçado pelo conteúdo"""
+
+    PAYLOAD = "00020101021226820014br.gov.bcb.pix2560qrpix.exemplo.com/teste5204000053039865802BR6304ABCD"
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        from .utils import qr_code_cache
+
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = override_settings(QR_CODE_CACHE_DIR=diretorio)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        qr_code_cache.clear()
+        self.addCleanup(qr_code_cache.clear)
+
+    def test_gera_uma_vez_e_reaproveita_memoria_e_disco(self):
+        import os
+        from unittest import mock
+        from .utils import get_qr_code_png, qr_code_cache, qr_code_key
+
+        with mock.patch("financeiro.utils.render_qr_png", return_value=b"png") as render:
+            key, png = get_qr_code_png(self.PAYLOAD)
+            self.assertEqual(get_qr_code_png(f"  {self.PAYLOAD}\n"), (key, png))
+            qr_code_cache.clear()  # outro processo: só o disco
+            self.assertEqual(get_qr_code_png(self.PAYLOAD), (key, b"png"))
+            self.assertNotEqual(get_qr_code_png(self.PAYLOAD, size=12)[0], key)
+
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(key, qr_code_key(self.PAYLOAD))
+        self.assertTrue(os.path.exists(qr_code_cache.path_for(key)))
+        self.assertIsNone(get_qr_code_png("  "))
+
+    def test_lru_descarta_o_menos_usado(self):
+        from .utils import QRCodeCache
+
+        cache = QRCodeCache(max_items=2)
+        cache._remember("a", b"1")
+        cache._remember("b", b"2")
+        cache._items.move_to_end("a")
+        cache._remember("c", b"3")
+        self.assertEqual(list(cache._items), ["a", "c"])
+
+    def test_imagem_servida_com_cache_longo(self):
+        from .utils import qr_code_url
+
+        url = qr_code_url(self.PAYLOAD)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(response.content.startswith(b"\x89PNG"))
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        self.assertIn("immutable", response["Cache-Control"])
+
+        revalidacao = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidacao.status_code, 304)
+
+        desconhecido = self.client.get(url.replace(url[-68:-4], "0" * 64))
+        self.assertEqual(desconhecido.status_code, 404)
+
+    def test_purge_remove_arquivos_sem_uso(self):
+        import os
+        import time
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+        from .utils import get_qr_code_png, qr_code_cache
+
+        with mock.patch("financeiro.utils.render_qr_png", return_value=b"png"):
+            antigo, _ = get_qr_code_png(self.PAYLOAD)
+            recente, _ = get_qr_code_png(self.PAYLOAD, size=12)
+        dez_dias = time.time() - 10 * 24 * 60 * 60
+        os.utime(qr_code_cache.path_for(antigo), (dez_dias, dez_dias))
+
+        saida = StringIO()
+        call_command("purge_qr_codes", days=7, stdout=saida)
+        self.assertIn("removidos", saida.getvalue())
+        self.assertFalse(os.path.exists(qr_code_cache.path_for(antigo)))
+        self.assertFalse(os.path.isdir(os.path.dirname(qr_code_cache.path_for(antigo))))
+        self.assertTrue(os.path.exists(qr_code_cache.path_for(recente)))
+
+        # Leitura do disco renova a idade do arquivo
+        os.utime(qr_code_cache.path_for(recente), (dez_dias, dez_dias))
+        qr_code_cache.clear()
+        self.assertEqual(qr_code_cache.load(recente), b"png")
+        self.assertEqual(qr_code_cache.purge(7 * 24 * 60 * 60), 0)
+
+
+class PixQrCodeWorkerTestCase(TestCase):
+    """Testes da busca do QR Code PIX em segundo plano"""
+
+    PAYLOAD = "00020101021226820014br.gov.bcb.pix2560qrpix.exemplo.com/teste5204000053039865802BR6304ABCD"
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = override_settings(QR_CODE_CACHE_DIR=diretorio)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def test_worker_grava_qr_code_quando_publicado(self):
+        from unittest import mock
+        from .models import AsaasPayment
+        from .pix import fetch_pending_qr_codes, register_pending_qr
+        from .services.asaas import AsaasAPIError
+
+        payment = register_pending_qr(
+            {"id": "pay_qr_1", "value": 10, "status": "PENDING"}, customer_id="cus_1"
+        )
+        register_pending_qr({"id": "pay_qr_2", "value": 10, "status": "RECEIVED"})
+
+        client = mock.Mock()
+        client.get_pix_qr.side_effect = AsaasAPIError("não encontrado", status_code=404)
+        self.assertEqual(
+            fetch_pending_qr_codes(client=client), {"fetched": 0, "waiting": 1, "failed": 0}
+        )
+
+        client.get_pix_qr.side_effect = None
+        client.get_pix_qr.return_value = {"payload": self.PAYLOAD}
+        self.assertEqual(
+            fetch_pending_qr_codes(client=client), {"fetched": 1, "waiting": 0, "failed": 0}
+        )
+        client.get_pix_qr.assert_called_with("pay_qr_1")
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.copy_paste_payload, self.PAYLOAD)
+        self.assertTrue(payment.qr_code_base64)
+        self.assertEqual(AsaasPayment.objects.get(asaas_id="pay_qr_2").copy_paste_payload, None)
+        self.assertEqual(fetch_pending_qr_codes(client=client)["fetched"], 0)
+
+    def test_status_consulta_apenas_o_banco(self):
+        from django.urls import reverse
+        from .pix import register_pending_qr, store_pix_qr
+
+        payment = register_pending_qr({"id": "pay_qr_3", "value": 10, "status": "PENDING"})
+        url = reverse("financeiro:pix_qr_status", args=["pay_qr_3"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), {"ready": False, "status": "PENDING"})
+        self.assertEqual(response["Cache-Control"], "no-store")
+
+        self.assertTrue(store_pix_qr(payment, {"payload": self.PAYLOAD}))
+        self.assertTrue(self.client.get(url).json()["ready"])
+        self.assertEqual(
+            self.client.get(reverse("financeiro:pix_qr_status", args=["pay_inexistente"])).status_code,
+            404,
+        )
@@ -1,10 +1,12 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = "financeiro"
 
 urlpatterns = [
     path("gerar-pix/", views.create_pix_charge, name="create_pix_charge"),
+    re_path(r"^qrcode/(?P<key>[0-9a-f]{64})\.png$", views.qr_code_image, name="qr_code_image"),
     path("<str:payment_id>/qr/", views.pix_qr_view, name="pix_qr_view"),
+    path("<str:payment_id>/qr/status/", views.pix_qr_status, name="pix_qr_status"),
     path("webhooks/asaas/", views.asaas_webhook, name="asaas_webhook"),
 ]
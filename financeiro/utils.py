@@ -1,71 +1,210 @@
 """
 Utilitários para geração de QR Codes PIX
+
+As imagens são endereçadas pelo conteúdo: a chave é o sha256 do payload e do
+tamanho, então o mesmo PIX sempre gera o mesmo PNG. Há duas camadas de cache:
+um LRU em memória (por processo) na frente de um armazenamento em disco
+(``QR_CODE_CACHE_DIR``) compartilhado entre os workers. A imagem é servida
+por ``financeiro:qr_code_image`` com cabeçalhos de cache de longa duração, em
+vez de ir embutida em base64 no HTML.
+
+Arquivos não usados há mais de ``QR_CODE_CACHE_MAX_AGE_DAYS`` são removidos
+pelo comando ``purge_qr_codes`` (agendado no cron); se ainda forem pedidos,
+são gerados de novo a partir do payload.
 """
 
 import base64
+import hashlib
 import io
-from typing import Optional
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
 
+from django.conf import settings
+from django.urls import reverse
 
-def generate_qr_code_from_payload(payload: str, size: int = 10) -> Optional[str]:
+logger = logging.getLogger(__name__)
+
+QR_CODE_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def qr_code_key(payload: str, size: int = 10) -> str:
+    """Chave do QR Code: sha256 do tamanho e do payload (sem espaços extras)."""
+    conteudo = f"{int(size)}:{payload.strip()}".encode("utf-8")
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def render_qr_png(payload: str, size: int = 10) -> bytes:
+    """Gera o PNG do QR Code (sem cache). Exige a biblioteca qrcode[pil]."""
+    import qrcode
+
+    # Criar QR Code com configurações otimizadas para PIX
+    qr = qrcode.QRCode(
+        version=None,  # Auto-detect version
+        error_correction=qrcode.constants.ERROR_CORRECT_M,  # M para melhor correção
+        box_size=size,
+        border=4,
+    )
+    qr.add_data(payload.strip())
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """LRU em memória na frente do armazenamento em disco."""
+
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    @property
+    def directory(self):
+        return getattr(settings, "QR_CODE_CACHE_DIR", None) or os.path.join(
+            settings.MEDIA_ROOT, "qrcodes"
+        )
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.png")
+
+    def _remember(self, key, png):
+        with self._lock:
+            self._items[key] = png
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def load(self, key) -> Optional[bytes]:
+        """PNG já gerado para a chave (memória, depois disco) ou None."""
+        if not QR_CODE_KEY_RE.match(key or ""):
+            return None
+        with self._lock:
+            png = self._items.get(key)
+            if png is not None:
+                self._items.move_to_end(key)
+                return png
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # idade conta a partir do último uso (purge)
+        except OSError:
+            pass
+        self._remember(key, png)
+        return png
+
+    def store(self, key, png):
+        """Grava no disco de forma atômica (arquivo temporário + rename)."""
+        self._remember(key, png)
+        path = self.path_for(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Sem disco a imagem continua disponível pelo LRU deste processo
+            logger.warning(f"Não foi possível gravar QR Code em disco ({path}): {e}")
+
+    def get_or_create(self, payload, size=10) -> Tuple[str, bytes]:
+        key = qr_code_key(payload, size)
+        png = self.load(key)
+        if png is None:
+            png = render_qr_png(payload, size)
+            self.store(key, png)
+        return key, png
+
+    def clear(self):
+        """Esvazia apenas o LRU em memória (o disco é preservado)."""
+        with self._lock:
+            self._items.clear()
+
+    def purge(self, max_age_seconds):
+        """
+        Remove do disco os PNGs (e temporários abandonados) sem uso há mais de
+        ``max_age_seconds``, além dos subdiretórios que ficarem vazios.
+        Retorna o número de arquivos removidos.
+        """
+        limite = time.time() - max_age_seconds
+        removidos = 0
+        for raiz, _, arquivos in os.walk(self.directory, topdown=False):
+            for nome in arquivos:
+                if not nome.endswith((".png", ".tmp")):
+                    continue
+                path = os.path.join(raiz, nome)
+                try:
+                    if os.path.getmtime(path) < limite:
+                        os.remove(path)
+                        removidos += 1
+                except FileNotFoundError:
+                    continue  # removido por outro processo
+            if raiz != self.directory:
+                try:
+                    os.rmdir(raiz)
+                except OSError:
+                    pass  # ainda tem arquivos
+        return removidos
+
+
+qr_code_cache = QRCodeCache(getattr(settings, "QR_CODE_CACHE_MAX_ITEMS", 256))
+
+
+def get_qr_code_png(payload: str, size: int = 10) -> Optional[Tuple[str, bytes]]:
     """
-    Gera uma imagem QR Code (base64) a partir de um payload PIX.
-    
-    Args:
-        payload: String com o payload PIX
-        size: Tamanho do QR Code (padrão 10)
-    
-    Returns:
-        String base64 da imagem do QR Code ou None se houver erro
+    Retorna ``(chave, png)`` do QR Code do payload, gerando só em cache miss.
+    Retorna None se o payload for vazio ou a geração falhar.
     """
     if not payload or not payload.strip():
-        import logging
-        logger = logging.getLogger(__name__)
         logger.warning("Payload vazio ou None, não é possível gerar QR Code")
         return None
-    
     try:
-        import qrcode
-        from PIL import Image
-        
-        # Limpar payload (remover espaços extras)
-        payload_clean = payload.strip()
-        
-        # Criar QR Code com configurações otimizadas para PIX
-        qr = qrcode.QRCode(
-            version=None,  # Auto-detect version
-            error_correction=qrcode.constants.ERROR_CORRECT_M,  # M para melhor correção
-            box_size=size,
-            border=4,
-        )
-        qr.add_data(payload_clean)
-        qr.make(fit=True)
-        
-        # Criar imagem com alta qualidade
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG', optimize=True)
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"QR Code gerado com sucesso. Payload tamanho: {len(payload_clean)}, Imagem base64 tamanho: {len(img_str)}")
-        
-        return img_str
-        
+        return qr_code_cache.get_or_create(payload, size)
     except ImportError as e:
-        # Se qrcode não estiver instalado, retornar None
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Biblioteca qrcode não instalada: {e}")
         logger.error("Execute: pip install qrcode[pil]")
         return None
     except Exception as e:
-        # Log do erro mas não falhar
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Erro ao gerar QR Code: {e}", exc_info=True)
         return None
 
+
+def qr_code_url(payload: str, size: int = 10) -> Optional[str]:
+    """URL da imagem do QR Code (garante que ela está no cache) ou None."""
+    resultado = get_qr_code_png(payload, size)
+    if resultado is None:
+        return None
+    key, _ = resultado
+    return reverse("financeiro:qr_code_image", args=[key])
+
+
+def generate_qr_code_from_payload(payload: str, size: int = 10) -> Optional[str]:
+    """
+    Gera uma imagem QR Code (base64) a partir de um payload PIX.
+
+    Args:
+        payload: String com o payload PIX
+        size: Tamanho do QR Code (padrão 10)
+
+    Returns:
+        String base64 da imagem do QR Code ou None se houver erro
+    """
+    resultado = get_qr_code_png(payload, size)
+    if resultado is None:
+        return None
+    _, png = resultado
+    img_str = base64.b64encode(png).decode()
+    logger.info(f"QR Code gerado com sucesso. Payload tamanho: {len(payload.strip())}, Imagem base64 tamanho: {len(img_str)}")
+    return img_str
@@ -4,24 +4,27 @@ import logging
 import json
 from django.shortcuts import render, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseForbidden
 from django.conf import settings
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
 from django_ratelimit.exceptions import Ratelimited
 from .models import AsaasPayment
-from .services.asaas import AsaasClient, AsaasAPIError
+from .services import asaas as asaas_service
+from .services.asaas import AsaasAPIError
+from .utils import qr_code_cache, qr_code_url
 from .validators import SecurityValidator
+from .webhooks import enqueue_event, event_id_for
 
 logger = logging.getLogger(__name__)
 
 
 # Cliente será inicializado quando necessário
 def get_asaas_client():
-    """Retorna cliente Asaas, inicializando apenas quando necessário"""
+    """Retorna o cliente Asaas compartilhado do processo (criado na primeira chamada)"""
     try:
-        return AsaasClient()
+        return asaas_service.get_asaas_client()
     except RuntimeError as e:
         # Se não houver API key configurada, retorna None
         logger.warning(f"Erro ao inicializar cliente Asaas: {e}")
@@ -160,14 +163,66 @@ def pix_qr_view(request, payment_id):
         return render(request, "financeiro/pix_qr.html", {"error": "Pagamento não encontrado"}, status=404)
     
     payment = get_object_or_404(AsaasPayment, asaas_id=payment_id)
-    return render(request, "financeiro/pix_qr.html", {"payment": payment})
+    context = {"payment": payment}
+    if payment.copy_paste_payload:
+        context["qr_code_url"] = qr_code_url(payment.copy_paste_payload)
+    return render(request, "financeiro/pix_qr.html", context)
+
+
+@require_http_methods(["GET"])
+def pix_qr_status(request, payment_id):
+    """
+    Consulta leve (só banco) usada pela página de pagamento enquanto o worker
+    fetch_pix_qr_codes busca o QR Code no Asaas.
+    """
+    is_valid, error = SecurityValidator.validate_payment_id(payment_id)
+    if not is_valid:
+        return JsonResponse({"error": "Pagamento não encontrado"}, status=404)
+
+    payment = (
+        AsaasPayment.objects.filter(asaas_id=payment_id)
+        .values("status", "copy_paste_payload")
+        .first()
+    )
+    if payment is None:
+        return JsonResponse({"error": "Pagamento não encontrado"}, status=404)
+
+    response = JsonResponse(
+        {"ready": bool(payment["copy_paste_payload"]), "status": payment["status"]}
+    )
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def qr_code_image(request, key):
+    """
+    Serve o PNG de um QR Code já gerado. A URL é endereçada pelo conteúdo
+    (sha256 do payload), então a resposta nunca muda e pode ficar em cache
+    no navegador indefinidamente.
+    """
+    etag = f'"{key}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+    else:
+        png = qr_code_cache.load(key)
+        if png is None:
+            raise Http404("QR Code não encontrado")
+        response = HttpResponse(png, content_type="image/png")
+    # private: o QR Code identifica uma cobrança; não deve ficar em caches compartilhados
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    response["ETag"] = etag
+    return response
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
 @ratelimit(key='ip', rate='100/m', method='POST', block=True)
 def asaas_webhook(request):
-    """Recebe eventos do Asaas. Validar header 'asaas-access-token'."""
+    """
+    Recebe eventos do Asaas. Validar header 'asaas-access-token'.
+    O evento é gravado na caixa de entrada e processado pelo worker.
+    """
     # Tratar rate limiting
     if getattr(request, 'limited', False):
         logger.warning(f"Rate limit excedido no webhook para IP: {request.META.get('REMOTE_ADDR', 'unknown')}")
@@ -227,123 +282,10 @@ def asaas_webhook(request):
         logger.error(f"Webhook rejeitado: erro ao processar payload - {e}")
         return HttpResponse(status=400)
 
-    # idempotência: ver se evento já processado
-    event_id = payload.get("id")
-    event_type = payload.get("event")
-    obj = payload.get("payment") or payload.get("checkout") or payload.get("object")
-
-    # Processar diferentes tipos de eventos
-    if event_type == "PAYMENT_RECEIVED" and obj:
-        payment_id = obj.get("id")
-        try:
-            p = AsaasPayment.objects.get(asaas_id=payment_id)
-            p.status = obj.get("status", p.status)
-            # Parse data de pagamento
-            payment_date = obj.get("paymentDate") or obj.get("dateCreated")
-            if payment_date:
-                from django.utils.dateparse import parse_datetime
-                parsed_date = parse_datetime(payment_date)
-                if parsed_date:
-                    p.paid_at = parsed_date
-            p.webhook_event_id = event_id
-            p.save()
-            logger.info(f"Pagamento atualizado via webhook: {payment_id} - Status: {p.status}")
-            
-            # ✅ ATUALIZAR STATUS DA ASSINATURA QUANDO PAGAMENTO FOR RECEBIDO
-            try:
-                from authentication.models import AssinaturaUsuario
-                from django.utils import timezone
-                
-                # Buscar assinatura relacionada ao payment_id
-                assinaturas = AssinaturaUsuario.objects.filter(asaas_payment_id=payment_id)
-                
-                # Se não encontrar pelo payment_id, tentar buscar pelo externalReference
-                if not assinaturas.exists():
-                    external_ref = obj.get("externalReference", "")
-                    if external_ref and external_ref.startswith("assinatura_"):
-                        try:
-                            assinatura_id = int(external_ref.replace("assinatura_", ""))
-                            assinaturas = AssinaturaUsuario.objects.filter(id=assinatura_id)
-                            if assinaturas.exists():
-                                # Atualizar payment_id na assinatura
-                                for assinatura in assinaturas:
-                                    assinatura.asaas_payment_id = payment_id
-                                    assinatura.save()
-                                logger.info(f"✅ Payment ID {payment_id} vinculado à assinatura {assinatura_id} via externalReference")
-                        except (ValueError, AssinaturaUsuario.DoesNotExist):
-                            pass
-                
-                for assinatura in assinaturas:
-                    # Atualizar status para "ativa" se ainda estiver aguardando pagamento
-                    if assinatura.status == "aguardando_pagamento":
-                        assinatura.status = "ativa"
-                        
-                        # Se data_inicio ainda não foi definida ou está no passado, definir como agora
-                        if not assinatura.data_inicio or assinatura.data_inicio < timezone.now():
-                            assinatura.data_inicio = timezone.now()
-                        
-                        # Recalcular data_fim baseada na data_inicio atual
-                        from datetime import timedelta
-                        assinatura.data_fim = assinatura.data_inicio + timedelta(days=assinatura.plano.duracao_dias)
-                        
-                        assinatura.save()
-                        logger.info(
-                            f"✅ Assinatura {assinatura.id} atualizada para 'ativa' após pagamento {payment_id}. "
-                            f"Usuário: {assinatura.usuario.username}, "
-                            f"Início: {assinatura.data_inicio.strftime('%Y-%m-%d %H:%M:%S')}, "
-                            f"Fim: {assinatura.data_fim.strftime('%Y-%m-%d %H:%M:%S')}"
-                        )
-                    else:
-                        logger.info(
-                            f"Assinatura {assinatura.id} já estava com status '{assinatura.status}', "
-                            f"não foi alterada após pagamento {payment_id}"
-                        )
-                        
-            except Exception as e:
-                logger.error(f"Erro ao atualizar assinatura após pagamento {payment_id}: {e}", exc_info=True)
-                # Não bloquear resposta do webhook se houver erro ao atualizar assinatura
-        except AsaasPayment.DoesNotExist:
-            # ⚠️ CORREÇÃO: Não fazer chamadas síncronas à API dentro do webhook
-            # Webhooks devem responder rapidamente (< 5s) para evitar timeout
-            # Criar registro básico com dados do payload ou agendar processamento assíncrono
-            try:
-                # Criar registro básico com dados disponíveis no payload
-                # Evitar chamada à API que pode demorar e causar timeout
-                AsaasPayment.objects.create(
-                    asaas_id=payment_id,
-                    customer_id=obj.get("customer", ""),
-                    amount=obj.get("value", 0),
-                    billing_type=obj.get("billingType", "PIX"),
-                    status=obj.get("status", "PENDING"),
-                    webhook_event_id=event_id,
-                )
-                logger.info(f"Pagamento criado via webhook (sem chamada à API): {payment_id}")
-            except Exception as e:
-                # Se não conseguir criar, logar mas não bloquear resposta do webhook
-                logger.error(f"Erro ao criar pagamento via webhook: {e}", exc_info=True)
-                # Não re-raise - webhook deve sempre retornar 200
-
-    elif event_type == "PAYMENT_OVERDUE" and obj:
-        payment_id = obj.get("id")
-        try:
-            p = AsaasPayment.objects.get(asaas_id=payment_id)
-            p.status = "OVERDUE"
-            p.webhook_event_id = event_id
-            p.save()
-            logger.info(f"Pagamento marcado como vencido: {payment_id}")
-        except AsaasPayment.DoesNotExist:
-            logger.warning(f"Pagamento não encontrado para evento OVERDUE: {payment_id}")
-
-    elif event_type == "PAYMENT_DELETED" and obj:
-        payment_id = obj.get("id")
-        try:
-            p = AsaasPayment.objects.get(asaas_id=payment_id)
-            p.status = "DELETED"
-            p.webhook_event_id = event_id
-            p.save()
-            logger.info(f"Pagamento marcado como deletado: {payment_id}")
-        except AsaasPayment.DoesNotExist:
-            logger.warning(f"Pagamento não encontrado para evento DELETED: {payment_id}")
+    # Apenas registrar na caixa de entrada; o processamento é feito pelo
+    # comando process_asaas_webhooks (reentregas com o mesmo id são ignoradas)
+    if enqueue_event(payload):
+        logger.info(f"Webhook recebido: {payload.get('event')} ({event_id_for(payload)})")
 
     # Responder 200 rapidamente (webhook deve responder rápido)
     return HttpResponse(status=200)
@@ -0,0 +1,239 @@
+# Caixa de entrada (inbox) e processamento assíncrono dos webhooks do Asaas.
+#
+# As views só validam e chamam enqueue_event(), que grava o evento bruto com
+# um INSERT idempotente (índice único em event_id) e responde 200 na hora. O
+# comando process_asaas_webhooks drena a fila em lotes: cada evento é
+# processado na sua própria transação; falhas são reagendadas com backoff
+# exponencial e, após MAX_ATTEMPTS, o evento vai para dead letter.
+
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.metricas import webhook_processing_duration
+
+from .models import AsaasPayment, AsaasWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60  # 1min, 2min, 4min, 8min...
+
+PAYMENT_PAID_EVENTS = {"PAYMENT_RECEIVED", "PAYMENT_CONFIRMED"}
+
+
+def event_id_for(payload):
+    """ID do evento; sem "id" no payload, usa o hash do conteúdo."""
+    event_id = payload.get("id")
+    if event_id:
+        return str(event_id)[:200]
+    conteudo = json.dumps(payload, sort_keys=True, default=str).encode()
+    return f"sha256:{hashlib.sha256(conteudo).hexdigest()}"
+
+
+def enqueue_event(payload):
+    """
+    Grava o evento na caixa de entrada. Retorna False se o evento já tinha
+    sido recebido (reentrega do Asaas).
+    """
+    event_id = event_id_for(payload)
+    try:
+        with transaction.atomic():
+            AsaasWebhookEvent.objects.create(
+                event_id=event_id,
+                event_type=str(payload.get("event") or "")[:64],
+                payload=payload,
+            )
+    except IntegrityError:
+        logger.info(f"Webhook duplicado ignorado: {event_id}")
+        return False
+    return True
+
+
+def process_pending(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """
+    Processa até ``batch_size`` eventos vencidos da fila.
+    Retorna {"processed": n, "retry": n, "dead": n}.
+    """
+    now = timezone.now()
+    ids = list(
+        AsaasWebhookEvent.objects.filter(
+            Q(status=AsaasWebhookEvent.STATUS_PENDING)
+            | Q(status=AsaasWebhookEvent.STATUS_RETRY, next_attempt_at__lte=now)
+        )
+        .order_by("received_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+
+    totals = {"processed": 0, "retry": 0, "dead": 0}
+    for event_pk in ids:
+        status = _process_one(event_pk, max_attempts)
+        if status:
+            totals[status] += 1
+    return totals
+
+
+def _process_one(event_pk, max_attempts):
+    with transaction.atomic():
+        # skip_locked: vários workers podem drenar a fila ao mesmo tempo
+        event = (
+            AsaasWebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(
+                pk=event_pk,
+                status__in=[AsaasWebhookEvent.STATUS_PENDING, AsaasWebhookEvent.STATUS_RETRY],
+            )
+            .first()
+        )
+        if event is None:
+            return None
+
+        event.attempts += 1
+        inicio = time.perf_counter()
+        try:
+            with transaction.atomic():
+                process_event(event.payload, event.event_id)
+        except Exception as e:
+            logger.error(
+                f"Erro ao processar webhook {event.event_id} (tentativa {event.attempts}): {e}",
+                exc_info=True,
+            )
+            event.last_error = f"{type(e).__name__}: {e}"[:2000]
+            if event.attempts >= max_attempts:
+                event.status = AsaasWebhookEvent.STATUS_DEAD
+                event.next_attempt_at = None
+            else:
+                event.status = AsaasWebhookEvent.STATUS_RETRY
+                event.next_attempt_at = timezone.now() + timedelta(
+                    seconds=RETRY_BASE_SECONDS * 2 ** (event.attempts - 1)
+                )
+        else:
+            event.status = AsaasWebhookEvent.STATUS_PROCESSED
+            event.processed_at = timezone.now()
+            event.next_attempt_at = None
+            event.last_error = ""
+
+        event.save(
+            update_fields=["attempts", "status", "next_attempt_at", "last_error", "processed_at"]
+        )
+        webhook_processing_duration.observe(
+            time.perf_counter() - inicio,
+            event=(event.payload or {}).get("event") or "",
+            status=event.status,
+        )
+        return event.status
+
+
+def process_event(payload, event_id=None):
+    """Regras de negócio de um evento do Asaas (executado pelo worker)."""
+    event_type = payload.get("event")
+    obj = payload.get("payment") or payload.get("checkout") or payload.get("object")
+    if not event_type or not isinstance(obj, dict) or not obj.get("id"):
+        logger.info(f"Webhook {event_id} sem dados de pagamento; nada a processar")
+        return
+
+    payment_id = obj.get("id")
+    if event_type in PAYMENT_PAID_EVENTS:
+        _payment_paid(payment_id, obj, event_id)
+    elif event_type == "PAYMENT_OVERDUE":
+        _update_payment_status(payment_id, "OVERDUE", event_id)
+    elif event_type == "PAYMENT_DELETED":
+        _update_payment_status(payment_id, "DELETED", event_id)
+    else:
+        logger.info(f"Evento {event_type} ignorado ({event_id})")
+
+
+def _update_payment_status(payment_id, status, event_id):
+    updated = AsaasPayment.objects.filter(asaas_id=payment_id).update(
+        status=status, webhook_event_id=event_id, updated_at=timezone.now()
+    )
+    if updated:
+        logger.info(f"Pagamento {payment_id} marcado como {status}")
+    else:
+        logger.warning(f"Pagamento não encontrado para evento {status}: {payment_id}")
+
+
+def _payment_paid(payment_id, obj, event_id):
+    payment, created = AsaasPayment.objects.get_or_create(
+        asaas_id=payment_id,
+        defaults={
+            "customer_id": obj.get("customer", ""),
+            "amount": obj.get("value", 0),
+            "billing_type": obj.get("billingType", "PIX"),
+            "status": obj.get("status", "PENDING"),
+            "webhook_event_id": event_id,
+        },
+    )
+    if not created:
+        payment.status = obj.get("status", payment.status)
+        payment_date = obj.get("paymentDate") or obj.get("dateCreated")
+        if payment_date:
+            parsed_date = parse_datetime(payment_date)
+            if parsed_date:
+                payment.paid_at = parsed_date
+        payment.webhook_event_id = event_id
+        payment.save()
+    logger.info(f"Pagamento atualizado via webhook: {payment_id} - Status: {payment.status}")
+
+    _activate_subscriptions(payment_id, obj)
+
+
+def _activate_subscriptions(payment_id, obj):
+    from authentication.models import AssinaturaUsuario
+
+    # Buscar assinatura relacionada ao payment_id
+    assinaturas = list(
+        AssinaturaUsuario.objects.select_related("plano", "usuario").filter(
+            asaas_payment_id=payment_id
+        )
+    )
+
+    # Se não encontrar pelo payment_id, tentar buscar pelo externalReference
+    external_ref = obj.get("externalReference") or ""
+    if not assinaturas and external_ref.startswith("assinatura_"):
+        try:
+            assinatura_id = int(external_ref.replace("assinatura_", ""))
+        except ValueError:
+            assinatura_id = None
+        if assinatura_id:
+            assinaturas = list(
+                AssinaturaUsuario.objects.select_related("plano", "usuario").filter(
+                    id=assinatura_id
+                )
+            )
+            for assinatura in assinaturas:
+                assinatura.asaas_payment_id = payment_id
+                assinatura.save(update_fields=["asaas_payment_id", "atualizado_em"])
+                logger.info(
+                    f"✅ Payment ID {payment_id} vinculado à assinatura {assinatura_id} via externalReference"
+                )
+
+    for assinatura in assinaturas:
+        # Atualizar status para "ativa" se ainda estiver aguardando pagamento
+        if assinatura.status != "aguardando_pagamento":
+            logger.info(
+                f"Assinatura {assinatura.id} já estava com status '{assinatura.status}', "
+                f"não foi alterada após pagamento {payment_id}"
+            )
+            continue
+
+        now = timezone.now()
+        assinatura.status = "ativa"
+        # Se data_inicio ainda não foi definida ou está no passado, definir como agora
+        if not assinatura.data_inicio or assinatura.data_inicio < now:
+            assinatura.data_inicio = now
+        assinatura.data_fim = assinatura.data_inicio + timedelta(days=assinatura.plano.duracao_dias)
+        assinatura.save()
+        logger.info(
+            f"✅ Assinatura {assinatura.id} atualizada para 'ativa' após pagamento {payment_id}. "
+            f"Usuário: {assinatura.usuario.username}, "
+            f"Início: {assinatura.data_inicio.strftime('%Y-%m-%d %H:%M:%S')}, "
+            f"Fim: {assinatura.data_fim.strftime('%Y-%m-%d %H:%M:%S')}"
+        )
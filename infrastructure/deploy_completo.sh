@@ -114,8 +114,56 @@ autostart=true
 autorestart=true
 redirect_stderr=true
 stdout_logfile=/opt/s-agendamento/logs/gunicorn.log
-environment=PATH="/opt/s-agendamento/venv/bin",DJANGO_SETTINGS_MODULE="core.settings_production"
+environment=PATH="/opt/s-agendamento/venv/bin",DJANGO_SETTINGS_MODULE="core.settings_production",METRICS_DIR="/opt/s-agendamento/run/metrics"
+
+[program:s-agendamento-webhooks]
+command=/opt/s-agendamento/venv/bin/python manage.py process_asaas_webhooks --loop
+directory=/opt/s-agendamento
+user=django
+autostart=true
+autorestart=true
+stopsignal=INT
+redirect_stderr=true
+stdout_logfile=/opt/s-agendamento/logs/webhooks.log
+environment=PATH="/opt/s-agendamento/venv/bin",DJANGO_SETTINGS_MODULE="core.settings_production",METRICS_DIR="/opt/s-agendamento/run/metrics"
+
+[program:s-agendamento-pix]
+command=/opt/s-agendamento/venv/bin/python manage.py fetch_pix_qr_codes --loop
+directory=/opt/s-agendamento
+user=django
+autostart=true
+autorestart=true
+stopsignal=INT
+redirect_stderr=true
+stdout_logfile=/opt/s-agendamento/logs/pix.log
+environment=PATH="/opt/s-agendamento/venv/bin",DJANGO_SETTINGS_MODULE="core.settings_production",METRICS_DIR="/opt/s-agendamento/run/metrics"
+
+[group:s-agendamento-workers]
+programs=s-agendamento-webhooks,s-agendamento-pix
+EOF
+
+# 6.1 Tarefas agendadas (cron)
+echo ""
+echo "6.1 Aplicando tarefas agendadas..."
+sudo tee /etc/cron.d/s-agendamento > /dev/null <<'EOF'
+# Tarefas periódicas do Sistema de Agendamento
+SHELL=/bin/bash
+DJANGO_SETTINGS_MODULE=core.settings_production
+# Expira assinaturas vencidas (status persistido no banco)
+*/10 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py expirar_assinaturas >> logs/cron.log 2>&1
+# Corrige divergências do contador de agendamentos pendentes (badge da navbar)
+20 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py reconciliar_agendamentos_pendentes >> logs/cron.log 2>&1
+# Remove do disco os QR Codes PIX sem uso (QR_CODE_CACHE_MAX_AGE_DAYS)
+40 4 * * * django cd /opt/s-agendamento && venv/bin/python manage.py purge_qr_codes >> logs/cron.log 2>&1
+# Volume de dados por usuário (painel de atividade)
+10 3 * * * django cd /opt/s-agendamento && venv/bin/python manage.py calcular_armazenamento_usuarios >> logs/cron.log 2>&1
+# Totais do painel de atividade (intervalo menor que PAINEL_USUARIOS_CACHE_TIMEOUT)
+*/10 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py atualizar_painel_usuarios >> logs/cron.log 2>&1
+# Compacta as métricas horárias em diárias e aplica a retenção
+5 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py compactar_metricas_requisicoes >> logs/cron.log 2>&1
 EOF
+sudo chmod 644 /etc/cron.d/s-agendamento
+echo "✓ Tarefas agendadas configuradas"
 
 # 7. Testar e recarregar serviços
 echo ""
@@ -130,7 +178,11 @@ fi
 
 sudo supervisorctl reread
 sudo supervisorctl update
-sudo supervisorctl restart s-agendamento
+# Métricas de processos anteriores não entram na contagem do novo serviço
+sudo supervisorctl stop s-agendamento 's-agendamento-workers:*'
+sudo rm -rf /opt/s-agendamento/run/metrics
+sudo install -d -o django -g django /opt/s-agendamento/run/metrics
+sudo supervisorctl start s-agendamento 's-agendamento-workers:*'
 sudo systemctl reload nginx
 
 echo "✓ Serviços recarregados"
@@ -158,6 +210,7 @@ echo "✓ Migrações aplicadas"
 echo "✓ Arquivos estáticos coletados"
 echo "✓ Nginx configurado"
 echo "✓ Gunicorn configurado"
+echo "✓ Workers configurados"
 echo "✓ Serviços reiniciados"
 echo ""
 echo "Testar:"
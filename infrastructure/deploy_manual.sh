@@ -799,12 +799,41 @@ autorestart=true
 redirect_stderr=true
 stdout_logfile=/opt/s-agendamento/logs/gunicorn.log
 stderr_logfile=/opt/s-agendamento/logs/gunicorn_error.log
-environment=DJANGO_SETTINGS_MODULE="core.settings_production"
+environment=DJANGO_SETTINGS_MODULE="core.settings_production",METRICS_DIR="/opt/s-agendamento/run/metrics"
+
+[program:s-agendamento-webhooks]
+command=/opt/s-agendamento/venv/bin/python manage.py process_asaas_webhooks --loop
+directory=/opt/s-agendamento
+user=django
+autostart=true
+autorestart=true
+stopsignal=INT
+redirect_stderr=true
+stdout_logfile=/opt/s-agendamento/logs/webhooks.log
+environment=DJANGO_SETTINGS_MODULE="core.settings_production",METRICS_DIR="/opt/s-agendamento/run/metrics"
+
+[program:s-agendamento-pix]
+command=/opt/s-agendamento/venv/bin/python manage.py fetch_pix_qr_codes --loop
+directory=/opt/s-agendamento
+user=django
+autostart=true
+autorestart=true
+stopsignal=INT
+redirect_stderr=true
+stdout_logfile=/opt/s-agendamento/logs/pix.log
+environment=DJANGO_SETTINGS_MODULE="core.settings_production",METRICS_DIR="/opt/s-agendamento/run/metrics"
+
+[group:s-agendamento-workers]
+programs=s-agendamento-webhooks,s-agendamento-pix
 EOF
     
     supervisorctl reread
     supervisorctl update
-    supervisorctl restart s-agendamento
+    # Métricas de processos anteriores não entram na contagem do novo serviço
+    supervisorctl stop s-agendamento 's-agendamento-workers:*'
+    rm -rf /opt/s-agendamento/run/metrics
+    install -d -o django -g django /opt/s-agendamento/run/metrics
+    supervisorctl start s-agendamento 's-agendamento-workers:*'
     
     echo "Gunicorn configurado via Supervisor"
     
@@ -821,22 +850,93 @@ User=django
 Group=django
 WorkingDirectory=/opt/s-agendamento
 Environment=DJANGO_SETTINGS_MODULE=core.settings_production
+Environment=METRICS_DIR=/opt/s-agendamento/run/metrics
+# Métricas de processos anteriores não entram na contagem do novo serviço
+ExecStartPre=/bin/rm -rf /opt/s-agendamento/run/metrics
 ExecStart=/opt/s-agendamento/venv/bin/gunicorn core.wsgi:application --bind unix:/opt/s-agendamento/s-agendamento.sock --workers 3 --timeout 120
 ExecReload=/bin/kill -s HUP $MAINPID
 Restart=always
 RestartSec=3
 
+[Install]
+WantedBy=multi-user.target
+EOF
+    
+    # Worker da caixa de entrada de webhooks do Asaas
+    tee /etc/systemd/system/s-agendamento-webhooks.service > /dev/null << 'EOF'
+[Unit]
+Description=Sistema de Agendamento - Worker de webhooks do Asaas
+After=network.target
+
+[Service]
+Type=exec
+User=django
+Group=django
+WorkingDirectory=/opt/s-agendamento
+Environment=DJANGO_SETTINGS_MODULE=core.settings_production
+Environment=METRICS_DIR=/opt/s-agendamento/run/metrics
+ExecStart=/opt/s-agendamento/venv/bin/python manage.py process_asaas_webhooks --loop
+KillSignal=SIGINT
+Restart=always
+RestartSec=3
+
+[Install]
+WantedBy=multi-user.target
+EOF
+    
+    # Worker que busca o QR Code PIX das cobranças recém-criadas
+    tee /etc/systemd/system/s-agendamento-pix.service > /dev/null << 'EOF'
+[Unit]
+Description=Sistema de Agendamento - Worker de QR Codes PIX
+After=network.target
+
+[Service]
+Type=exec
+User=django
+Group=django
+WorkingDirectory=/opt/s-agendamento
+Environment=DJANGO_SETTINGS_MODULE=core.settings_production
+Environment=METRICS_DIR=/opt/s-agendamento/run/metrics
+ExecStart=/opt/s-agendamento/venv/bin/python manage.py fetch_pix_qr_codes --loop
+KillSignal=SIGINT
+Restart=always
+RestartSec=3
+
 [Install]
 WantedBy=multi-user.target
 EOF
     
     systemctl daemon-reload
-    systemctl enable s-agendamento
+    systemctl enable s-agendamento s-agendamento-webhooks s-agendamento-pix
     systemctl start s-agendamento
+    systemctl restart s-agendamento-webhooks s-agendamento-pix
     
     echo "Gunicorn configurado via systemd"
 fi
 
+# Tarefas agendadas (cron)
+echo ""
+echo "16.1 Configurando tarefas agendadas..."
+tee /etc/cron.d/s-agendamento > /dev/null << 'EOF'
+# Tarefas periódicas do Sistema de Agendamento
+SHELL=/bin/bash
+DJANGO_SETTINGS_MODULE=core.settings_production
+# Expira assinaturas vencidas (status persistido no banco)
+*/10 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py expirar_assinaturas >> logs/cron.log 2>&1
+# Corrige divergências do contador de agendamentos pendentes (badge da navbar)
+20 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py reconciliar_agendamentos_pendentes >> logs/cron.log 2>&1
+# Remove do disco os QR Codes PIX sem uso (QR_CODE_CACHE_MAX_AGE_DAYS)
+40 4 * * * django cd /opt/s-agendamento && venv/bin/python manage.py purge_qr_codes >> logs/cron.log 2>&1
+# Volume de dados por usuário (painel de atividade)
+10 3 * * * django cd /opt/s-agendamento && venv/bin/python manage.py calcular_armazenamento_usuarios >> logs/cron.log 2>&1
+# Totais do painel de atividade (intervalo menor que PAINEL_USUARIOS_CACHE_TIMEOUT)
+*/10 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py atualizar_painel_usuarios >> logs/cron.log 2>&1
+# Compacta as métricas horárias em diárias e aplica a retenção
+5 * * * * django cd /opt/s-agendamento && venv/bin/python manage.py compactar_metricas_requisicoes >> logs/cron.log 2>&1
+EOF
+chmod 644 /etc/cron.d/s-agendamento
+echo "Tarefas agendadas configuradas em /etc/cron.d/s-agendamento"
+
 # Reiniciar Nginx
 echo ""
 echo "17. Reiniciando Nginx..."
@@ -859,8 +959,11 @@ echo ""
 echo "Status Gunicorn:"
 if command -v supervisorctl >/dev/null 2>&1; then
     supervisorctl status s-agendamento
+    supervisorctl status 's-agendamento-workers:*'
 else
     systemctl is-active s-agendamento && echo "✅ Gunicorn: ATIVO" || echo "❌ Gunicorn: INATIVO"
+    systemctl is-active s-agendamento-webhooks && echo "✅ Worker de webhooks: ATIVO" || echo "❌ Worker de webhooks: INATIVO"
+    systemctl is-active s-agendamento-pix && echo "✅ Worker de QR Codes PIX: ATIVO" || echo "❌ Worker de QR Codes PIX: INATIVO"
 fi
 
 echo ""
@@ -0,0 +1,138 @@
+// Autocomplete para selects com data-autocomplete-url (AutocompleteSelect).
+// O <select> original continua sendo o campo enviado no formulário; ele fica
+// oculto e recebe a opção escolhida na lista de resultados.
+document.addEventListener('DOMContentLoaded', function() {
+    const ATRASO_BUSCA_MS = 250;
+
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(function(select) {
+        const url = select.dataset.autocompleteUrl;
+        const wrapper = document.createElement('div');
+        wrapper.className = 'position-relative';
+
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control';
+        input.placeholder = select.dataset.placeholder || '';
+        input.autocomplete = 'off';
+        const selecionada = select.options[select.selectedIndex];
+        if (selecionada && selecionada.value) {
+            input.value = selecionada.text;
+        }
+
+        const lista = document.createElement('div');
+        lista.className = 'list-group position-absolute w-100 shadow-sm d-none';
+        lista.style.zIndex = 1050;
+        lista.style.maxHeight = '18rem';
+        lista.style.overflowY = 'auto';
+
+        select.classList.add('d-none');
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.appendChild(input);
+        wrapper.appendChild(lista);
+        wrapper.appendChild(select);
+
+        let temporizador = null;
+        let controlador = null;
+
+        function fechar() {
+            lista.classList.add('d-none');
+        }
+
+        function escolher(item) {
+            let opcao = Array.from(select.options).find(o => o.value === String(item.id));
+            if (!opcao) {
+                opcao = new Option(item.text, item.id);
+                select.add(opcao);
+            }
+            Object.keys(item).forEach(function(chave) {
+                if (chave !== 'id' && chave !== 'text') {
+                    opcao.dataset[chave] = item[chave];
+                }
+            });
+            select.value = String(item.id);
+            input.value = item.text;
+            fechar();
+            select.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+
+        function carregar(cursor) {
+            if (controlador) {
+                controlador.abort();
+            }
+            controlador = new AbortController();
+            const parametros = new URLSearchParams({ q: input.value });
+            if (cursor) {
+                parametros.set('cursor', cursor);
+            }
+
+            fetch(url + '?' + parametros.toString(), {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                signal: controlador.signal,
+            })
+                .then(resposta => resposta.json())
+                .then(function(dados) {
+                    if (!cursor) {
+                        lista.innerHTML = '';
+                    }
+                    const maisAntigo = lista.querySelector('[data-mais]');
+                    if (maisAntigo) {
+                        maisAntigo.remove();
+                    }
+
+                    dados.results.forEach(function(item) {
+                        const botao = document.createElement('button');
+                        botao.type = 'button';
+                        botao.className = 'list-group-item list-group-item-action';
+                        botao.textContent = item.text;
+                        botao.addEventListener('mousedown', function(e) {
+                            e.preventDefault();
+                            escolher(item);
+                        });
+                        lista.appendChild(botao);
+                    });
+
+                    if (dados.next) {
+                        const mais = document.createElement('button');
+                        mais.type = 'button';
+                        mais.dataset.mais = '1';
+                        mais.className = 'list-group-item list-group-item-action text-primary small';
+                        mais.textContent = 'Carregar mais...';
+                        mais.addEventListener('mousedown', function(e) {
+                            e.preventDefault();
+                            carregar(dados.next);
+                        });
+                        lista.appendChild(mais);
+                    }
+
+                    if (!lista.children.length) {
+                        const vazio = document.createElement('div');
+                        vazio.className = 'list-group-item text-muted small';
+                        vazio.textContent = 'Nenhum resultado encontrado';
+                        lista.appendChild(vazio);
+                    }
+                    lista.classList.remove('d-none');
+                })
+                .catch(function(erro) {
+                    if (erro.name !== 'AbortError') {
+                        console.error('Erro no autocomplete:', erro);
+                    }
+                });
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(temporizador);
+            if (!input.value) {
+                select.value = '';
+                select.dispatchEvent(new Event('change', { bubbles: true }));
+            }
+            temporizador = setTimeout(() => carregar(null), ATRASO_BUSCA_MS);
+        });
+        input.addEventListener('focus', () => carregar(null));
+        input.addEventListener('blur', fechar);
+        input.addEventListener('keydown', function(e) {
+            if (e.key === 'Escape') {
+                fechar();
+            }
+        });
+    });
+});